@@ -0,0 +1,28 @@
+"""
+Benchmarks del pipeline de Elastic Net
+======================================
+
+synthetic  — make_panel y generadores de fuentes anuales / mensuales / MinDefensa
+cases      — un caso por cada función exportada en pipeline/__init__.py
+run        — runner (tiempo, memoria, escalamiento, comparación entre commits)
+
+Uso (desde notebooks/3_models)
+------------------------------
+    python -m benchmarks.run --preset quick
+    python -m benchmarks.run --preset municipalities
+    python -m benchmarks.run --compare <commit_base> <commit_nuevo>
+"""
+from .synthetic import make_panel, make_annual, make_monthly, make_mindef_source
+from .run import run_benchmarks, load_results, scaling_table, compare, plot_scaling
+
+__all__ = [
+    "make_panel",
+    "make_annual",
+    "make_monthly",
+    "make_mindef_source",
+    "run_benchmarks",
+    "load_results",
+    "scaling_table",
+    "compare",
+    "plot_scaling",
+]
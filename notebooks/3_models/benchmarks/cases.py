@@ -0,0 +1,492 @@
+"""
+Un caso de benchmark por cada función exportada en pipeline/__init__.py
+======================================================================
+
+Cada caso recibe el contexto de un tamaño de panel (ver build_context) y retorna
+(fn, reset): `fn` es la llamada que se mide y `reset` (o None) deja el estado en
+disco como estaba antes de cada repetición, fuera del tiempo medido.
+
+Sin caso: los controles de instrumentación y caché (set_quiet, is_quiet,
+trace_steps, record_stats, enable_cache, disable_cache, clear_cache) y serve,
+que bloquea sirviendo HTTP (su trabajo es el de score_quarter).
+"""
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import TimeSeriesSplit
+
+import pipeline
+from pipeline.panel import period_codes
+
+from .synthetic import make_annual, make_mindef_source, make_monthly, make_panel, make_polygons
+
+
+TARGET_COL = 'atypical_violence_iacv'
+ID_COLS = ['mun_code', 'quarter', 'population',
+           'qty_01', 'qty_02', 'qty_03', 'qty_04', 'qty_05']
+
+
+def build_context(size, workdir):
+    """
+    Datos sintéticos y artefactos intermedios para un tamaño de panel.
+
+    size : dict  con n_municipalities, n_quarters, n_features, missing_rate, prevalence.
+    workdir : Path  carpeta temporal para los casos que leen o escriben archivos.
+    """
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    df = make_panel(**size)
+
+    ctx = {'size': size, 'workdir': workdir, 'df': df}
+
+    data_path = workdir / 'db.parquet'
+    df.to_parquet(data_path, index=False)
+    ctx['data_path'] = data_path
+    ctx['dataset_dir'] = workdir / 'db_dataset'
+    pipeline.write_dataset(df, ctx['dataset_dir'])
+
+    loaded = pipeline.load_data(data_path)
+    splits = pipeline.create_temporal_splits(loaded, time_col='quarter')
+    X, y, feature_cols = pipeline.prepare_features(
+        loaded, TARGET_COL, 'mun_code', 'quarter', cols_to_exclude=ID_COLS[2:])
+    X_tr, X_va, X_te = (X[splits[m]] for m in ('train_mask', 'val_mask', 'test_mask'))
+    y_tr, y_va, y_te = (y[splits[m]] for m in ('train_mask', 'val_mask', 'test_mask'))
+    Xi_tr, Xi_va, Xi_te, imputers = pipeline.impute_missing(X_tr, X_va, X_te)
+    Xs_tr, Xs_va, Xs_te, scaler = pipeline.scale_features(Xi_tr, Xi_va, Xi_te, feature_cols)
+
+    model = LogisticRegression(penalty='elasticnet', solver='saga', l1_ratio=0.5, C=0.1,
+                               class_weight='balanced', max_iter=10000)
+    model.fit(pd.concat([Xs_tr, Xs_va]), pd.concat([y_tr, y_va]))
+
+    ctx.update(
+        loaded=loaded, splits=splits, X=X, y=y, feature_cols=feature_cols,
+        X_tr=X_tr, X_va=X_va, X_te=X_te, y_tr=y_tr, y_va=y_va, y_te=y_te,
+        Xs_tr=Xs_tr, Xs_va=Xs_va, Xs_te=Xs_te, model=model, imputers=imputers, scaler=scaler,
+        test_groups=loaded.loc[splits['test_mask'], ['mun_code', 'quarter']],
+    )
+    return ctx
+
+
+# ── Pasos 01–11 ─────────────────────────────────────────────────────────────
+
+def case_load_data(ctx):
+    return (lambda: pipeline.load_data(ctx['data_path'])), None
+
+
+def case_analyze_target(ctx):
+    return (lambda: pipeline.analyze_target(ctx['loaded'], TARGET_COL, plot=False)), None
+
+
+def case_create_temporal_splits(ctx):
+    return (lambda: pipeline.create_temporal_splits(ctx['loaded'], time_col='quarter')), None
+
+
+def case_prepare_features(ctx):
+    return (lambda: pipeline.prepare_features(
+        ctx['loaded'], TARGET_COL, 'mun_code', 'quarter', cols_to_exclude=ID_COLS[2:])), None
+
+
+def case_impute_missing(ctx):
+    return (lambda: pipeline.impute_missing(ctx['X_tr'], ctx['X_va'], ctx['X_te'])), None
+
+
+def case_scale_features(ctx):
+    X_tr, X_va, X_te = (ctx[k].fillna(0) for k in ('X_tr', 'X_va', 'X_te'))
+    return (lambda: pipeline.scale_features(X_tr, X_va, X_te, ctx['feature_cols'])), None
+
+
+def case_tune_hyperparameters(ctx):
+    X = pd.concat([ctx['Xs_tr'], ctx['Xs_va']])
+    y = pd.concat([ctx['y_tr'], ctx['y_va']])
+    grid = {'C': [0.01, 0.1, 1], 'l1_ratio': [0.5]}
+    return (lambda: pipeline.tune_hyperparameters(X, y, param_grid=grid, n_cv_splits=3)), None
+
+
+def case_optimize_threshold(ctx):
+    return (lambda: pipeline.optimize_threshold(
+        ctx['model'], ctx['Xs_va'], ctx['y_va'], plot=False)), None
+
+
+def case_evaluate_model(ctx):
+    return (lambda: pipeline.evaluate_model(
+        ctx['model'], ctx['Xs_te'], ctx['y_te'], threshold=0.5, plot=False)), None
+
+
+def case_bootstrap_metrics(ctx):
+    proba = ctx['model'].predict_proba(ctx['Xs_te'])[:, 1]
+    return (lambda: pipeline.bootstrap_metrics(
+        ctx['y_te'], proba, 0.5, groups=ctx['test_groups'], n_bootstrap=500)), None
+
+
+def case_get_coefficients(ctx):
+    return (lambda: pipeline.get_coefficients(ctx['model'], ctx['feature_cols'], plot=False)), None
+
+
+def case_export_results(ctx):
+    coefs = pipeline.get_coefficients(ctx['model'], ctx['feature_cols'], plot=False)
+    out = ctx['workdir'] / 'results'
+    metrics = {'AUPRC': 0.5, 'AUROC': 0.5}
+    return (lambda: pipeline.export_results(out, 'bench', metrics, coefs)), None
+
+
+# ── Construcción del panel ─────────────────────────────────────────────────
+
+def case_write_dataset(ctx):
+    out = ctx['workdir'] / 'db_dataset_bench'
+    return (lambda: pipeline.write_dataset(ctx['df'], out)), None
+
+
+def case_compact_panel(ctx):
+    # compact_panel modifica el DataFrame: cada repetición parte de una copia nueva
+    holder = {}
+
+    def reset():
+        holder['df'] = ctx['df'].copy()
+
+    return (lambda: pipeline.compact_panel(holder['df'])), reset
+
+
+def case_label_panel(ctx):
+    raw = ctx['df'][ID_COLS]
+    return (lambda: pipeline.label_panel(raw)), None
+
+
+def case_update_labels(ctx):
+    labeled = pipeline.label_panel(ctx['df'][ID_COLS])
+    codes = period_codes(labeled['quarter'])
+    last = codes == codes.max()
+    history, new_rows = labeled[~last], ctx['df'][ID_COLS][period_codes(ctx['df']['quarter']) == codes.max()]
+    return (lambda: pipeline.update_labels(history, new_rows)), None
+
+
+def case_update_db(ctx):
+    """Parche de db.parquet tras modificar ~1% de los conteos de homicidios."""
+    work = ctx['workdir'] / 'update_db'
+    work.mkdir(exist_ok=True)
+
+    labeled = pipeline.label_panel(ctx['df'][ID_COLS], dropna=False)
+    lags = pipeline.build_lag_features(labeled, {'columns': ['iacv', 'iacv2'], 'lags': [1, 2, 3, 4]})
+    db = pd.concat([labeled, lags], axis=1)
+    db_path, state = work / 'db.parquet', work / 'state'
+    db.to_parquet(db_path, index=False)
+
+    # Las cinco fuentes del IACV; solo homicidios (01) cambia entre ejecuciones
+    sources = {}
+    for code in ['01', '02', '03', '04', '05']:
+        sources[code] = work / f'source_{code}.parquet'
+        make_mindef_source(ctx['df'], code).to_parquet(sources[code], index=False)
+    pipeline.update_db(db_path, state, sources=sources, label_cols=['iacv', 'iacv2'])
+
+    source = pd.read_parquet(sources['01'])
+    src_path = sources['01']
+
+    rng = np.random.default_rng(1)
+    changed = source.copy()
+    rows = rng.choice(len(changed), size=max(1, len(changed) // 100), replace=False)
+    changed.loc[rows, 'qty'] += 1
+
+    pristine = work / 'pristine'
+    if pristine.exists():
+        shutil.rmtree(pristine)
+    shutil.copytree(state, pristine / 'state')
+    shutil.copyfile(db_path, pristine / 'db.parquet')
+
+    def reset():
+        shutil.rmtree(state)
+        shutil.copytree(pristine / 'state', state)
+        shutil.copyfile(pristine / 'db.parquet', db_path)
+        changed.to_parquet(src_path, index=False)
+
+    return (lambda: pipeline.update_db(db_path, state, sources=sources,
+                                       label_cols=['iacv', 'iacv2'])), reset
+
+
+def case_annual_to_quarterly(ctx):
+    annual = make_annual(ctx['size']['n_municipalities'], max(2, ctx['size']['n_quarters'] // 4))
+    return (lambda: pipeline.annual_to_quarterly(annual, ['v0', 'v1', 'v2', 'v3'])), None
+
+
+def case_monthly_to_quarterly(ctx):
+    monthly = make_monthly(ctx['size']['n_municipalities'], ctx['size']['n_quarters'] * 3)
+    return (lambda: pipeline.monthly_to_quarterly(monthly, ['v0', 'v1'])), None
+
+
+def case_interpolate_anchored(ctx):
+    annual = make_annual(ctx['size']['n_municipalities'], max(2, ctx['size']['n_quarters'] // 4))
+    quarterly = pipeline.annual_to_quarterly(annual, ['v0', 'v1', 'v2', 'v3'])
+    return (lambda: pipeline.interpolate_anchored(quarterly, ['v0', 'v1', 'v2', 'v3'])), None
+
+
+LAG_SPEC = {
+    'columns': ['f000', 'f001', 'f002', 'f003'],
+    'lags': [1, 2, 3, 4, 8],
+    'rolling': {'mean': [4, 8], 'std': [4, 8], 'max': [4]},
+}
+
+
+def case_build_lag_features(ctx):
+    return (lambda: pipeline.build_lag_features(ctx['df'], LAG_SPEC)), None
+
+
+def case_feature_names(ctx):
+    return (lambda: pipeline.feature_names(LAG_SPEC)), None
+
+
+def case_preprocess_folds(ctx):
+    X = pd.concat([ctx['X_tr'], ctx['X_va']])
+    y = pd.concat([ctx['y_tr'], ctx['y_va']])
+    folds = list(TimeSeriesSplit(n_splits=5).split(X))
+    return (lambda: pipeline.preprocess_folds(X, y, folds)), None
+
+
+def case_expanding_fold_stats(ctx):
+    X = pd.concat([ctx['X_tr'], ctx['X_va']]).to_numpy()
+    ends = [len(X) * k // 6 for k in range(1, 6)]
+    return (lambda: pipeline.expanding_fold_stats(X, ends)), None
+
+
+# ── Backtest y experimentos ────────────────────────────────────────────────
+
+def case_walk_forward_backtest(ctx):
+    origins = sorted(ctx['loaded']['quarter'].astype(str).unique())[-4:]
+    return (lambda: pipeline.walk_forward_backtest(
+        ctx['loaded'], TARGET_COL, C=0.1, l1_ratio=0.5, cols_to_exclude=ID_COLS[2:],
+        origins=origins, plot=False)), None
+
+
+def _config(ctx, name):
+    return {
+        'EXPERIMENT_NAME': name,
+        'COLS_TO_EXCLUDE': ID_COLS[2:],
+        'PARAM_GRID':      {'C': [0.01, 0.1, 1], 'l1_ratio': [0.5]},
+        'N_CV_SPLITS':     3,
+        'RESULTS_DIR':     ctx['workdir'] / 'experiments',
+    }
+
+
+def case_run_experiment(ctx):
+    config = _config(ctx, 'bench')
+    return (lambda: pipeline.run_experiment(ctx['loaded'], config, n_jobs=1)), None
+
+
+def case_run_experiments(ctx):
+    configs = [_config(ctx, f'bench_{i}') for i in range(2)]
+    return (lambda: pipeline.run_experiments(configs, ctx['data_path'])), None
+
+
+# ── Scoring y explicación de alertas ───────────────────────────────────────
+
+def _bundle(ctx):
+    """Bundle del modelo del contexto, guardado una sola vez por tamaño."""
+    if 'bundle_path' not in ctx:
+        ctx['bundle_path'] = pipeline.save_bundle(
+            ctx['workdir'] / 'bundle.joblib', ctx['model'], ctx['scaler'], ctx['imputers'],
+            0.5, ctx['feature_cols'])
+    return ctx['bundle_path']
+
+
+def case_save_bundle(ctx):
+    out = ctx['workdir'] / 'bundle_bench.joblib'
+    return (lambda: pipeline.save_bundle(
+        out, ctx['model'], ctx['scaler'], ctx['imputers'], 0.5, ctx['feature_cols'])), None
+
+
+def case_load_bundle(ctx):
+    # load_bundle guarda el bundle en memoria: cada repetición mide la lectura del archivo
+    path = _bundle(ctx)
+    return (lambda: pipeline.load_bundle(path)), pipeline.scoring._LOADED.clear
+
+
+def case_score_quarter(ctx):
+    path = _bundle(ctx)
+    return (lambda: pipeline.score_quarter(path, ctx['data_path'])), None
+
+
+def case_explain_alerts(ctx):
+    path = _bundle(ctx)
+    return (lambda: pipeline.explain_alerts(path, ctx['data_path'], top_k=5)), None
+
+
+def case_feature_contributions(ctx):
+    bundle = pipeline.load_bundle(_bundle(ctx))
+    return (lambda: pipeline.feature_contributions(bundle, ctx['X_te'], families='base')), None
+
+
+def case_feature_family(ctx):
+    return (lambda: pipeline.feature_family(ctx['feature_cols'])), None
+
+
+def case_permutation_importance(ctx):
+    return (lambda: pipeline.permutation_importance(
+        ctx['model'], ctx['Xs_te'], ctx['y_te'], n_repeats=3, n_jobs=1, plot=False)), None
+
+
+# ── Almacén de experimentos ────────────────────────────────────────────────
+
+def _log(ctx, store_path, name, seed):
+    rng = np.random.default_rng(seed)
+    if 'coefs' not in ctx:
+        ctx['coefs'] = pipeline.get_coefficients(ctx['model'], ctx['feature_cols'], plot=False)
+    coefs = ctx['coefs'].copy()
+    coefs['Coeficiente'] += rng.normal(scale=0.1, size=len(coefs))
+    metrics = {'AUPRC': rng.uniform(), 'AUROC': rng.uniform(), 'F1_Score': rng.uniform()}
+    return pipeline.log_run(store_path, name, metrics, coefs, target=TARGET_COL,
+                            params={'C': 0.1, 'l1_ratio': 0.5})
+
+
+def _store(ctx, n_runs=50):
+    """Almacén con n_runs corridas de dos experimentos, creado una sola vez por tamaño."""
+    if 'store_path' not in ctx:
+        path = ctx['workdir'] / 'store.sqlite'
+        path.unlink(missing_ok=True)
+        ctx['run_ids'] = [_log(ctx, path, f'exp_{i % 2}', i) for i in range(n_runs)]
+        ctx['store_path'] = path
+    return ctx['store_path']
+
+
+def case_log_run(ctx):
+    path = ctx['workdir'] / 'store_log.sqlite'
+    path.unlink(missing_ok=True)
+    return (lambda: _log(ctx, path, 'bench', 0)), None
+
+
+def case_leaderboard(ctx):
+    path = _store(ctx)
+    return (lambda: pipeline.leaderboard(path)), None
+
+
+def case_coefficient_stability(ctx):
+    path = _store(ctx)
+    return (lambda: pipeline.coefficient_stability(path, experiment='exp_0')), None
+
+
+def case_load_run(ctx):
+    path = _store(ctx)
+    return (lambda: pipeline.load_run(path, ctx['run_ids'][-1])), None
+
+
+def case_query_store(ctx):
+    path = _store(ctx)
+    sql = 'SELECT feature, AVG(coef) AS coef FROM coefficients GROUP BY feature'
+    return (lambda: pipeline.query_store(path, sql)), None
+
+
+# ── Diseño disperso, streaming y gradient boosting ─────────────────────────
+
+def _masks(ctx):
+    return [ctx['splits'][m] for m in ('train_mask', 'val_mask', 'test_mask')]
+
+
+def case_build_sparse_design(ctx):
+    return (lambda: pipeline.build_sparse_design(ctx['X'], *_masks(ctx))), None
+
+
+def case_transform_design(ctx):
+    *_, design = pipeline.build_sparse_design(ctx['X'], *_masks(ctx))
+    return (lambda: pipeline.transform_design(ctx['X_te'], design)), None
+
+
+def _train_periods(ctx):
+    quarters = ctx['loaded'].loc[ctx['splits']['train_mask'], 'quarter'].astype(str)
+    return quarters.min(), quarters.max()
+
+
+def case_train_streaming(ctx):
+    return (lambda: pipeline.train_streaming(
+        ctx['dataset_dir'], TARGET_COL, ctx['feature_cols'], periods=_train_periods(ctx),
+        n_epochs=2)), None
+
+
+def case_stream_scaled(ctx):
+    _, stats = pipeline.train_streaming(ctx['dataset_dir'], TARGET_COL, ctx['feature_cols'],
+                                        periods=_train_periods(ctx), n_epochs=1)
+    test = ctx['loaded'].loc[ctx['splits']['test_mask'], 'quarter'].astype(str)
+    return (lambda: pipeline.stream_scaled(
+        ctx['dataset_dir'], stats, (test.min(), test.max()))), None
+
+
+def case_tune_gradient_boosting(ctx):
+    X = pd.concat([ctx['X_tr'], ctx['X_va']])
+    y = pd.concat([ctx['y_tr'], ctx['y_va']])
+    grid = {'learning_rate': [0.1], 'max_leaf_nodes': [15, 31]}
+    return (lambda: pipeline.tune_gradient_boosting(
+        X, y, param_grid=grid, n_cv_splits=3, max_iter=100)), None
+
+
+def case_bin_features(ctx):
+    return (lambda: pipeline.bin_features(ctx['X'])), None
+
+
+def case_gain_importances(ctx):
+    model = HistGradientBoostingClassifier(max_iter=50, random_state=42)
+    model.fit(ctx['X_tr'], ctx['y_tr'])
+    return (lambda: pipeline.gain_importances(model)), None
+
+
+# ── Imputación por municipio ───────────────────────────────────────────────
+
+def _ids(ctx):
+    return ctx['loaded'][['mun_code', 'quarter']]
+
+
+def case_fit_panel_imputer(ctx):
+    return (lambda: pipeline.fit_panel_imputer(
+        ctx['X'], _ids(ctx), ctx['splits']['train_mask'])), None
+
+
+def case_transform_panel(ctx):
+    _, state = pipeline.fit_panel_imputer(ctx['X'], _ids(ctx), ctx['splits']['train_mask'])
+    test = ctx['splits']['test_mask']
+    return (lambda: pipeline.transform_panel(ctx['X'][test], _ids(ctx)[test], state)), None
+
+
+# ── Rezagos espaciales ─────────────────────────────────────────────────────
+
+def _polygons(ctx):
+    """GeoJSON de la grilla sintética de municipios, escrito una sola vez por tamaño."""
+    path = ctx['workdir'] / 'municipios.geojson'
+    if not path.exists():
+        path.write_text(json.dumps(make_polygons(ctx['size']['n_municipalities'])), encoding='utf-8')
+    return path
+
+
+def case_read_polygons(ctx):
+    path = _polygons(ctx)
+    return (lambda: pipeline.read_polygons(path)), None
+
+
+def case_build_spatial_index(ctx):
+    path = _polygons(ctx)
+    return (lambda: pipeline.build_spatial_index(path, method='queen')), None
+
+
+SPATIAL_COLS = ['f000', 'f001', 'f002', 'f003', TARGET_COL]
+
+
+def case_spatial_lag_features(ctx):
+    index = pipeline.build_spatial_index(_polygons(ctx), method='queen')
+    return (lambda: pipeline.spatial_lag_features(
+        ctx['loaded'], index, SPATIAL_COLS, stats=('mean', 'max', 'sum'), lag=1)), None
+
+
+def case_spatial_feature_names(ctx):
+    return (lambda: pipeline.spatial_feature_names(SPATIAL_COLS)), None
+
+
+CASES = {
+    name[len('case_'):]: fn
+    for name, fn in list(globals().items())
+    if name.startswith('case_') and callable(fn)
+}
+
+# Casos que no escalan a los paneles más grandes con los defaults del runner
+HEAVY_CASES = {
+    'tune_hyperparameters': 300_000, 'update_db': 2_000_000,
+    'walk_forward_backtest': 300_000, 'run_experiment': 300_000, 'run_experiments': 300_000,
+    'tune_gradient_boosting': 300_000, 'permutation_importance': 1_000_000,
+}
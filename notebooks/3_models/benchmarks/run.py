@@ -0,0 +1,297 @@
+"""
+Runner de benchmarks: tiempo, memoria y curvas de escalamiento
+==============================================================
+
+Uso (desde notebooks/3_models):
+
+    python -m benchmarks.run --preset quick
+    python -m benchmarks.run --preset municipalities --cases load_data label_panel
+    python -m benchmarks.run --compare <commit_base> <commit_nuevo>
+
+Cada medición se agrega como una línea JSON a benchmarks/results/results.jsonl
+junto con el commit de git, de modo que las regresiones entre commits se ven
+comparando filas del mismo caso y tamaño.
+
+- Tiempo: mínimo de `repeat` ejecuciones (perf_counter y process_time).
+- Memoria: pico de tracemalloc en una ejecución aparte (incluye los buffers de
+  numpy/pandas; no incluye procesos hijos de joblib).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+# pipeline se importa desde notebooks/3_models (ver cases.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from .cases import CASES, HEAVY_CASES, build_context
+
+
+RESULTS_PATH = Path(__file__).resolve().parent / 'results' / 'results.jsonl'
+
+BASE_SIZE = dict(n_municipalities=1000, n_quarters=40, n_features=40,
+                 missing_rate=0.05, prevalence=0.10)
+
+PRESETS = {
+    'quick':          [dict(BASE_SIZE, n_municipalities=200)],
+    'municipalities': [dict(BASE_SIZE, n_municipalities=m) for m in (1000, 2500, 5000, 10000)],
+    'quarters':       [dict(BASE_SIZE, n_quarters=q) for q in (40, 80, 120, 160)],
+    'features':       [dict(BASE_SIZE, n_features=f) for f in (20, 40, 80, 160)],
+}
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=Path(__file__).resolve().parent, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True,
+                               cwd=Path(__file__).resolve().parent).stdout.strip()
+        return out.stdout.strip() + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'cpu_count': os.cpu_count(),
+        'machine': platform.machine(),
+        'node': platform.node(),
+    }
+
+
+@contextlib.contextmanager
+def _quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(fn, reset=None, repeat=3, memory=True):
+    """
+    Tiempo (mínimo de `repeat`) y pico de memoria de una llamada.
+
+    Retorna
+    -------
+    result : dict  wall_s, cpu_s, wall_all_s, peak_mb.
+    """
+    walls, cpus = [], []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        with _quiet():
+            t0, c0 = time.perf_counter(), time.process_time()
+            fn()
+            walls.append(time.perf_counter() - t0)
+            cpus.append(time.process_time() - c0)
+
+    peak_mb = None
+    if memory:
+        if reset is not None:
+            reset()
+        with _quiet():
+            tracemalloc.start()
+            try:
+                fn()
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            finally:
+                tracemalloc.stop()
+
+    best = int(np.argmin(walls))
+    return {'wall_s': walls[best], 'cpu_s': cpus[best], 'wall_all_s': walls, 'peak_mb': peak_mb}
+
+
+def run_benchmarks(
+    sizes,
+    cases=None,
+    repeat=3,
+    memory=True,
+    results_path=RESULTS_PATH,
+    label=None,
+    max_rows=None,
+):
+    """
+    Mide cada caso en cada tamaño de panel y agrega los resultados a results_path.
+
+    Parámetros
+    ----------
+    sizes : list[dict]
+        Parámetros de make_panel (ver PRESETS).
+    cases : list[str], optional
+        Nombres de funciones exportadas. Default: todas (CASES).
+    repeat : int
+    memory : bool
+        Si True, mide además el pico de memoria con tracemalloc.
+    results_path : str | Path | None
+        Archivo JSON Lines de resultados (None = no guardar).
+    label : str, optional
+        Etiqueta libre de la corrida (p. ej. 'antes del cambio X').
+    max_rows : dict[str, int], optional
+        Filas máximas por caso; los tamaños mayores se omiten. Default: HEAVY_CASES.
+
+    Retorna
+    -------
+    results : pd.DataFrame  (una fila por caso × tamaño)
+    """
+    names = list(CASES) if cases is None else list(cases)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        raise ValueError(f"Casos desconocidos: {unknown}. Disponibles: {sorted(CASES)}")
+    max_rows = HEAVY_CASES if max_rows is None else max_rows
+
+    commit = _git_commit()
+    env = _environment()
+    stamp = datetime.now().isoformat(timespec='seconds')
+    records = []
+
+    for size in sizes:
+        n_rows = size['n_municipalities'] * size['n_quarters']
+        print(f"\nPanel: {size['n_municipalities']:,} municipios × {size['n_quarters']} trimestres "
+              f"× {size['n_features']} features ({n_rows:,} filas)")
+
+        with tempfile.TemporaryDirectory() as tmp, _quiet():
+            ctx = build_context(size, tmp)
+
+            for name in names:
+                record = {'case': name, **size, 'n_rows': n_rows, 'commit': commit,
+                          'timestamp': stamp, 'label': label, **env}
+                if n_rows > max_rows.get(name, np.inf):
+                    record['status'] = 'skipped'
+                else:
+                    try:
+                        fn, reset = CASES[name](ctx)
+                        record.update(measure(fn, reset, repeat=repeat, memory=memory))
+                        record['status'] = 'ok'
+                    except Exception as exc:  # un caso roto no debe detener la corrida
+                        record['status'] = f'error: {type(exc).__name__}: {exc}'
+                records.append(record)
+
+                with contextlib.redirect_stdout(sys.__stdout__):
+                    if record['status'] == 'ok':
+                        mem = f"{record['peak_mb']:9.1f} MB" if record['peak_mb'] is not None else ''
+                        print(f"  {name:28s} {record['wall_s']:9.4f} s  {mem}")
+                    else:
+                        print(f"  {name:28s} {record['status']}")
+
+    if results_path is not None:
+        results_path = Path(results_path)
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(results_path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, default=float) + '\n')
+        print(f"\n✓ {len(records)} mediciones agregadas a {results_path}")
+
+    return pd.DataFrame(records)
+
+
+def load_results(results_path=RESULTS_PATH):
+    """Todas las mediciones guardadas como DataFrame."""
+    return pd.read_json(results_path, lines=True)
+
+
+def scaling_table(results, by='n_municipalities', value='wall_s'):
+    """
+    Curva de escalamiento: casos × valores de `by`, más el exponente empírico
+    (pendiente log-log) de `value` respecto de `by`.
+    """
+    ok = results[results['status'] == 'ok']
+    table = ok.pivot_table(index='case', columns=by, values=value, aggfunc='min')
+
+    def slope(row):
+        row = row.dropna()
+        if len(row) < 2:
+            return np.nan
+        return np.polyfit(np.log(row.index.astype(float)), np.log(row.to_numpy()), 1)[0]
+
+    table['exponent'] = table.apply(slope, axis=1)
+    return table
+
+
+def compare(base, head, results=None, value='wall_s'):
+    """
+    Razón head / base por caso y tamaño entre dos commits (>1 = más lento).
+    """
+    results = load_results() if results is None else results
+    ok = results[results['status'] == 'ok']
+    keys = ['case', 'n_municipalities', 'n_quarters', 'n_features']
+
+    def best(commit):
+        sel = ok[ok['commit'].astype(str).str.startswith(str(base if commit == 'base' else head))]
+        return sel.groupby(keys)[value].min()
+
+    out = pd.concat({'base': best('base'), 'head': best('head')}, axis=1).dropna()
+    out['ratio'] = out['head'] / out['base']
+    return out.sort_values('ratio', ascending=False)
+
+
+def plot_scaling(results, by='n_municipalities', cases=None, value='wall_s', path=None):
+    """Gráfico log-log de `value` contra `by` para cada caso."""
+    import matplotlib.pyplot as plt
+
+    table = scaling_table(results, by=by, value=value).drop(columns='exponent')
+    if cases is not None:
+        table = table.loc[[c for c in cases if c in table.index]]
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for case, row in table.iterrows():
+        row = row.dropna()
+        ax.plot(row.index, row.to_numpy(), 'o-', label=case)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel(by)
+    ax.set_ylabel(value)
+    ax.set_title(f'Escalamiento por {by}', fontweight='bold')
+    ax.grid(True, alpha=0.3, which='both')
+    ax.legend(fontsize=7, ncol=2)
+    plt.tight_layout()
+    if path is not None:
+        fig.savefig(path, dpi=120)
+    return fig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks del pipeline Elastic Net')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--cases', nargs='*', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true')
+    parser.add_argument('--label', default=None)
+    parser.add_argument('--results', default=str(RESULTS_PATH))
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print(compare(*args.compare, results=load_results(args.results)).to_string())
+        return
+
+    results = run_benchmarks(PRESETS[args.preset], cases=args.cases, repeat=args.repeat,
+                             memory=not args.no_memory, results_path=args.results,
+                             label=args.label)
+    by = {'municipalities': 'n_municipalities', 'quarters': 'n_quarters',
+          'features': 'n_features'}.get(args.preset)
+    if by is not None:
+        print(f"\nEscalamiento (segundos) por {by}:")
+        print(scaling_table(results, by=by).round(4).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Generador de paneles sintéticos municipio × trimestre
+=====================================================
+
+Produce datos con la misma forma que db.parquet (mun_code, quarter, conteos
+qty_01 … qty_05, population, features numéricas y una etiqueta binaria), con
+tamaño, faltantes y prevalencia controlables, para medir cómo escala cada paso
+del pipeline sin depender de los datos reales.
+"""
+import numpy as np
+import pandas as pd
+
+
+def quarter_labels(n_quarters, start='2006Q1'):
+    """Lista de n_quarters trimestres consecutivos 'YYYYQN' desde start."""
+    first = int(start[:4]) * 4 + int(start[-1]) - 1
+    return [f"{c // 4}Q{c % 4 + 1}" for c in range(first, first + n_quarters)]
+
+
+def make_panel(
+    n_municipalities=1100,
+    n_quarters=72,
+    n_features=40,
+    missing_rate=0.05,
+    prevalence=0.10,
+    target_col='atypical_violence_iacv',
+    start='2006Q1',
+    seed=0,
+):
+    """
+    Panel largo sintético, ordenado por trimestre y municipio.
+
+    Parámetros
+    ----------
+    n_municipalities, n_quarters : int
+    n_features : int
+        Columnas f000 … con un efecto municipal persistente, una componente
+        AR(1) en el tiempo y ruido; las primeras 10 determinan la etiqueta.
+    missing_rate : float
+        Fracción de celdas de features en NaN (al azar).
+    prevalence : float
+        Proporción aproximada de positivos en target_col.
+    target_col : str
+    start : str
+        Primer trimestre 'YYYYQN'.
+    seed : int
+
+    Retorna
+    -------
+    df : pd.DataFrame
+        mun_code, quarter, population, qty_01 … qty_05, f000 … y target_col.
+    """
+    rng = np.random.default_rng(seed)
+    M, T, F = n_municipalities, n_quarters, n_features
+    n = M * T
+
+    mun_codes = np.array([f"{i:05d}" for i in range(1, M + 1)])
+    quarters = np.array(quarter_labels(T, start))
+
+    # Filas en orden (trimestre, municipio), como las deja load_data
+    df = pd.DataFrame({
+        'mun_code': np.tile(mun_codes, T),
+        'quarter': np.repeat(quarters, M),
+    })
+
+    base_pop = rng.lognormal(mean=9.5, sigma=1.2, size=M)
+    growth = 1 + 0.003 * np.arange(T)
+    df['population'] = np.floor(np.outer(growth, base_pop)).ravel()
+
+    risk = rng.gamma(0.5, 1.0, size=M)
+    for j, code in enumerate(['01', '02', '03', '04', '05']):
+        lam = np.outer(np.ones(T), risk * base_pop / 1e4 * (0.5 ** j))
+        df[f'qty_{code}'] = rng.poisson(lam).ravel().astype(np.float64)
+
+    # Features: efecto municipal + AR(1) temporal + ruido, generados en (T, M, F)
+    effect = rng.normal(size=(M, F))
+    ar = np.empty((T, M, F))
+    ar[0] = rng.normal(size=(M, F))
+    for t in range(1, T):
+        ar[t] = 0.7 * ar[t - 1] + rng.normal(scale=0.5, size=(M, F))
+    X = (effect[None] + ar).reshape(n, F)
+
+    n_signal = min(10, F)
+    logit = X[:, :n_signal] @ rng.normal(scale=0.6, size=n_signal) + rng.logistic(size=n)
+    df[target_col] = (logit > np.quantile(logit, 1 - prevalence)).astype(np.int64)
+
+    if missing_rate > 0:
+        X[rng.random(X.shape) < missing_rate] = np.nan
+    features = pd.DataFrame(X, columns=[f'f{j:03d}' for j in range(F)])
+    return pd.concat([df, features], axis=1)
+
+
+def make_annual(n_ids=1100, n_years=18, n_cols=4, start_year=2006, seed=0):
+    """Panel anual sintético (mun_code, year, v0 …) para annual_to_quarterly."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'mun_code': np.repeat([f"{i:05d}" for i in range(1, n_ids + 1)], n_years),
+        'year': np.tile(np.arange(start_year, start_year + n_years), n_ids),
+    })
+    for j in range(n_cols):
+        df[f'v{j}'] = np.floor(rng.lognormal(9, 1, size=len(df)))
+    return df
+
+
+def make_monthly(n_ids=1100, n_months=216, n_cols=2, start='2006-01', seed=0):
+    """Panel mensual sintético (mun_code, date, v0 …) para monthly_to_quarterly."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=n_months, freq='MS')
+    df = pd.DataFrame({
+        'mun_code': np.repeat([f"{i:05d}" for i in range(1, n_ids + 1)], n_months),
+        'date': np.tile(dates, n_ids),
+    })
+    for j in range(n_cols):
+        df[f'v{j}'] = rng.poisson(3, size=len(df)).astype(np.float64)
+    return df
+
+
+def make_mindef_source(panel, code='01', seed=0):
+    """
+    Archivo mensual limpio (date, mun_code, qty) cuyo agregado trimestral es qty_<code>.
+
+    Reparte el conteo trimestral del panel en los tres meses del trimestre, con
+    el mismo formato que deja clean_mindef_top5.py.
+    """
+    rng = np.random.default_rng(seed)
+    qty = panel[f'qty_{code}'].to_numpy().astype(np.int64)
+    split = rng.multinomial(1, [1 / 3] * 3, size=len(qty)).argmax(axis=1)
+    starts = pd.PeriodIndex(panel['quarter'], freq='Q').asfreq('M', how='start')
+    out = pd.DataFrame({
+        'date': (starts + split).to_timestamp().date,
+        'mun_code': panel['mun_code'].to_numpy(),
+        'qty': qty,
+    })
+    return out[out['qty'] > 0].reset_index(drop=True)
+
+
+def make_polygons(n_ids=1100, code_field='MPIO_CDPMP'):
+    """
+    GeoJSON sintético: una grilla de cuadrados 0.1° × 0.1° con códigos 00001 ….
+
+    Los cuadrados vecinos comparten lados y vértices, como municipios contiguos.
+    """
+    width = int(np.ceil(np.sqrt(n_ids)))
+    features = []
+    for i in range(n_ids):
+        x, y = -76 + 0.1 * (i % width), 4 + 0.1 * (i // width)
+        ring = [[x, y], [x + 0.1, y], [x + 0.1, y + 0.1], [x, y + 0.1], [x, y]]
+        features.append({
+            'type': 'Feature',
+            'properties': {code_field: f"{i + 1:05d}"},
+            'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
@@ -9,12 +9,69 @@ Pasos disponibles
 03  create_temporal_splits  — Splits train / val / test sin overlap
 04  prepare_features        — Selección de X e y
 05  impute_missing          — Imputación sin leakage
+    numeric_strategy='panel'
+                            — Interpolación limitada, LOCF y mediana por municipio
+                              (fit_panel_imputer / transform_panel)
 06  scale_features          — Estandarización sin leakage
-07  tune_hyperparameters    — GridSearchCV con TimeSeriesSplit
-08  optimize_threshold      — Threshold óptimo en validación
-09  evaluate_model          — Métricas finales en test
+07  tune_hyperparameters    — Camino de regularización con TimeSeriesSplit
+    train_streaming         — Alternativa fuera de memoria: SGD Elastic Net por trimestres
+    backend='hist_gb'       — HistGradientBoosting con bins compartidos y early stopping
+08  optimize_threshold      — Threshold óptimo en validación (barrido exacto)
+09  evaluate_model          — Métricas finales en test (IC por bootstrap opcional)
 10  get_coefficients        — Interpretabilidad del modelo
-11  export_results          — Exportar CSVs de métricas y coeficientes
+    permutation_importance  — Importancia por permutación de grupos de features (en paralelo)
+11  export_results          — Agregar la corrida al almacén SQLite (CSVs opcionales)
+
+Construcción del panel
+----------------------
+write_dataset   — Guarda el panel particionado por año / trimestre (ver load_data)
+compact_panel   — Ids categóricos, periodos enteros y float32 (load_data(compact=True))
+label_panel     — Índices IACV y etiquetas de violencia atípica (todo el panel)
+update_labels   — Etiquetado incremental de trimestres nuevos
+update_db       — Parche incremental de db.parquet con nuevas fuentes MinDefensa
+annual_to_quarterly, monthly_to_quarterly, interpolate_anchored
+                — Alineación de fuentes anuales / mensuales a trimestres
+build_lag_features — Rezagos y ventanas móviles por municipio (con caché por spec)
+preprocess_folds, expanding_fold_stats
+                — Imputación + estandarización por fold de la CV temporal
+                  (tune_hyperparameters(X_raw=...))
+build_sparse_design, transform_design
+                — Imputación + escala a CSR float32 (columnas dispersas sin centrar)
+build_spatial_index, spatial_lag_features
+                — Vecindad DIVIPOLA (queen / kNN) en matriz dispersa y rezagos
+                  espaciales (media, máximo, vecinos en alerta) de columnas del panel
+walk_forward_backtest
+                — Backtest de origen móvil: reajuste trimestral con warm start
+
+Instrumentación
+---------------
+trace_steps     — Traza por paso (tiempo, CPU, RSS, formas, estadísticas) y modo silencioso
+set_quiet       — Suprime prints y gráficos de todos los pasos
+enable_cache    — Caché en disco de las salidas de los pasos (llave = datos + parámetros + código)
+
+Lotes de experimentos
+---------------------
+run_experiments — Varias configuraciones en paralelo sobre un panel en memoria compartida
+run_experiment  — Pasos 03–11 de una configuración (mismas variables que los notebooks)
+
+Almacén de experimentos
+-----------------------
+log_run         — Agrega una corrida (métricas, coeficientes, CV, curva de threshold) al SQLite
+leaderboard     — Ranking de corridas por métrica, filtrable por experimento / target / fecha
+coefficient_stability
+                — Media, desviación y consistencia de signo de cada coeficiente entre corridas
+load_run, query_store
+                — Detalle de una corrida / consulta SQL libre
+
+Scoring
+-------
+save_bundle     — Imputadores + scaler + modelo + threshold + features en un archivo
+score_quarter   — Probabilidades y alertas de todos los municipios de un trimestre
+explain_alerts  — Top-k factores (aporte al logit) de cada alerta, por feature o familia
+feature_contributions
+                — Matriz de aportes municipio × feature (+ intercepto) de un modelo lineal
+serve           — Endpoint HTTP local con el bundle cargado (pipeline.scoring no importa
+                  matplotlib / seaborn)
 
 Uso rápido
 ----------
@@ -26,17 +83,57 @@ Uso rápido
 ... )
 """
 
-from .step01_data_loading         import load_data
-from .step02_target_analysis      import analyze_target
-from .step03_temporal_splits      import create_temporal_splits
-from .step04_feature_preparation  import prepare_features
-from .step05_imputation           import impute_missing
-from .step06_scaling              import scale_features
-from .step07_hyperparameter_tuning import tune_hyperparameters
-from .step08_threshold_optimization import optimize_threshold
-from .step09_evaluation           import evaluate_model
-from .step10_interpretability     import get_coefficients
-from .step11_export               import export_results
+import importlib
+
+# Las funciones se importan al primer uso: `import pipeline.scoring` no carga
+# matplotlib / seaborn ni los pasos que no se usan.
+_SUBMODULES = {
+    'step01_data_loading':           ['load_data', 'write_dataset', 'compact_panel'],
+    'step02_target_analysis':        ['analyze_target'],
+    'step03_temporal_splits':        ['create_temporal_splits'],
+    'step04_feature_preparation':    ['prepare_features'],
+    'step05_imputation':             ['impute_missing'],
+    'step06_scaling':                ['scale_features'],
+    'step07_hyperparameter_tuning':  ['tune_hyperparameters'],
+    'step08_threshold_optimization': ['optimize_threshold'],
+    'step09_evaluation':             ['evaluate_model', 'bootstrap_metrics'],
+    'step10_interpretability':       ['get_coefficients', 'permutation_importance'],
+    'step11_export':                 ['export_results'],
+    'panel_imputation':              ['fit_panel_imputer', 'transform_panel'],
+    'labeling':                      ['label_panel', 'update_labels'],
+    'incremental_build':             ['update_db'],
+    'feature_engineering':           ['build_lag_features', 'feature_names'],
+    'spatial':                       ['build_spatial_index', 'spatial_lag_features',
+                                      'spatial_feature_names', 'read_polygons'],
+    'fold_preprocessing':            ['preprocess_folds', 'expanding_fold_stats'],
+    'gradient_boosting':             ['tune_gradient_boosting', 'bin_features', 'gain_importances'],
+    'streaming':                     ['train_streaming', 'stream_scaled'],
+    'sparse_design':                 ['build_sparse_design', 'transform_design'],
+    'backtesting':                   ['walk_forward_backtest'],
+    'instrumentation':               ['trace_steps', 'set_quiet', 'is_quiet', 'record_stats'],
+    'caching':                       ['enable_cache', 'disable_cache', 'clear_cache'],
+    'experiments':                   ['run_experiments', 'run_experiment'],
+    'experiment_store':              ['log_run', 'leaderboard', 'coefficient_stability',
+                                      'load_run', 'query_store'],
+    'scoring':                       ['save_bundle', 'load_bundle', 'score_quarter', 'serve'],
+    'explanations':                  ['explain_alerts', 'feature_contributions', 'feature_family'],
+    'resampling':                    ['annual_to_quarterly', 'monthly_to_quarterly', 'interpolate_anchored'],
+}
+_EXPORTS = {name: module for module, names in _SUBMODULES.items() for name in names}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 __all__ = [
     "load_data",
@@ -44,10 +141,59 @@ __all__ = [
     "create_temporal_splits",
     "prepare_features",
     "impute_missing",
+    "fit_panel_imputer",
+    "transform_panel",
     "scale_features",
     "tune_hyperparameters",
     "optimize_threshold",
     "evaluate_model",
+    "bootstrap_metrics",
     "get_coefficients",
+    "permutation_importance",
     "export_results",
+    "write_dataset",
+    "compact_panel",
+    "label_panel",
+    "update_labels",
+    "update_db",
+    "annual_to_quarterly",
+    "monthly_to_quarterly",
+    "interpolate_anchored",
+    "build_lag_features",
+    "feature_names",
+    "build_spatial_index",
+    "spatial_lag_features",
+    "spatial_feature_names",
+    "read_polygons",
+    "preprocess_folds",
+    "expanding_fold_stats",
+    "tune_gradient_boosting",
+    "bin_features",
+    "gain_importances",
+    "train_streaming",
+    "stream_scaled",
+    "build_sparse_design",
+    "transform_design",
+    "walk_forward_backtest",
+    "trace_steps",
+    "set_quiet",
+    "is_quiet",
+    "record_stats",
+    "enable_cache",
+    "disable_cache",
+    "clear_cache",
+    "run_experiments",
+    "run_experiment",
+    "log_run",
+    "leaderboard",
+    "coefficient_stability",
+    "load_run",
+    "query_store",
+    "save_bundle",
+    "load_bundle",
+    "score_quarter",
+    "serve",
+    "explain_alerts",
+    "feature_contributions",
+    "feature_family",
 ]
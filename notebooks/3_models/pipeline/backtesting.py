@@ -0,0 +1,224 @@
+"""
+Backtesting walk-forward (origen móvil)
+=======================================
+
+Simula la operación real: en cada trimestre de prueba (origen) se reajustan
+imputación, estandarización y Elastic Net con TODOS los trimestres anteriores y
+se predice el trimestre del origen. Las métricas se reportan por trimestre y
+agregadas.
+
+Para que 40+ reajustes sean viables:
+
+- las estadísticas de imputación / escala de cada origen salen de una sola
+  pasada acumulativa por el panel (expanding_fold_stats), no de reajustar
+  SimpleImputer + StandardScaler en cada origen;
+- cada reajuste parte de los coeficientes del origen anterior (warm start);
+- con n_jobs > 1 los orígenes se reparten en bloques contiguos que corren en
+  paralelo; dentro de cada bloque se mantiene la cadena de warm starts.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.metrics import (average_precision_score, f1_score, precision_score,
+                             recall_score, roc_auc_score)
+
+from .panel import code_to_period, period_codes
+from .fold_preprocessing import expanding_fold_stats
+from .step04_feature_preparation import prepare_features
+from .step07_hyperparameter_tuning import _base_model
+from .instrumentation import instrumented, record_stats
+
+
+def _run_chain(X, y, ends, test_ranges, stats, C, l1_ratio, random_state, warm_start):
+    """Reajusta y predice una secuencia de orígenes consecutivos con warm start."""
+    model = _base_model(random_state, warm_start=warm_start).set_params(C=C, l1_ratio=l1_ratio)
+    out = []
+    for e, (lo, hi), fill, mean, scale in zip(ends, test_ranges, *stats):
+        def transform(block):
+            return (np.where(np.isnan(block), fill, block) - mean) / scale
+
+        t0 = time.perf_counter()
+        model.fit(transform(X[:e]), y[:e])
+        fit_s = time.perf_counter() - t0
+        proba = model.predict_proba(transform(X[lo:hi]))[:, 1]
+        out.append((proba, int(np.max(model.n_iter_)), fit_s, model.coef_[0].copy()))
+    return out
+
+
+def _period_metrics(y_true, y_proba, threshold):
+    y_pred = (y_proba >= threshold).astype(int)
+    both = len(np.unique(y_true)) == 2
+    return {
+        'AUPRC':     average_precision_score(y_true, y_proba) if both else np.nan,
+        'AUROC':     roc_auc_score(y_true, y_proba) if both else np.nan,
+        'F1_Score':  f1_score(y_true, y_pred, zero_division=0),
+        'Precision': precision_score(y_true, y_pred, zero_division=0),
+        'Recall':    recall_score(y_true, y_pred, zero_division=0),
+    }
+
+
+@instrumented
+def walk_forward_backtest(
+    df,
+    target_col,
+    C,
+    l1_ratio,
+    municipality_col='mun_code',
+    time_col='quarter',
+    feature_cols=None,
+    cols_to_exclude=None,
+    threshold=0.5,
+    origins=None,
+    min_train_periods=8,
+    impute_strategy='median',
+    warm_start=True,
+    random_state=42,
+    n_jobs=1,
+    plot=True,
+):
+    """
+    Backtest walk-forward: reajuste con todo el pasado y predicción de cada trimestre.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Panel (salida de load_data). Las filas con target nulo se descartan.
+    target_col : str
+    C, l1_ratio : float
+        Hiperparámetros del Elastic Net (p. ej. los de tune_hyperparameters).
+    municipality_col, time_col : str
+    feature_cols, cols_to_exclude : list[str], optional
+        Como en prepare_features. Las features deben ser numéricas.
+    threshold : float
+        Threshold de alerta (p. ej. el de optimize_threshold).
+    origins : list[str], optional
+        Trimestres a predecir ('YYYYQN'). Default: todos los trimestres después
+        de los primeros `min_train_periods`.
+    min_train_periods : int
+    impute_strategy : str
+        'median' o 'mean'.
+    warm_start : bool
+        Reajustar desde los coeficientes del origen anterior.
+    random_state : int
+    n_jobs : int
+        Bloques de orígenes en paralelo (-1 = todos los núcleos).
+    plot : bool
+
+    Retorna
+    -------
+    per_period : pd.DataFrame
+        Una fila por origen: periodo, n_train, n_test, prevalencia, n_alerts,
+        AUPRC, AUROC, F1_Score, Precision, Recall, n_iter, fit_s.
+    predictions : pd.DataFrame
+        municipio, periodo, y_true, y_proba, y_pred de cada fila predicha.
+    coef_path : pd.DataFrame  coeficientes del modelo de cada origen (origen × feature).
+    """
+    X, y, feature_cols = prepare_features(
+        df, target_col, municipality_col, time_col,
+        cols_to_exclude=cols_to_exclude, feature_cols=feature_cols,
+    )
+    keep = y.notna().to_numpy()
+    codes_all = period_codes(df[time_col])[keep]
+    order = np.argsort(codes_all, kind='stable')
+    codes = codes_all[order]
+    X_arr = np.asarray(X[keep], dtype=np.float64)[order]
+    y_arr = y[keep].to_numpy().astype(int)[order]
+    ids = df[municipality_col].to_numpy()[keep][order]
+    labels = df[time_col].astype(str).to_numpy()[keep][order]
+
+    uniq, first = np.unique(codes, return_index=True)
+    if origins is None:
+        origin_codes = uniq[min_train_periods:]
+    else:
+        origin_codes = np.sort(period_codes(pd.Series(origins)))
+        missing = np.setdiff1d(origin_codes, uniq)
+        if len(missing):
+            raise ValueError(f"Orígenes sin datos: {list(code_to_period(missing))}")
+    if len(origin_codes) == 0:
+        raise ValueError("No hay orígenes: reducir min_train_periods o indicar origins")
+
+    starts = np.searchsorted(codes, origin_codes, side='left')
+    stops = np.searchsorted(codes, origin_codes, side='right')
+    if starts[0] == 0:
+        raise ValueError("El primer origen no tiene trimestres previos para entrenar")
+    for s in starts:
+        if len(np.unique(y_arr[:s])) < 2:
+            raise ValueError(f"Entrenamiento hasta {labels[s]} con una sola clase: "
+                             "aumentar min_train_periods")
+
+    print(f"Walk-forward: {len(origin_codes)} orígenes ({labels[starts[0]]} → {labels[starts[-1]]}) "
+          f"| {len(feature_cols)} features | C={C}, l1_ratio={l1_ratio}")
+
+    stats = expanding_fold_stats(X_arr, starts, strategy=impute_strategy)
+
+    n_chunks = max(1, min(effective_n_jobs(n_jobs), len(origin_codes)))
+    chunks = np.array_split(np.arange(len(origin_codes)), n_chunks)
+    t0 = time.perf_counter()
+    results = Parallel(n_jobs=n_chunks)(
+        delayed(_run_chain)(
+            X_arr, y_arr, starts[idx], list(zip(starts[idx], stops[idx])),
+            (stats['fill'][idx], stats['mean'][idx], stats['scale'][idx]),
+            C, l1_ratio, random_state, warm_start,
+        )
+        for idx in chunks
+    )
+    results = [r for chunk in results for r in chunk]
+    elapsed = time.perf_counter() - t0
+
+    rows, preds = [], []
+    for (lo, hi), (proba, n_iter, fit_s, _) in zip(zip(starts, stops), results):
+        y_true = y_arr[lo:hi]
+        rows.append({
+            'periodo':     labels[lo],
+            'n_train':     int(lo),
+            'n_test':      int(hi - lo),
+            'prevalencia': float(y_true.mean()),
+            'n_alerts':    int((proba >= threshold).sum()),
+            **_period_metrics(y_true, proba, threshold),
+            'n_iter':      n_iter,
+            'fit_s':       fit_s,
+        })
+        preds.append(pd.DataFrame({
+            municipality_col: ids[lo:hi],
+            time_col:         labels[lo:hi],
+            'y_true':         y_true,
+            'y_proba':        proba,
+            'y_pred':         (proba >= threshold).astype(int),
+        }))
+    per_period = pd.DataFrame(rows)
+    predictions = pd.concat(preds, ignore_index=True)
+    coef_path = pd.DataFrame([r[3] for r in results], index=per_period['periodo'],
+                             columns=feature_cols)
+
+    pooled = _period_metrics(predictions['y_true'].to_numpy(),
+                             predictions['y_proba'].to_numpy(), threshold)
+    record_stats(n_origins=len(per_period), total_iter=int(per_period['n_iter'].sum()),
+                 **{f'pooled_{k}': float(v) for k, v in pooled.items()})
+
+    print(f"✓ {len(per_period)} reajustes en {elapsed:,.1f} s "
+          f"({n_chunks} bloque(s), iteraciones saga: {per_period['n_iter'].sum():,})")
+    print(f"{'Métrica':12s} {'Agregada':>10s} {'Media trim.':>12s} {'Mín. trim.':>11s}")
+    for k, v in pooled.items():
+        print(f"  {k:10s} {v:10.4f} {per_period[k].mean():12.4f} {per_period[k].min():11.4f}")
+
+    if plot:
+        fig, ax = plt.subplots(figsize=(14, 5))
+        for k in ('AUPRC', 'F1_Score', 'Precision', 'Recall'):
+            ax.plot(per_period['periodo'], per_period[k], marker='o', markersize=3, label=k)
+        ax.plot(per_period['periodo'], per_period['prevalencia'], 'k--', alpha=0.5,
+                label='Prevalencia')
+        ax.set_xlabel('Trimestre predicho', fontsize=12)
+        ax.set_ylabel('Score', fontsize=12)
+        ax.set_title('Backtest walk-forward', fontsize=14, fontweight='bold')
+        step = max(1, len(per_period) // 20)
+        ax.set_xticks(range(0, len(per_period), step))
+        ax.set_xticklabels(per_period['periodo'][::step], rotation=45)
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+        plt.tight_layout()
+        plt.show()
+
+    return per_period, predictions, coef_path
@@ -0,0 +1,304 @@
+"""
+Caché en disco de las salidas de los pasos, direccionada por contenido
+======================================================================
+
+Con enable_cache(), los pasos decorados con @cached (carga, splits, features,
+imputación, escalado, tuning, etiquetado) guardan su salida bajo una llave que
+combina:
+
+- el contenido de los argumentos (hash de DataFrames / arreglos / modelos, y
+  del archivo o carpeta cuando el argumento es una ruta de datos);
+- los parámetros, con los defaults de la firma ya aplicados;
+- el código fuente del módulo del paso y de todos los módulos de pipeline que
+  importa, directa o indirectamente (un cambio en cualquiera de ellos
+  invalida la caché del paso).
+
+Al re-ejecutar un notebook después de cambiar solo la celda del threshold o de
+export, los pasos anteriores se leen del disco en lugar de recalcularse.
+
+- DataFrames / Series de un solo dtype numérico y arreglos numpy se guardan
+  como .npy y se leen con memory-map (copy-on-write): sin copia al cargar.
+- DataFrames mixtos van a Parquet; lo demás (modelos, dicts) a pickle.
+- Si la carpeta supera max_gb se eliminan las entradas usadas hace más tiempo.
+"""
+import ast
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .instrumentation import is_quiet, record_stats
+
+
+CACHE_VERSION = '1'  # Cambiar si cambia el formato de las entradas
+
+_CACHE = {'dir': None, 'max_bytes': None}
+
+_PACKAGE_DIR = Path(__file__).resolve().parent
+
+# Por módulo: (mtime_ns, tamaño) del archivo y sus imports relativos; se vuelve
+# a parsear solo si el archivo cambia en disco
+_IMPORTS = {}
+
+
+def enable_cache(cache_dir, max_gb=10.0):
+    """
+    Activa la caché de pasos en `cache_dir` (se crea si no existe).
+
+    Parámetros
+    ----------
+    cache_dir : str | Path
+    max_gb : float | None
+        Tamaño máximo; al superarlo se eliminan las entradas menos usadas
+        recientemente (None = sin límite).
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _CACHE.update(dir=cache_dir, max_bytes=None if max_gb is None else max_gb * 1e9)
+    if not is_quiet():
+        print(f"✓ Caché de pasos activa en {cache_dir} (máx. {max_gb} GB)")
+
+
+def disable_cache():
+    """Desactiva la caché (las entradas en disco se conservan)."""
+    _CACHE.update(dir=None, max_bytes=None)
+
+
+def clear_cache(cache_dir=None):
+    """Elimina todas las entradas de la caché (default: la carpeta activa)."""
+    cache_dir = Path(cache_dir) if cache_dir is not None else _CACHE['dir']
+    if cache_dir is None or not cache_dir.exists():
+        return
+    for entry in cache_dir.iterdir():
+        if entry.is_dir():
+            shutil.rmtree(entry)
+    if not is_quiet():
+        print(f"✓ Caché vaciada: {cache_dir}")
+
+
+# ── Huella de los argumentos ────────────────────────────────────────────────
+
+def _hash_path(path, h):
+    """Contenido de un archivo, o (ruta relativa, tamaño, mtime) de cada archivo de una carpeta."""
+    if path.is_file():
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    else:
+        for p in sorted(path.rglob('*')):
+            if p.is_file():
+                st = p.stat()
+                h.update(f'{p.relative_to(path)}|{st.st_size}|{st.st_mtime_ns}'.encode())
+
+
+def _fingerprint(obj, h, name=''):
+    if isinstance(obj, pd.DataFrame):
+        h.update(f'df|{list(obj.columns)}|{list(map(str, obj.dtypes))}'.encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(f'series|{obj.name}|{obj.dtype}'.encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(f'array|{obj.dtype}|{obj.shape}'.encode())
+        h.update(np.ascontiguousarray(obj).tobytes() if obj.dtype != object else pickle.dumps(obj))
+    elif sp.issparse(obj):
+        obj = obj.tocsr()
+        h.update(f'sparse|{obj.dtype}|{obj.shape}'.encode())
+        for part in (obj.data, obj.indices, obj.indptr):
+            h.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(obj, (str, Path)) and ('path' in name or 'dir' in name) and Path(obj).exists():
+        h.update(f'path|{Path(obj).name}'.encode())
+        _hash_path(Path(obj), h)
+    elif isinstance(obj, dict):
+        h.update(b'dict')
+        for k in sorted(obj, key=str):
+            h.update(repr(k).encode())
+            _fingerprint(obj[k], h, str(k))
+    elif isinstance(obj, (list, tuple)):
+        h.update(f'{type(obj).__name__}|{len(obj)}'.encode())
+        for item in obj:
+            _fingerprint(item, h, name)
+    elif obj is None or isinstance(obj, (bool, int, float, str, np.generic)):
+        h.update(repr(obj).encode())
+    else:
+        try:
+            h.update(pickle.dumps(obj, protocol=4))
+        except Exception:
+            h.update(repr(obj).encode())
+
+
+def _local_imports(name):
+    """Módulos de pipeline que `name` importa con imports relativos (en cualquier nivel)."""
+    path = _PACKAGE_DIR / f'{name}.py'
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    if name not in _IMPORTS or _IMPORTS[name][0] != stamp:
+        source = path.read_bytes()
+        found = set()
+        for node in ast.walk(ast.parse(source)):
+            if isinstance(node, ast.ImportFrom) and node.level == 1:
+                if node.module:
+                    found.add(node.module.split('.')[0])
+                else:
+                    found.update(alias.name for alias in node.names)
+        found = {m for m in found if (_PACKAGE_DIR / f'{m}.py').exists()}
+        _IMPORTS[name] = (stamp, source, found)
+    return _IMPORTS[name]
+
+
+def _code_version(module_name):
+    """Hash del código del módulo del paso y de los módulos de pipeline que importa."""
+    pending, seen = [module_name.rsplit('.', 1)[-1]], set()
+    while pending:
+        name = pending.pop()
+        if name not in seen:
+            seen.add(name)
+            pending.extend(_local_imports(name)[2])
+    h = hashlib.sha256(CACHE_VERSION.encode())
+    for name in sorted(seen):
+        h.update(f'|{name}|'.encode())
+        h.update(_IMPORTS[name][1])
+    return h.hexdigest()
+
+
+def _cache_key(fn, args, kwargs):
+    bound = inspect.signature(fn).bind(*args, **kwargs)
+    bound.apply_defaults()
+    h = hashlib.sha256()
+    h.update(f'{fn.__module__}.{fn.__qualname__}|{_code_version(fn.__module__)}'.encode())
+    for name, value in bound.arguments.items():
+        h.update(name.encode())
+        _fingerprint(value, h, name)
+    return h.hexdigest()[:32]
+
+
+# ── Serialización ──────────────────────────────────────────────────────────
+
+def _single_numeric_dtype(df):
+    dtypes = set(df.dtypes)
+    return (len(dtypes) == 1 and df.shape[1] > 0
+            and all(isinstance(d, np.dtype) and d.kind in 'biuf' for d in dtypes))
+
+
+def _save(obj, entry, name):
+    """Guarda obj en entry y retorna la descripción para reconstruirlo."""
+    if isinstance(obj, tuple):
+        return ('tuple', [_save(o, entry, f'{name}_{i}') for i, o in enumerate(obj)])
+    if isinstance(obj, list) and any(isinstance(o, (pd.DataFrame, pd.Series, np.ndarray)) for o in obj):
+        return ('list', [_save(o, entry, f'{name}_{i}') for i, o in enumerate(obj)])
+    if isinstance(obj, dict) and any(isinstance(o, (pd.DataFrame, pd.Series, np.ndarray))
+                                     for o in obj.values()):
+        return ('dict', [(k, _save(v, entry, f'{name}_{i}')) for i, (k, v) in enumerate(obj.items())])
+    if isinstance(obj, pd.DataFrame):
+        if _single_numeric_dtype(obj):
+            np.save(entry / f'{name}.npy', obj.to_numpy())
+            return ('frame_npy', name, obj.index, obj.columns)
+        try:
+            obj.to_parquet(entry / f'{name}.parquet')
+            return ('frame_parquet', name)
+        except Exception:
+            pass
+    if isinstance(obj, pd.Series) and isinstance(obj.dtype, np.dtype) and obj.dtype.kind in 'biuf':
+        np.save(entry / f'{name}.npy', obj.to_numpy())
+        return ('series_npy', name, obj.index, obj.name)
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        np.save(entry / f'{name}.npy', obj)
+        return ('array', name)
+    return ('value', obj)
+
+
+def _load(spec, entry):
+    kind = spec[0]
+    if kind == 'tuple':
+        return tuple(_load(s, entry) for s in spec[1])
+    if kind == 'list':
+        return [_load(s, entry) for s in spec[1]]
+    if kind == 'dict':
+        return {k: _load(s, entry) for k, s in spec[1]}
+    if kind == 'frame_npy':
+        values = np.load(entry / f'{spec[1]}.npy', mmap_mode='c')
+        return pd.DataFrame(values, index=spec[2], columns=spec[3], copy=False)
+    if kind == 'frame_parquet':
+        return pd.read_parquet(entry / f'{spec[1]}.parquet')
+    if kind == 'series_npy':
+        values = np.load(entry / f'{spec[1]}.npy', mmap_mode='c')
+        return pd.Series(values, index=spec[2], name=spec[3], copy=False)
+    if kind == 'array':
+        return np.load(entry / f'{spec[1]}.npy', mmap_mode='c')
+    return spec[1]
+
+
+def _entry_size(entry):
+    return sum(p.stat().st_size for p in entry.iterdir() if p.is_file())
+
+
+def _evict(cache_dir, max_bytes, keep):
+    """Elimina las entradas con acceso más antiguo hasta quedar bajo max_bytes."""
+    entries = [e for e in cache_dir.iterdir() if e.is_dir()]
+    sizes = {e: _entry_size(e) for e in entries}
+    total = sum(sizes.values())
+    for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+        if total <= max_bytes:
+            break
+        if entry == keep:
+            continue
+        total -= sizes[entry]
+        shutil.rmtree(entry, ignore_errors=True)
+        print(f"  Caché: eliminada {entry.name} ({sizes[entry] / 1e6:,.1f} MB)")
+
+
+def cached(fn):
+    """Decorador: lee / escribe la salida del paso en la caché activa (ver enable_cache)."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache_dir = _CACHE['dir']
+        if cache_dir is None:
+            return fn(*args, **kwargs)
+
+        key = _cache_key(fn, args, kwargs)
+        entry = cache_dir / f'{fn.__name__}_{key}'
+        spec_path = entry / 'spec.pkl'
+
+        if spec_path.exists():
+            with open(spec_path, 'rb') as f:
+                result = _load(pickle.load(f), entry)
+            os.utime(entry)                      # marca de uso para la evicción LRU
+            record_stats(cache='hit')
+            print(f"✓ {fn.__name__}: salida leída de caché ({entry.name})")
+            return result
+
+        result = fn(*args, **kwargs)
+
+        tmp = cache_dir / f'.tmp_{entry.name}_{os.getpid()}'
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        try:
+            spec = _save(result, tmp, 'out')
+            with open(tmp / 'spec.pkl', 'wb') as f:
+                pickle.dump(spec, f, protocol=4)
+            (tmp / 'meta.json').write_text(json.dumps(
+                {'step': fn.__name__, 'key': key, 'created': time.time()}))
+            if entry.exists():
+                shutil.rmtree(entry)
+            tmp.rename(entry)
+        except Exception as exc:
+            shutil.rmtree(tmp, ignore_errors=True)
+            print(f"⚠️  {fn.__name__}: no se pudo guardar en caché ({type(exc).__name__}: {exc})")
+            return result
+
+        record_stats(cache='miss')
+        if _CACHE['max_bytes'] is not None:
+            _evict(cache_dir, _CACHE['max_bytes'], keep=entry)
+        return result
+
+    return wrapper
@@ -0,0 +1,375 @@
+"""
+Almacén de experimentos (SQLite, solo agregar)
+==============================================
+
+Un único archivo SQLite reemplaza los CSVs con timestamp de export_results como
+fuente para comparar corridas. Cada corrida agrega filas en:
+
+runs             — experimento, target, timestamp, parámetros e info extra (JSON)
+metrics          — una fila por métrica numérica (AUPRC, F1_Score, best_C …)
+coefficients     — ranking de get_coefficients
+cv_results       — tabla de tune_hyperparameters (params en JSON)
+threshold_curve  — curva de optimize_threshold
+coefficient_totals — sumas acumuladas de coeficientes por experimento / target / feature
+
+Las consultas (leaderboard, coefficient_stability) se resuelven en SQL sobre
+índices por experimento / target / métrica / feature, sin leer las corridas
+completas. El modo WAL permite que varios procesos (run_experiments) agreguen
+corridas a la vez.
+
+>>> export_results(RESULTS_DIR, EXPERIMENT_NAME, metrics, coeficientes,
+...                extra_info=extra, store_path=RESULTS_DIR / 'experiments.db',
+...                cv_results=cv_results, threshold_df=threshold_df)
+>>> leaderboard(RESULTS_DIR / 'experiments.db', metric='AUPRC', target='atypical_violence_iacv')
+"""
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    experiment  TEXT NOT NULL,
+    target      TEXT,
+    timestamp   TEXT NOT NULL,
+    params      TEXT,
+    extra       TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id  INTEGER NOT NULL REFERENCES runs(run_id),
+    name    TEXT NOT NULL,
+    value   REAL
+);
+CREATE TABLE IF NOT EXISTS coefficients (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id),
+    feature     TEXT NOT NULL,
+    coef        REAL,
+    abs_coef    REAL,
+    odds_ratio  REAL
+);
+CREATE TABLE IF NOT EXISTS cv_results (
+    run_id           INTEGER NOT NULL REFERENCES runs(run_id),
+    params           TEXT,
+    mean_test_score  REAL,
+    std_test_score   REAL,
+    mean_train_score REAL,
+    rank_test_score  INTEGER
+);
+CREATE TABLE IF NOT EXISTS threshold_curve (
+    run_id     INTEGER NOT NULL REFERENCES runs(run_id),
+    threshold  REAL,
+    f1         REAL,
+    precision  REAL,
+    recall     REAL,
+    n_alerts   INTEGER
+);
+-- Sumas acumuladas por (experimento, target, feature): estabilidad sin recorrer corridas
+CREATE TABLE IF NOT EXISTS coefficient_totals (
+    experiment  TEXT NOT NULL,
+    target      TEXT NOT NULL,
+    feature     TEXT NOT NULL,
+    n           INTEGER,
+    sum_coef    REAL,
+    sum_sq      REAL,
+    n_pos       INTEGER,
+    n_neg       INTEGER,
+    PRIMARY KEY (experiment, target, feature)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_experiment ON runs(experiment, timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_target     ON runs(target, timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp  ON runs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_metrics_name    ON metrics(name, value, run_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_run     ON metrics(run_id);
+CREATE INDEX IF NOT EXISTS idx_coef_feature    ON coefficients(feature, run_id);
+CREATE INDEX IF NOT EXISTS idx_coef_run        ON coefficients(run_id);
+CREATE INDEX IF NOT EXISTS idx_cv_run          ON cv_results(run_id);
+CREATE INDEX IF NOT EXISTS idx_curve_run       ON threshold_curve(run_id);
+"""
+
+
+def _connect(store_path):
+    store_path = Path(store_path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(store_path, timeout=60)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.execute('PRAGMA synchronous=NORMAL')
+    con.executescript(SCHEMA)
+    return con
+
+
+def _jsonable(v):
+    if isinstance(v, (np.integer, np.floating, np.bool_)):
+        return v.item()
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    return str(v)
+
+
+def _is_number(v):
+    return isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, (bool, np.bool_))
+
+
+def _column(df, name, default=None):
+    return df[name].to_numpy() if name in df else np.full(len(df), default, dtype=object)
+
+
+def _rows(*columns):
+    """Filas para executemany: None en lugar de NaN y tipos nativos de Python."""
+    out = []
+    for row in zip(*columns):
+        out.append(tuple(None if (isinstance(v, float) and np.isnan(v))
+                         else v.item() if isinstance(v, np.generic) else v for v in row))
+    return out
+
+
+def log_run(
+    store_path,
+    experiment_name,
+    metrics,
+    coeficientes=None,
+    cv_results=None,
+    threshold_df=None,
+    params=None,
+    extra_info=None,
+    target=None,
+    timestamp=None,
+):
+    """
+    Agrega una corrida al almacén (nunca modifica corridas anteriores).
+
+    Parámetros
+    ----------
+    store_path : str | Path
+        Archivo SQLite (se crea si no existe).
+    experiment_name : str
+    metrics : dict
+        Resultados de evaluate_model().
+    coeficientes : pd.DataFrame, optional   de get_coefficients().
+    cv_results : pd.DataFrame, optional     de tune_hyperparameters().
+    threshold_df : pd.DataFrame, optional   de optimize_threshold().
+    params : dict, optional
+        Configuración de la corrida (p. ej. las variables de la celda de configuración).
+    extra_info : dict, optional
+        Como en export_results: los campos numéricos se guardan también como métricas.
+    target : str, optional
+        Default: extra_info['target_col'] si existe.
+    timestamp : str, optional
+        Default: ahora (ISO 8601).
+
+    Retorna
+    -------
+    run_id : int
+    """
+    extra_info = dict(extra_info or {})
+    if target is None:
+        target = extra_info.get('target_col')
+    timestamp = timestamp or datetime.now().isoformat(timespec='seconds')
+
+    values = {**metrics, **extra_info}
+    numeric = [(k, float(v)) for k, v in values.items() if _is_number(v)]
+
+    with closing(_connect(store_path)) as con, con:
+        cur = con.execute(
+            'INSERT INTO runs (experiment, target, timestamp, params, extra) VALUES (?, ?, ?, ?, ?)',
+            (experiment_name, target, timestamp,
+             json.dumps(params or {}, default=_jsonable),
+             json.dumps(extra_info, default=_jsonable)),
+        )
+        run_id = cur.lastrowid
+        con.executemany('INSERT INTO metrics VALUES (?, ?, ?)',
+                        [(run_id, k, v) for k, v in numeric])
+
+        if coeficientes is not None and len(coeficientes):
+            c = coeficientes
+            con.executemany('INSERT INTO coefficients VALUES (?, ?, ?, ?, ?)', _rows(
+                np.full(len(c), run_id), c['Feature'].astype(str).to_numpy(),
+                _column(c, 'Coeficiente'), _column(c, 'Abs_Coef'), _column(c, 'Odds_Ratio')))
+            coef = c['Coeficiente'].to_numpy(dtype=np.float64)
+            con.executemany('''
+                INSERT INTO coefficient_totals VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT (experiment, target, feature) DO UPDATE SET
+                    n = n + 1, sum_coef = sum_coef + excluded.sum_coef,
+                    sum_sq = sum_sq + excluded.sum_sq,
+                    n_pos = n_pos + excluded.n_pos, n_neg = n_neg + excluded.n_neg
+            ''', _rows(np.full(len(c), experiment_name, dtype=object),
+                       np.full(len(c), target or '', dtype=object),
+                       c['Feature'].astype(str).to_numpy(), coef, coef ** 2,
+                       (coef > 0).astype(int), (coef < 0).astype(int)))
+
+        if cv_results is not None and len(cv_results):
+            cv = cv_results
+            params_col = ([json.dumps(p, default=_jsonable) for p in cv['params']]
+                          if 'params' in cv else [None] * len(cv))
+            con.executemany('INSERT INTO cv_results VALUES (?, ?, ?, ?, ?, ?)', _rows(
+                np.full(len(cv), run_id), params_col,
+                _column(cv, 'mean_test_score'), _column(cv, 'std_test_score'),
+                _column(cv, 'mean_train_score'), _column(cv, 'rank_test_score')))
+
+        if threshold_df is not None and len(threshold_df):
+            t = threshold_df
+            con.executemany('INSERT INTO threshold_curve VALUES (?, ?, ?, ?, ?, ?)', _rows(
+                np.full(len(t), run_id), _column(t, 'threshold'), _column(t, 'f1'),
+                _column(t, 'precision'), _column(t, 'recall'), _column(t, 'n_alerts')))
+    return run_id
+
+
+def query_store(store_path, sql, params=()):
+    """Ejecuta una consulta SQL arbitraria sobre el almacén y retorna un DataFrame."""
+    with closing(_connect(store_path)) as con:
+        return pd.read_sql_query(sql, con, params=params)
+
+
+def _run_filter(experiment=None, target=None, since=None, alias='r'):
+    clauses, params = [], []
+    if experiment is not None:
+        if isinstance(experiment, str) and experiment.endswith('*'):
+            clauses.append(f'{alias}.experiment LIKE ?')
+            params.append(experiment[:-1] + '%')
+        else:
+            clauses.append(f'{alias}.experiment = ?')
+            params.append(experiment)
+    if target is not None:
+        clauses.append(f'{alias}.target = ?')
+        params.append(target)
+    if since is not None:
+        clauses.append(f'{alias}.timestamp >= ?')
+        params.append(str(since))
+    return (' AND '.join(clauses) or '1'), params
+
+
+def leaderboard(
+    store_path,
+    metric='AUPRC',
+    experiment=None,
+    target=None,
+    since=None,
+    latest_only=True,
+    columns=('AUPRC', 'AUROC', 'F1_Score', 'Precision', 'Recall', 'Threshold',
+             'best_C', 'best_l1_ratio'),
+    top=20,
+):
+    """
+    Ranking de corridas por una métrica.
+
+    Parámetros
+    ----------
+    store_path : str | Path
+    metric : str
+        Métrica para ordenar (de mayor a menor).
+    experiment : str, optional
+        Nombre exacto o prefijo terminado en '*' (ej: 'en_iacv*').
+    target : str, optional
+    since : str, optional
+        Solo corridas con timestamp >= since (ISO, ej: '2025-01-01').
+    latest_only : bool
+        Solo la corrida más reciente de cada experimento y target (entre las
+        que cumplen experiment / target / since).
+    columns : tuple[str]
+        Métricas a mostrar como columnas.
+    top : int | None
+
+    Retorna
+    -------
+    board : pd.DataFrame  run_id, experiment, target, timestamp y una columna por métrica.
+    """
+    where, params = _run_filter(experiment, target, since)
+    if latest_only:
+        # La más reciente de cada experimento / target entre las corridas que pasan los filtros
+        latest, latest_params = _run_filter(experiment, target, since, alias='r2')
+        where += (' AND r.run_id = (SELECT MAX(r2.run_id) FROM runs r2 '
+                  'WHERE r2.experiment = r.experiment AND r2.target IS r.target '
+                  f'AND {latest})')
+        params += latest_params
+    columns = list(dict.fromkeys([metric, *columns]))
+    pivot = ', '.join(f'MAX(CASE WHEN m.name = ? THEN m.value END) AS "{c}"' for c in columns)
+    # Primero el ranking sobre el índice (name, value); el pivot solo para las corridas del top
+    sql = f"""
+        WITH ranked AS (
+            SELECT m.run_id, m.value
+            FROM metrics m JOIN runs r ON r.run_id = m.run_id
+            WHERE m.name = ? AND m.value IS NOT NULL AND {where}
+            ORDER BY m.value DESC
+            LIMIT ?
+        )
+        SELECT r.run_id, r.experiment, r.target, r.timestamp, {pivot}
+        FROM ranked k
+        JOIN runs r    ON r.run_id = k.run_id
+        JOIN metrics m ON m.run_id = k.run_id
+        GROUP BY k.run_id
+        ORDER BY k.value DESC
+    """
+    return query_store(store_path, sql, [metric, *params, -1 if top is None else int(top), *columns])
+
+
+def coefficient_stability(store_path, experiment=None, target=None, since=None, top=30):
+    """
+    Estabilidad de los coeficientes entre corridas.
+
+    Sin `since` se lee de las sumas acumuladas por experimento / target (tiempo
+    constante en el número de corridas); con `since` se agrega sobre las
+    corridas desde esa fecha.
+
+    Retorna
+    -------
+    stability : pd.DataFrame  por feature: n_runs, coef_mean, coef_std,
+        frac_nonzero (corridas con coeficiente ≠ 0), frac_positive y
+        sign_consistency (fracción de corridas con el signo mayoritario,
+        sobre las no nulas); ordenado por |coef_mean|.
+    """
+    if since is None:
+        where, params = _run_filter(experiment, target)
+        sql = f"""
+            SELECT feature, SUM(n) AS n_runs, SUM(sum_coef) AS s, SUM(sum_sq) AS ss,
+                   SUM(n_pos) AS n_pos, SUM(n_neg) AS n_neg
+            FROM coefficient_totals r
+            WHERE {where}
+            GROUP BY feature
+        """
+    else:
+        where, params = _run_filter(experiment, target, since)
+        sql = f"""
+            SELECT c.feature, COUNT(*) AS n_runs, SUM(c.coef) AS s, SUM(c.coef * c.coef) AS ss,
+                   SUM(CASE WHEN c.coef > 0 THEN 1 ELSE 0 END) AS n_pos,
+                   SUM(CASE WHEN c.coef < 0 THEN 1 ELSE 0 END) AS n_neg
+            FROM coefficients c JOIN runs r ON r.run_id = c.run_id
+            WHERE {where}
+            GROUP BY c.feature
+        """
+    df = query_store(store_path, sql, params)
+    n = df['n_runs']
+    df['coef_mean'] = df['s'] / n
+    ss_dev = (df['ss'] - n * df['coef_mean'] ** 2).clip(lower=0)
+    df['coef_std'] = np.sqrt(ss_dev / (n - 1).where(n > 1))
+    nonzero = df['n_pos'] + df['n_neg']
+    df['frac_nonzero'] = nonzero / n
+    df['frac_positive'] = df['n_pos'] / n
+    df['sign_consistency'] = (np.maximum(df['n_pos'], df['n_neg']) / nonzero).where(nonzero > 0)
+    df = df[['feature', 'n_runs', 'coef_mean', 'coef_std', 'frac_nonzero',
+             'frac_positive', 'sign_consistency']]
+    df = df.reindex(df['coef_mean'].abs().sort_values(ascending=False).index)
+    return df.head(top).reset_index(drop=True) if top is not None else df.reset_index(drop=True)
+
+
+def load_run(store_path, run_id):
+    """Todo lo guardado de una corrida: dict con run, metrics, coefficients, cv_results, threshold_curve."""
+    out = {}
+    with closing(_connect(store_path)) as con:
+        run = pd.read_sql_query('SELECT * FROM runs WHERE run_id = ?', con, params=(run_id,))
+        if run.empty:
+            raise KeyError(f"run_id {run_id} no existe en {store_path}")
+        out['run'] = {**run.iloc[0].to_dict(),
+                      'params': json.loads(run.iloc[0]['params'] or '{}'),
+                      'extra': json.loads(run.iloc[0]['extra'] or '{}')}
+        m = pd.read_sql_query('SELECT name, value FROM metrics WHERE run_id = ?', con, params=(run_id,))
+        out['metrics'] = dict(zip(m['name'], m['value']))
+        for table in ('coefficients', 'cv_results', 'threshold_curve'):
+            out[table] = pd.read_sql_query(
+                f'SELECT * FROM {table} WHERE run_id = ?', con, params=(run_id,)
+            ).drop(columns='run_id')
+    return out
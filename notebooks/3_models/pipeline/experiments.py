@@ -0,0 +1,351 @@
+"""
+Ejecución en lote de varios experimentos sobre un mismo panel
+=============================================================
+
+Cada experimento es un dict con las mismas variables de la celda de
+configuración de los notebooks en_0X (EXPERIMENT_NAME, TARGET_COL,
+FEATURE_COLS / COLS_TO_EXCLUDE, TRAIN_PROP …, PARAM_GRID, THRESHOLD_* …).
+Las claves que falten toman el valor de DEFAULT_CONFIG.
+
+run_experiments:
+1. Carga el panel una sola vez y lo copia a un bloque de memoria compartida
+   (multiprocessing.shared_memory): los procesos hijos lo leen sin copiarlo.
+2. Reparte los experimentos en un pool de procesos respetando un presupuesto
+   global de CPUs (procesos × hilos por proceso ≤ cpu_budget).
+3. Cada experimento corre el pipeline completo en modo silencioso y guarda sus
+   resultados con export_results; el proceso principal retorna el resumen.
+
+>>> configs = [
+...     {'EXPERIMENT_NAME': 'en_iacv',  'TARGET_COL': 'atypical_violence_iacv'},
+...     {'EXPERIMENT_NAME': 'en_iacv2', 'TARGET_COL': 'atypical_violence_iacv2'},
+... ]
+>>> summary = run_experiments(configs, DATA_PATH, results_dir=model_out, cpu_budget=16)
+"""
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import set_quiet
+from .step01_data_loading import load_data
+from .step03_temporal_splits import create_temporal_splits
+from .step04_feature_preparation import prepare_features
+from .step05_imputation import impute_missing
+from .step06_scaling import scale_features
+from .step07_hyperparameter_tuning import DEFAULT_PARAM_GRID, tune_hyperparameters
+from .step08_threshold_optimization import optimize_threshold
+from .step09_evaluation import evaluate_model
+from .step10_interpretability import get_coefficients
+from .step11_export import export_results
+
+
+# Mismos valores que la celda de configuración de los notebooks
+DEFAULT_CONFIG = {
+    'EXPERIMENT_NAME':      'experimento',
+    'TARGET_COL':           'atypical_violence_iacv',
+    'TIME_COL':             'quarter',
+    'MUNICIPALITY_COL':     'mun_code',
+    'FEATURE_COLS':         None,
+    'COLS_TO_EXCLUDE':      None,
+    'TRAIN_PROP':           0.70,
+    'VAL_PROP':             0.15,
+    'TEST_PROP':            0.15,
+    'USE_YEAR_SPLITS':      False,
+    'TRAIN_END_YEAR':       None,
+    'TRAIN_END_QUARTER':    None,
+    'VAL_END_YEAR':         None,
+    'VAL_END_QUARTER':      None,
+    'PARAM_GRID':           DEFAULT_PARAM_GRID,
+    'N_CV_SPLITS':          5,
+    'CV_SCORING':           'f1',
+    'RANDOM_STATE':         42,
+    'THRESHOLD_RANGE':      (0.1, 0.9),
+    'THRESHOLD_STEP':       0.05,
+    'THRESHOLD_METRIC':     'f1',
+    'NUMERIC_STRATEGY':     'median',   # o 'panel' (historia de cada municipio)
+    'CATEGORICAL_STRATEGY': 'most_frequent',
+    'RESULTS_DIR':          None,
+    'STORE_PATH':           None,   # almacén SQLite (default: RESULTS_DIR/experiments.sqlite)
+}
+
+
+def run_experiment(df, config, n_jobs=-1):
+    """
+    Corre el pipeline completo (pasos 03–11) de un experimento sobre un panel cargado.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Salida de load_data.
+    config : dict
+        Variables de configuración (ver DEFAULT_CONFIG). RESULTS_DIR es obligatoria.
+    n_jobs : int
+        Procesos / hilos para el tuning y el bootstrap.
+
+    Retorna
+    -------
+    summary : dict  métricas de test, hiperparámetros y rutas exportadas.
+    """
+    cfg = {**DEFAULT_CONFIG, **config}
+    if cfg['RESULTS_DIR'] is None:
+        raise ValueError(f"{cfg['EXPERIMENT_NAME']}: falta RESULTS_DIR")
+
+    split_kwargs = {}
+    if cfg['USE_YEAR_SPLITS']:
+        split_kwargs = dict(
+            train_end_year=cfg['TRAIN_END_YEAR'], train_end_quarter=cfg['TRAIN_END_QUARTER'],
+            val_end_year=cfg['VAL_END_YEAR'], val_end_quarter=cfg['VAL_END_QUARTER'],
+        )
+    splits = create_temporal_splits(
+        df,
+        time_col=cfg['TIME_COL'],
+        train_prop=cfg['TRAIN_PROP'],
+        val_prop=cfg['VAL_PROP'],
+        test_prop=cfg['TEST_PROP'],
+        use_year_splits=cfg['USE_YEAR_SPLITS'],
+        **split_kwargs,
+    )
+    train_mask, val_mask, test_mask = splits['train_mask'], splits['val_mask'], splits['test_mask']
+
+    X, y, feature_cols = prepare_features(
+        df,
+        target_col=cfg['TARGET_COL'],
+        municipality_col=cfg['MUNICIPALITY_COL'],
+        time_col=cfg['TIME_COL'],
+        cols_to_exclude=cfg['COLS_TO_EXCLUDE'],
+        feature_cols=cfg['FEATURE_COLS'],
+    )
+    X_train, y_train = X[train_mask], y[train_mask]
+    X_val,   y_val   = X[val_mask],   y[val_mask]
+    X_test,  y_test  = X[test_mask],  y[test_mask]
+
+    X_train, X_val, X_test, _ = impute_missing(
+        X_train, X_val, X_test,
+        numeric_strategy=cfg['NUMERIC_STRATEGY'],
+        categorical_strategy=cfg['CATEGORICAL_STRATEGY'],
+        panel_ids=(df[[cfg['MUNICIPALITY_COL'], cfg['TIME_COL']]]
+                   if cfg['NUMERIC_STRATEGY'] == 'panel' else None),
+    )
+    X_train_sc, X_val_sc, X_test_sc, _ = scale_features(X_train, X_val, X_test, feature_cols)
+
+    best_model, cv_results = tune_hyperparameters(
+        pd.concat([X_train_sc, X_val_sc]), pd.concat([y_train, y_val]),
+        param_grid=cfg['PARAM_GRID'],
+        n_cv_splits=cfg['N_CV_SPLITS'],
+        scoring=cfg['CV_SCORING'],
+        random_state=cfg['RANDOM_STATE'],
+        n_jobs=n_jobs,
+    )
+    best_threshold, threshold_df = optimize_threshold(
+        best_model, X_val_sc, y_val,
+        threshold_range=cfg['THRESHOLD_RANGE'],
+        threshold_step=cfg['THRESHOLD_STEP'],
+        optimize_metric=cfg['THRESHOLD_METRIC'],
+        plot=False,
+    )
+    metrics, _, _ = evaluate_model(best_model, X_test_sc, y_test,
+                                   threshold=best_threshold, plot=False, n_jobs=n_jobs)
+    coeficientes = get_coefficients(best_model, feature_cols, plot=False)
+
+    extra = {
+        'n_features':    len(feature_cols),
+        'train_size':    len(y_train),
+        'val_size':      len(y_val),
+        'test_size':     len(y_test),
+        'train_prev':    float(y_train.mean()),
+        'val_prev':      float(y_val.mean()),
+        'test_prev':     float(y_test.mean()),
+        'best_C':        best_model.C,
+        'best_l1_ratio': best_model.l1_ratio,
+        'cv_scoring':    cfg['CV_SCORING'],
+        'target_col':    cfg['TARGET_COL'],
+    }
+    paths = export_results(
+        results_dir=cfg['RESULTS_DIR'],
+        experiment_name=cfg['EXPERIMENT_NAME'],
+        metrics=metrics,
+        coeficientes=coeficientes,
+        extra_info=extra,
+        store_path=cfg['STORE_PATH'],
+        cv_results=cv_results,
+        threshold_df=threshold_df,
+        params=cfg,
+    )
+    return {**metrics, **extra, 'metrics_path': paths['metrics'],
+            'coeficientes_path': paths['coeficientes'], 'store_path': paths['store'],
+            'run_id': paths['run_id']}
+
+
+# ── Panel en memoria compartida ────────────────────────────────────────────
+
+def _share_panel(df):
+    """
+    Copia las columnas de df a un único bloque de memoria compartida.
+
+    Columnas numéricas / booleanas / fechas van tal cual; las demás (strings,
+    categorías, Period, enteros nullable) como códigos enteros + categorías.
+    Retorna el bloque y el layout para reconstruir el DataFrame en otro proceso.
+    """
+    arrays, layout = [], []
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, np.dtype) and s.dtype.kind in 'biufM':
+            values, meta = s.to_numpy(), ('array', None)
+        elif pd.api.types.is_numeric_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype):
+            values, meta = s.to_numpy(dtype=np.float64, na_value=np.nan), ('array', None)
+        else:
+            cat = s.astype('category') if not isinstance(s.dtype, pd.CategoricalDtype) else s
+            kind = 'category' if isinstance(s.dtype, pd.CategoricalDtype) else 'object'
+            values = cat.cat.codes.to_numpy()
+            meta = (kind, (cat.cat.categories, cat.cat.ordered))
+        arrays.append(np.ascontiguousarray(values))
+        layout.append([col, meta])
+
+    offsets, total = [], 0
+    for a in arrays:
+        offsets.append(total)
+        total += -(-a.nbytes // 64) * 64          # alineado a 64 bytes
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+    for a, off, entry in zip(arrays, offsets, layout):
+        np.ndarray(a.shape, a.dtype, buffer=shm.buf, offset=off)[:] = a
+        entry += [a.dtype.str, a.shape, off]
+    return shm, {'layout': layout, 'index': df.index}
+
+
+def _attach_panel(name, spec):
+    """Reconstruye el DataFrame sobre el bloque compartido (sin copiar columnas numéricas)."""
+    # Los hijos comparten el resource_tracker del padre: el bloque solo lo libera el padre
+    shm = shared_memory.SharedMemory(name=name)
+
+    columns = {}
+    for col, (kind, extra), dtype, shape, off in spec['layout']:
+        values = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=off)
+        values.flags.writeable = False
+        if kind == 'array':
+            columns[col] = values
+        elif kind == 'category':
+            categories, ordered = extra
+            columns[col] = pd.Categorical.from_codes(values, categories=categories, ordered=ordered)
+        else:
+            categories, _ = extra
+            out = np.asarray(categories, dtype=object).take(np.where(values < 0, 0, values))
+            out[values < 0] = None
+            columns[col] = out
+    df = pd.DataFrame(columns, index=spec['index'], copy=False)
+    return shm, df
+
+
+_WORKER = {}
+
+
+def _init_worker(shm_name, spec, threads):
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(threads)
+    set_quiet(True)
+    _WORKER['shm'], _WORKER['df'] = _attach_panel(shm_name, spec)
+    _WORKER['threads'] = threads
+
+
+def _run_in_worker(config):
+    start = time.perf_counter()
+    try:
+        summary = run_experiment(_WORKER['df'], config, n_jobs=_WORKER['threads'])
+        status = 'ok'
+    except Exception as exc:
+        summary = {'traceback': traceback.format_exc()}
+        status = f'error: {type(exc).__name__}: {exc}'
+    return {'experiment': config.get('EXPERIMENT_NAME'), 'status': status,
+            'wall_s': time.perf_counter() - start, **summary}
+
+
+def _needed_columns(configs):
+    """Columnas a cargar (None = todas si algún experimento selecciona por exclusión)."""
+    cols = set()
+    for cfg in configs:
+        cfg = {**DEFAULT_CONFIG, **cfg}
+        if cfg['FEATURE_COLS'] is None:
+            return None
+        cols.update(cfg['FEATURE_COLS'])
+        cols.add(cfg['TARGET_COL'])
+    return sorted(cols)
+
+
+def run_experiments(
+    configs,
+    data_path,
+    results_dir=None,
+    store_path=None,
+    cpu_budget=None,
+    n_workers=None,
+    time_col='quarter',
+    municipality_col='mun_code',
+):
+    """
+    Corre varios experimentos en paralelo compartiendo un solo panel cargado.
+
+    Parámetros
+    ----------
+    configs : list[dict]
+        Un dict por experimento (ver DEFAULT_CONFIG). Los EXPERIMENT_NAME deben
+        ser únicos.
+    data_path : str | Path
+        db.parquet o la carpeta del dataset particionado.
+    results_dir : str | Path, optional
+        RESULTS_DIR para los experimentos que no lo indiquen.
+    store_path : str | Path, optional
+        STORE_PATH (almacén SQLite) para los experimentos que no lo indiquen.
+    cpu_budget : int, optional
+        CPUs totales a usar (default: todas).
+    n_workers : int, optional
+        Procesos en paralelo (default: min(experimentos, cpu_budget)). Cada uno
+        usa cpu_budget // n_workers hilos.
+    time_col, municipality_col : str
+
+    Retorna
+    -------
+    summary : pd.DataFrame  una fila por experimento (status, wall_s, métricas,
+              hiperparámetros, rutas de export_results), en el orden de configs.
+    """
+    names = [c.get('EXPERIMENT_NAME') for c in configs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"EXPERIMENT_NAME repetidos: {names}")
+    configs = [{'RESULTS_DIR': results_dir, 'STORE_PATH': store_path, 'TIME_COL': time_col,
+                'MUNICIPALITY_COL': municipality_col, **c} for c in configs]
+
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    n_workers = max(1, min(n_workers or len(configs), cpu_budget, len(configs)))
+    threads = max(1, cpu_budget // n_workers)
+
+    df = load_data(data_path, time_col=time_col, municipality_col=municipality_col,
+                   columns=_needed_columns(configs))
+    shm, spec = _share_panel(df)
+    del df
+    print(f"✓ Panel en memoria compartida: {shm.size / 1e6:,.1f} MB")
+    print(f"Experimentos: {len(configs)} | procesos: {n_workers} × {threads} hilos "
+          f"(presupuesto: {cpu_budget} CPUs)")
+
+    rows = {}
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(shm.name, spec, threads)) as pool:
+            futures = {pool.submit(_run_in_worker, cfg): i for i, cfg in enumerate(configs)}
+            for future in as_completed(futures):
+                row = future.result()
+                rows[futures[future]] = row
+                detail = (f"AUPRC={row['AUPRC']:.4f} | F1={row['F1_Score']:.4f}"
+                          if row['status'] == 'ok' else row['status'])
+                print(f"  [{len(rows)}/{len(configs)}] {row['experiment']:30s} "
+                      f"{row['wall_s']:7.1f} s  {detail}")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    print(f"✓ {sum(r['status'] == 'ok' for r in rows.values())} de {len(configs)} experimentos "
+          f"en {time.perf_counter() - start:,.1f} s")
+    return pd.DataFrame([rows[i] for i in range(len(configs))])
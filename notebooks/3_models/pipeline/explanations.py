@@ -0,0 +1,237 @@
+"""
+Explicación de alertas por municipio (modelos lineales)
+=======================================================
+
+get_coefficients da los coeficientes globales; aquí se descompone el logit de
+cada municipio puntuado en aportes por feature:
+
+    logit_i = intercepto + Σ_j coef_j · x_ij escalado
+
+con x imputado y estandarizado exactamente como en score_quarter. Todo el
+trimestre se resuelve con una sola multiplicación elemento a elemento
+(n_municipios × n_features); los top-k de cada fila salen de argpartition
+sobre la matriz completa, sin bucles por municipio.
+
+Los aportes se pueden agregar por familia de features (rezagos de violencia,
+luces nocturnas, demografía …) con una matriz de pertenencia feature → familia:
+
+>>> families = {'violencia':  ['t_01', 't_02', 'ia', 'igc', 'iif'],
+...             'luces':      ['ntl'],
+...             'demografía': ['population', 'women_share']}
+>>> drivers = explain_alerts('modelo.joblib', DATA_PATH, period='2024Q4',
+...                          top_k=3, families=families)
+
+Como pipeline.scoring, este módulo no importa matplotlib ni seaborn.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from .feature_engineering import ROLLING_STATS
+from .instrumentation import instrumented, record_stats
+from .scoring import _panel_imputed, _quarter_rows, _scaled, load_bundle, predict_proba
+
+
+INTERCEPT = '(intercepto)'
+OTHER_FAMILY = 'otras'
+
+# Sufijos de build_lag_features: rezagos (_r4) y ventanas móviles (_mean_w8)
+_SUFFIX = re.compile(rf"_(r\d+|({'|'.join(ROLLING_STATS)})_w\d+)$")
+
+
+def _contributions(bundle, X):
+    """(aportes n × p, intercepto) del modelo lineal del bundle sobre las filas de X."""
+    model = bundle['model']
+    coef = getattr(model, 'coef_', None)
+    if coef is None or coef.shape[0] != 1:
+        raise ValueError(f"explain_alerts requiere un modelo lineal binario, no "
+                         f"{type(model).__name__} (ver get_coefficients)")
+
+    X = _panel_imputed(bundle, X)
+    linear = bundle['linear']
+    if linear is not None:
+        scaler = bundle['scaler']
+        n_cols = len(bundle['feature_cols'])
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_cols)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_cols)
+        values = np.asarray(X[bundle['feature_cols']], dtype=np.float64)
+        values = np.where(np.isnan(values), linear['fill'], values)
+        X_sc = (values - mean) / scale
+    else:
+        X_sc = np.asarray(_scaled(bundle, X), dtype=np.float64)
+    return X_sc * coef[0], float(model.intercept_[0])
+
+
+def feature_family(feature_cols, families='base'):
+    """
+    Familia de cada feature.
+
+    Parámetros
+    ----------
+    feature_cols : list[str]
+    families : 'base' | dict[str, list[str]]
+        'base' agrupa los rezagos y ventanas móviles de una misma variable
+        (t_01_r1, t_01_mean_w4 → t_01). Un dict asigna cada familia a una lista
+        de variables o prefijos: una feature pertenece a la primera familia con
+        un prefijo p tal que feature == p o feature empieza por p + '_'. Las no
+        asignadas quedan en 'otras'.
+
+    Retorna
+    -------
+    family : pd.Series  (índice = feature_cols)
+    """
+    feature_cols = list(feature_cols)
+    if isinstance(families, str):
+        if families != 'base':
+            raise ValueError(f"families debe ser 'base' o un dict, no {families!r}")
+        return pd.Series([_SUFFIX.sub('', f) for f in feature_cols], index=feature_cols)
+
+    family = pd.Series(OTHER_FAMILY, index=feature_cols, dtype=object)
+    assigned = np.zeros(len(feature_cols), dtype=bool)
+    names = family.index.to_series()
+    for name, prefixes in families.items():
+        prefixes = [prefixes] if isinstance(prefixes, str) else list(prefixes)
+        match = names.isin(prefixes) | names.str.startswith(tuple(f'{p}_' for p in prefixes))
+        match = match.to_numpy() & ~assigned
+        family[match] = name
+        assigned |= match
+    return family
+
+
+def feature_contributions(bundle, X, families=None):
+    """
+    Aportes al logit de cada fila de X (una columna por feature o familia).
+
+    Parámetros
+    ----------
+    bundle : str | Path | dict  (ver save_bundle)
+    X : pd.DataFrame  con las feature_cols del bundle, sin imputar ni escalar.
+    families : 'base' | dict, optional
+        Agrega los aportes por familia (ver feature_family).
+
+    Retorna
+    -------
+    contributions : pd.DataFrame
+        Mismo índice que X; columnas = features (o familias) + '(intercepto)'.
+        Cada fila suma el logit del modelo.
+    """
+    if not isinstance(bundle, dict):
+        bundle = load_bundle(bundle)
+    contrib, intercept = _contributions(bundle, X)
+    columns = list(bundle['feature_cols'])
+    if families is not None:
+        contrib, columns = _aggregate(contrib, feature_family(columns, families))
+    out = pd.DataFrame(contrib, columns=columns, index=X.index)
+    out[INTERCEPT] = intercept
+    return out
+
+
+def _aggregate(contrib, family):
+    """Suma las columnas de contrib por familia con un producto por la matriz de pertenencia."""
+    codes, names = pd.factorize(family, sort=False)
+    membership = np.zeros((len(codes), len(names)))
+    membership[np.arange(len(codes)), codes] = 1.0
+    return contrib @ membership, list(names)
+
+
+def _top_k(contrib, k, by):
+    """Índices de columna de los k mayores aportes de cada fila, ordenados."""
+    key = np.abs(contrib) if by == 'abs' else contrib
+    k = min(k, key.shape[1])
+    idx = np.argpartition(-key, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(key, idx, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1)
+
+
+@instrumented
+def explain_alerts(
+    bundle,
+    data,
+    period=None,
+    top_k=5,
+    families=None,
+    alerts_only=True,
+    by='contribution',
+):
+    """
+    Principales factores de riesgo de cada municipio puntuado en un trimestre.
+
+    Parámetros
+    ----------
+    bundle : str | Path | dict
+        Bundle de un modelo lineal (ver save_bundle).
+    data : pd.DataFrame | str | Path
+        Panel o ruta para load_data, como en score_quarter.
+    period : str, optional
+        Trimestre 'YYYYQN'. Default: el más reciente presente en data.
+    top_k : int
+        Factores por municipio.
+    families : 'base' | dict, optional
+        Agrega los aportes por familia de features antes de elegir los top-k
+        (ver feature_family).
+    alerts_only : bool
+        Solo los municipios con alerta (proba ≥ threshold del bundle).
+    by : str
+        'contribution' — los aportes que más suben el riesgo;
+        'abs'          — los de mayor magnitud, en cualquier sentido.
+
+    Retorna
+    -------
+    drivers : pd.DataFrame
+        Una fila por municipio y factor: municipio, trimestre, proba, rank (de
+        score_quarter), factor (1 = principal), feature (o familia), valor
+        (sin imputar, salvo con imputers['panel']; NaN para familias) y aporte
+        al logit. Ordenado por rank y factor.
+    """
+    if by not in ('contribution', 'abs'):
+        raise ValueError(f"by debe ser 'contribution' o 'abs', no {by!r}")
+    if not isinstance(bundle, dict):
+        bundle = load_bundle(bundle)
+    mun_col, time_col = bundle['municipality_col'], bundle['time_col']
+    rows, period = _quarter_rows(bundle, data, period)
+
+    proba = predict_proba(bundle, rows)
+    order = np.argsort(-proba, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(1, len(order) + 1)
+    keep = order[proba[order] >= bundle['threshold']] if alerts_only else order
+    rows = rows.iloc[keep]
+
+    contrib, intercept = _contributions(bundle, rows)
+    names = np.asarray(bundle['feature_cols'], dtype=object)
+    values = rows[bundle['feature_cols']].to_numpy(dtype=np.float64, na_value=np.nan)
+    if families is not None:
+        contrib, names = _aggregate(contrib, feature_family(names, families))
+        names = np.asarray(names, dtype=object)
+        values = None
+
+    n, k = len(rows), min(top_k, len(names))
+    if n == 0 or k == 0:
+        top = np.empty((n, 0), dtype=np.int64)
+    else:
+        top = _top_k(contrib, k, by)
+    k = top.shape[1]
+    row_idx = np.repeat(np.arange(n), k)
+    col_idx = top.ravel()
+    drivers = pd.DataFrame({
+        mun_col:   rows[mun_col].to_numpy()[row_idx],
+        time_col:  period,
+        'proba':   proba[keep][row_idx],
+        'rank':    rank[keep][row_idx],
+        'factor':  np.tile(np.arange(1, k + 1), n),
+        'feature': names[col_idx],
+        'valor':   values[row_idx, col_idx] if values is not None else np.nan,
+        'aporte':  contrib[row_idx, col_idx],
+    })
+
+    record_stats(n_explained=n, n_alerts=int((proba >= bundle['threshold']).sum()))
+    print(f"✓ {period}: {n:,} municipios explicados "
+          f"({'alertas' if alerts_only else 'todos'}) | top {k} "
+          f"{'familias' if families is not None else 'features'} | intercepto {intercept:+.3f}")
+    if n:
+        freq = drivers.loc[drivers['factor'] == 1, 'feature'].value_counts().head(5)
+        print("  Factor principal más frecuente:")
+        for name, count in freq.items():
+            print(f"    {name:<30} {count:>6,} municipios")
+    return drivers
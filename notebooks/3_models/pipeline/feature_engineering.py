@@ -0,0 +1,159 @@
+"""
+Rezagos y ventanas móviles sobre el cubo municipio × trimestre × variable
+=========================================================================
+
+Sustituye los groupby('mun_code')[col].shift(lag) repetidos de indexes.ipynb:
+todas las variables y todos los rezagos / estadísticos móviles se calculan a la
+vez con desplazamientos sobre el eje temporal de un arreglo denso.
+
+- Los huecos del panel (trimestres sin fila para un municipio) quedan en NaN en
+  el cubo, así que un rezago nunca toma el valor de otro trimestre por error.
+- Las ventanas móviles terminan en t-1 (solo información pasada) y exigen la
+  ventana completa, igual que rolling(w) de pandas sobre la serie rezagada.
+
+Ejemplo de spec
+---------------
+>>> spec = {
+...     'columns': ['iacv', 'iacv2', 't_01'],
+...     'lags':    list(range(1, 9)),
+...     'rolling': {'mean': [4, 8], 'std': [4, 8], 'max': [4, 8]},
+... }
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .panel import panel_to_cube
+from .instrumentation import instrumented
+
+
+FEATURES_VERSION = '1'  # Cambiar si cambia la forma de calcular los features
+
+ROLLING_STATS = {
+    'mean': lambda w: w.mean(axis=-1),
+    'std':  lambda w: w.std(axis=-1, ddof=1),
+    'max':  lambda w: w.max(axis=-1),
+    'min':  lambda w: w.min(axis=-1),
+    'sum':  lambda w: w.sum(axis=-1),
+}
+
+
+def feature_names(spec):
+    """Nombres de columnas que genera un spec, en el orden de salida."""
+    names = []
+    for col in spec['columns']:
+        names += [f'{col}_r{k}' for k in spec.get('lags', [])]
+        for stat, windows in spec.get('rolling', {}).items():
+            names += [f'{col}_{stat}_w{w}' for w in windows]
+    return names
+
+
+def _cache_key(df, spec, municipality_col, time_col, dtype):
+    cols = [municipality_col, time_col] + list(spec['columns'])
+    h = hashlib.sha256()
+    h.update(json.dumps(spec, sort_keys=True, default=list).encode())
+    h.update(f'{FEATURES_VERSION}|{np.dtype(dtype).name}|{cols}'.encode())
+    h.update(pd.util.hash_pandas_object(df[cols].astype({time_col: str}), index=False)
+             .to_numpy().tobytes())
+    return h.hexdigest()[:24]
+
+
+def _compute_cube(cube, spec):
+    """
+    Features sobre el cubo (municipios × trimestres × variables).
+
+    Retorna un arreglo (municipios, trimestres, variables × features) cuyo último
+    eje sigue el orden de feature_names: por variable, luego rezagos y ventanas.
+    """
+    n_mun, n_per, n_var = cube.shape
+    lags = list(spec.get('lags', []))
+    rolling = spec.get('rolling', {})
+    unknown = set(rolling) - set(ROLLING_STATS)
+    if unknown:
+        raise ValueError(f"Estadísticos móviles no soportados: {sorted(unknown)}")
+
+    n_feat = len(lags) + sum(len(w) for w in rolling.values())
+    out = np.full((n_mun, n_per, n_var, n_feat), np.nan, dtype=cube.dtype)
+
+    for f, k in enumerate(lags):
+        if k < n_per:
+            out[:, k:, :, f] = cube[:, :n_per - k]
+
+    f = len(lags)
+    if rolling:
+        # Serie rezagada un trimestre: la ventana que termina en t-1
+        prev = np.full_like(cube, np.nan)
+        prev[:, 1:] = cube[:, :-1]
+        for stat, windows in rolling.items():
+            for w in windows:
+                if w <= n_per:
+                    win = sliding_window_view(prev, w, axis=1)   # (n_mun, n_per-w+1, n_var, w)
+                    out[:, w - 1:, :, f] = ROLLING_STATS[stat](win)
+                f += 1
+
+    return out.reshape(n_mun, n_per, n_var * n_feat)
+
+
+@instrumented
+def build_lag_features(
+    df,
+    spec,
+    municipality_col='mun_code',
+    time_col='quarter',
+    cache_dir=None,
+    dtype=np.float64,
+):
+    """
+    Genera rezagos y estadísticos móviles por municipio para varias columnas.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Panel largo (una fila por municipio-trimestre).
+    spec : dict
+        columns : list[str]                 — variables base.
+        lags    : list[int]                 — rezagos (→ <col>_r<k>).
+        rolling : dict[str, list[int]]      — {'mean'|'std'|'max'|'min'|'sum': ventanas}
+                                              (→ <col>_<stat>_w<w>).
+    municipality_col, time_col : str
+    cache_dir : str | Path, optional
+        Si se indica, los features se guardan en Parquet con una llave derivada
+        del spec y del contenido de las columnas usadas; una segunda llamada
+        con los mismos datos y spec solo lee el archivo.
+    dtype : np.dtype
+        Tipo de los features (np.float32 reduce la memoria a la mitad).
+
+    Retorna
+    -------
+    features : pd.DataFrame
+        Una columna por feature (ver feature_names), mismo índice que df.
+    """
+    names = feature_names(spec)
+
+    cache_path = None
+    if cache_dir is not None:
+        key = _cache_key(df, spec, municipality_col, time_col, dtype)
+        cache_path = Path(cache_dir) / f'features_{key}.parquet'
+        if cache_path.exists():
+            features = pd.read_parquet(cache_path).set_axis(df.index)
+            print(f"✓ Features desde caché: {len(names)} columnas ({cache_path.name})")
+            return features
+
+    cube, index = panel_to_cube(df, list(spec['columns']), municipality_col, time_col, dtype=dtype)
+    feats = _compute_cube(cube, spec)
+
+    rows = feats[index['mun_idx'], index['period_idx']]
+    features = pd.DataFrame(rows, columns=names, index=df.index)
+
+    n_gaps = cube.shape[0] * cube.shape[1] - len(df)
+    print(f"✓ Features generados: {len(names)} columnas × {len(df):,} filas "
+          f"({cube.shape[0]} municipios × {cube.shape[1]} trimestres, {n_gaps:,} celdas sin fila)")
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        features.reset_index(drop=True).to_parquet(cache_path, index=False)
+    return features
@@ -0,0 +1,156 @@
+"""
+Imputación + estandarización por fold para validación cruzada de ventana expansiva
+==================================================================================
+
+En TimeSeriesSplit cada fold de entrenamiento es un prefijo del anterior, así que
+las estadísticas de cada fold se obtienen acumulando bloques en lugar de
+reajustar SimpleImputer + StandardScaler desde cero:
+
+- medias y varianzas: conteo, media y M2 por bloque, combinados hacia adelante
+  (fórmula de Chan) — una pasada por los datos para todos los folds.
+- medianas: cada columna se ordena una sola vez; la mediana de un prefijo sale
+  de los conteos acumulados de las filas del prefijo sobre ese orden.
+
+Las estadísticas de un fold solo usan sus filas de entrenamiento, de modo que el
+fold de validación se transforma sin leakage, igual que impute_missing +
+scale_features en el split final.
+"""
+import numpy as np
+
+from .instrumentation import instrumented
+
+
+def _merge(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Combina (n, media, M2) de dos bloques disjuntos, columna por columna."""
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(n > 0, mean_a + delta * n_b / n, 0.0)
+        m2 = m2_a + m2_b + np.where(n > 0, delta ** 2 * n_a * n_b / n, 0.0)
+    return n, mean, m2
+
+
+def _block_moments(block):
+    """Conteo, media y M2 de los valores no nulos de un bloque (filas × columnas)."""
+    valid = ~np.isnan(block)
+    n = valid.sum(axis=0).astype(np.float64)
+    filled = np.where(valid, block, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, filled.sum(axis=0) / n, 0.0)
+    m2 = (np.where(valid, block - mean, 0.0) ** 2).sum(axis=0)
+    return n, mean, m2
+
+
+def _prefix_medians(values, ends):
+    """Mediana de los valores no nulos de values[:e] para cada e en ends."""
+    n_rows, n_cols = values.shape
+    order = np.argsort(values, axis=0, kind='stable')          # NaN al final
+    sorted_vals = np.take_along_axis(values, order, axis=0)
+    valid = ~np.isnan(sorted_vals)
+
+    medians = np.full((len(ends), n_cols), np.nan)
+    for f, e in enumerate(ends):
+        counts = np.cumsum(valid & (order < e), axis=0)
+        m = counts[-1]
+        ok = m > 0
+        lo = ((counts >= ((m + 1) // 2)) & ok).argmax(axis=0)
+        hi = ((counts >= (m // 2 + 1)) & ok).argmax(axis=0)
+        cols = np.arange(n_cols)
+        medians[f, ok] = (sorted_vals[lo, cols][ok] + sorted_vals[hi, cols][ok]) / 2
+    return medians
+
+
+@instrumented
+def expanding_fold_stats(X, fold_ends, strategy='median'):
+    """
+    Estadísticas de imputación y escala para prefijos anidados X[:e].
+
+    Parámetros
+    ----------
+    X : array-like (filas × columnas numéricas), puede contener NaN.
+    fold_ends : list[int]
+        Tamaño del entrenamiento de cada fold (creciente).
+    strategy : str
+        'median' o 'mean' — valor de imputación, como en impute_missing.
+
+    Retorna
+    -------
+    stats : dict de arreglos (folds × columnas)
+        'fill'  — valor de imputación (0 si la columna no tiene datos en el prefijo)
+        'mean'  — media tras imputar (como StandardScaler sobre X imputado)
+        'scale' — desviación estándar tras imputar (1 para columnas constantes)
+    """
+    if strategy not in ('median', 'mean'):
+        raise ValueError(f"strategy debe ser 'median' o 'mean', no {strategy!r}")
+    X = np.asarray(X, dtype=np.float64)
+    ends = [int(e) for e in fold_ends]
+    if any(b <= a for a, b in zip(ends, ends[1:])):
+        raise ValueError("fold_ends debe ser estrictamente creciente")
+
+    n_cols = X.shape[1]
+    fills = np.empty((len(ends), n_cols))
+    means = np.empty((len(ends), n_cols))
+    scales = np.empty((len(ends), n_cols))
+    medians = _prefix_medians(X, ends) if strategy == 'median' else None
+
+    n, mean, m2 = np.zeros(n_cols), np.zeros(n_cols), np.zeros(n_cols)
+    start = 0
+    for f, e in enumerate(ends):
+        n, mean, m2 = _merge(n, mean, m2, *_block_moments(X[start:e]))
+        start = e
+
+        fill = medians[f] if medians is not None else mean.copy()
+        fill = np.where(n > 0, fill, 0.0)
+
+        # Los faltantes imputados son un bloque de (e - n) copias del valor de relleno
+        n_all, mean_all, m2_all = _merge(n, mean, m2, e - n, fill, np.zeros(n_cols))
+        scale = np.sqrt(m2_all / n_all)
+
+        fills[f] = fill
+        means[f] = mean_all
+        scales[f] = np.where(scale > 0, scale, 1.0)
+
+    return {'fill': fills, 'mean': means, 'scale': scales}
+
+
+@instrumented
+def preprocess_folds(X, y, folds, strategy='median', dtype=np.float64):
+    """
+    Datos imputados y estandarizados por fold, sin leakage entre folds.
+
+    Parámetros
+    ----------
+    X : pd.DataFrame | np.ndarray
+        Features SIN imputar ni estandarizar, en orden temporal.
+    y : pd.Series | np.ndarray
+    folds : list[(train_idx, val_idx)]
+        Folds de ventana expansiva (p. ej. list(TimeSeriesSplit(n).split(X))):
+        cada train_idx debe ser un prefijo 0..e-1.
+    strategy : str
+        'median' o 'mean'.
+    dtype : np.dtype
+
+    Retorna
+    -------
+    fold_data : list[(X_tr, y_tr, X_va, y_va)]  arreglos numpy, uno por fold.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    ends = []
+    for tr, _ in folds:
+        if not np.array_equal(tr, np.arange(len(tr))):
+            raise ValueError("Los folds de entrenamiento deben ser prefijos (ventana expansiva)")
+        ends.append(len(tr))
+
+    stats = expanding_fold_stats(X, ends, strategy=strategy)
+
+    fold_data = []
+    for f, (tr, va) in enumerate(folds):
+        fill, mean, scale = stats['fill'][f], stats['mean'][f], stats['scale'][f]
+
+        def transform(block):
+            block = np.where(np.isnan(block), fill, block)
+            return ((block - mean) / scale).astype(dtype, copy=False)
+
+        fold_data.append((transform(X[tr]), y[tr], transform(X[va]), y[va]))
+    return fold_data
@@ -0,0 +1,239 @@
+"""
+Backend de gradient boosting por histogramas (tune_hyperparameters(backend='hist_gb'))
+=====================================================================================
+
+HistGradientBoostingClassifier de scikit-learn (multi-hilo con OpenMP) con la
+misma interfaz del paso 7: retorna (best_model, cv_results) y el modelo sirve
+tal cual para optimize_threshold, evaluate_model, save_bundle y
+get_coefficients (que usa gain_importances: ganancia de los splits).
+
+Para que la búsqueda sea viable en el panel completo:
+
+- las features se discretizan UNA vez con cuantiles de NumPy (hasta 255 bins,
+  NaN preservado) y todos los folds y candidatos ajustan sobre esos códigos en
+  float32: el re-binning interno de cada fit queda en una pasada trivial;
+- en cada fold temporal (TimeSeriesSplit) el número de árboles se elige con
+  early stopping sobre el fold de validación: se agregan `step` árboles con
+  warm_start hasta que el score no mejora en `patience` evaluaciones;
+- el modelo final se ajusta en train+val con los datos originales y la mediana
+  del número de árboles óptimo de los folds.
+
+Los bins se calculan sin la etiqueta sobre todo train+val (solo cuantiles de las
+features), igual para todos los folds.
+
+gain_importances lee la estructura interna de los árboles ajustados
+(_predictors), que scikit-learn no expone públicamente: si cambia en otra
+versión, falla con un error explícito y permutation_importance (paso 10) sigue
+sirviendo para rankear features.
+"""
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import effective_n_jobs
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import TimeSeriesSplit
+from threadpoolctl import threadpool_limits
+
+from .instrumentation import record_stats
+
+
+DEFAULT_HGB_GRID = {
+    'learning_rate':     [0.05, 0.1],
+    'max_leaf_nodes':    [15, 31, 63],
+    'min_samples_leaf':  [20, 100],
+    'l2_regularization': [0.0, 1.0],
+}
+
+# Filas muestreadas para los cuantiles de cada feature (como el binning interno de sklearn)
+_BIN_SUBSAMPLE = 200_000
+
+
+def _base_model(random_state, **params):
+    return HistGradientBoostingClassifier(
+        class_weight='balanced',
+        early_stopping=False,
+        random_state=random_state,
+        **params,
+    )
+
+
+def _bin_edges(col, max_bins):
+    """Umbrales entre bins de una columna sin NaN: puntos medios o cuantiles."""
+    distinct = np.unique(col)
+    if len(distinct) <= max_bins:
+        return (distinct[:-1] + distinct[1:]) / 2
+    quantiles = np.linspace(0, 1, max_bins + 1)[1:-1]
+    return np.unique(np.quantile(col, quantiles, method='midpoint'))
+
+
+def bin_features(X, max_bins=255, random_state=42):
+    """
+    Discretiza X una sola vez por cuantiles.
+
+    Retorna
+    -------
+    X_binned : np.ndarray float32  códigos de bin 0 … max_bins - 1 (NaN donde X era NaN).
+    edges : list[np.ndarray]  umbrales de cada feature (código = umbrales ≤ valor).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rows = np.arange(len(X))
+    if len(X) > _BIN_SUBSAMPLE:
+        rng = np.random.default_rng(random_state)
+        rows = np.sort(rng.choice(len(X), _BIN_SUBSAMPLE, replace=False))
+
+    X_binned = np.empty(X.shape, dtype=np.float32)
+    edges = []
+    for j in range(X.shape[1]):
+        sample = X[rows, j]
+        e = _bin_edges(sample[~np.isnan(sample)], max_bins)
+        codes = np.searchsorted(e, X[:, j], side='right').astype(np.float32)
+        codes[np.isnan(X[:, j])] = np.nan
+        X_binned[:, j] = codes
+        edges.append(e)
+    return X_binned, edges
+
+
+def gain_importances(model):
+    """
+    Ganancia total de los splits por feature, normalizada a suma 1.
+
+    Lee los árboles internos de HistGradientBoostingClassifier (no hay API
+    pública); si la estructura no es la esperada lanza RuntimeError.
+    """
+    n_features = model.n_features_in_
+    gains = np.zeros(n_features)
+    try:
+        for trees in model._predictors:
+            for tree in trees:
+                nodes = tree.nodes[~tree.nodes['is_leaf'].astype(bool)]
+                np.add.at(gains, nodes['feature_idx'], nodes['gain'])
+    except (AttributeError, KeyError, ValueError, TypeError) as e:
+        import sklearn
+        raise RuntimeError(
+            f"gain_importances no reconoce los árboles de {type(model).__name__} en "
+            f"scikit-learn {sklearn.__version__} ({e!r}); usar permutation_importance"
+        ) from e
+    total = gains.sum()
+    return gains / total if total > 0 else gains
+
+
+def _early_stopped_fit(params, X_tr, y_tr, X_va, y_va, scorer, random_state,
+                       step, max_iter, patience, threads):
+    """Agrega árboles de a `step` con warm_start; retorna (mejor score, n árboles, segundos)."""
+    model = _base_model(random_state, warm_start=True, max_iter=step, **params)
+    best, best_iter, worse = -np.inf, 0, 0
+    t0 = time.perf_counter()
+    with threadpool_limits(limits=threads, user_api='openmp'):
+        while True:
+            model.fit(X_tr, y_tr)
+            score = scorer(model, X_va, y_va)
+            if score > best + 1e-4:
+                best, best_iter, worse = score, model.n_iter_, 0
+            else:
+                worse += 1
+            # n_iter_ < max_iter: el boosting ya no encontró splits útiles
+            if worse >= patience or model.max_iter >= max_iter or model.n_iter_ < model.max_iter:
+                break
+            model.set_params(max_iter=model.max_iter + step)
+    return best, best_iter, time.perf_counter() - t0
+
+
+def tune_gradient_boosting(
+    X_train_val,
+    y_train_val,
+    param_grid=None,
+    n_cv_splits=5,
+    scoring='average_precision',
+    random_state=42,
+    max_iter=500,
+    step=25,
+    patience=3,
+    max_bins=255,
+    n_jobs=-1,
+):
+    """
+    Busca hiperparámetros de HistGradientBoosting con CV temporal y early stopping.
+
+    Parámetros
+    ----------
+    X_train_val : pd.DataFrame
+        Train + validación (imputados o no: los NaN se manejan de forma nativa).
+    y_train_val : pd.Series
+    param_grid : dict, optional
+        Grid de parámetros de HistGradientBoostingClassifier (DEFAULT_HGB_GRID).
+    n_cv_splits : int
+    scoring : str
+        Métrica del early stopping y de la selección.
+    random_state : int
+    max_iter : int
+        Máximo de árboles por ajuste.
+    step : int
+        Árboles agregados entre evaluaciones del fold de validación.
+    patience : int
+        Evaluaciones sin mejora antes de detener el fold.
+    max_bins : int
+    n_jobs : int
+        Hilos OpenMP de cada ajuste (-1 = todos los núcleos).
+
+    Retorna
+    -------
+    best_model : HistGradientBoostingClassifier  (importancias: gain_importances)
+    cv_results : pd.DataFrame  (estructura de GridSearchCV.cv_results_ + best_n_iter)
+    """
+    if param_grid is None:
+        param_grid = DEFAULT_HGB_GRID
+    names = list(param_grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    folds = list(TimeSeriesSplit(n_splits=n_cv_splits).split(X_train_val))
+    scorer = get_scorer(scoring)
+    y = np.asarray(y_train_val).astype(int)
+    threads = effective_n_jobs(n_jobs)
+
+    t0 = time.perf_counter()
+    X_binned, _ = bin_features(X_train_val, max_bins=max_bins, random_state=random_state)
+    print(f"HistGradientBoosting: {len(candidates)} combinaciones × {n_cv_splits} folds "
+          f"(early stopping cada {step} árboles, máx. {max_iter}) | métrica: {scoring} "
+          f"| {threads} hilos")
+    print(f"  Features discretizadas una vez: {X_binned.shape[1]} × ≤{max_bins} bins "
+          f"({time.perf_counter() - t0:.1f} s)")
+
+    records = []
+    for params in candidates:
+        scores, iters, times = [], [], []
+        for tr, va in folds:
+            s, it, secs = _early_stopped_fit(params, X_binned[tr], y[tr], X_binned[va], y[va],
+                                             scorer, random_state, step, max_iter, patience,
+                                             threads)
+            scores.append(s)
+            iters.append(it)
+            times.append(secs)
+        rec = {f'param_{k}': v for k, v in params.items()}
+        rec.update(params=params, mean_fit_time=np.mean(times),
+                   mean_test_score=np.mean(scores), std_test_score=np.std(scores),
+                   best_n_iter=int(np.median(iters)))
+        rec.update({f'split{i}_test_score': s for i, s in enumerate(scores)})
+        records.append(rec)
+
+    cv_results = pd.DataFrame(records)
+    cv_results['rank_test_score'] = cv_results['mean_test_score'].rank(
+        ascending=False, method='min').astype(int)
+    cv_results = cv_results.sort_values('rank_test_score').reset_index(drop=True)
+    print(f"  Búsqueda completada en {time.perf_counter() - t0:,.1f} s")
+
+    best = cv_results.iloc[0]
+    best_model = _base_model(random_state, max_iter=max(int(best['best_n_iter']), 1),
+                             **best['params'])
+    with threadpool_limits(limits=threads, user_api='openmp'):
+        best_model.fit(X_train_val, y)
+
+    record_stats(best_cv_score=float(best['mean_test_score']),
+                 best_n_iter=int(best['best_n_iter']), n_configs_scored=len(cv_results))
+    print(f"\n✓ Mejores hiperparámetros:")
+    for k, v in best['params'].items():
+        print(f"  {k}: {v}")
+    print(f"  Árboles: {best['best_n_iter']}")
+    print(f"  Mejor {scoring} (CV): {best['mean_test_score']:.4f}")
+    return best_model, cv_results
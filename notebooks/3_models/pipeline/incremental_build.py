@@ -0,0 +1,535 @@
+"""
+Actualización incremental de db.parquet con nuevas entregas de MinDefensa
+=========================================================================
+
+Cuando llegan nuevos meses de los archivos de delitos, en vez de reconstruir
+db.parquet completo (clean_mindef_top5.py → indexes.ipynb → db.parquet):
+
+1. Detecta qué archivos fuente cambiaron (hash SHA-256 contra el manifiesto
+   de la última construcción).
+2. Re-agrega a trimestre solo esos archivos y los compara contra la foto de
+   conteos guardada, para obtener las celdas (mun_code, quarter) modificadas.
+3. Recalcula tasas e índices únicamente en esas celdas, propaga los rezagos
+   _r1 … _rN a los trimestres siguientes del mismo municipio y recalcula
+   umbrales y etiquetas solo en las filas afectadas.
+
+4. Agrega las filas de los trimestres nuevos (posteriores a db.parquet): tasas
+   e índices desde los conteos, rezagos desplazando los del trimestre anterior
+   y umbral / etiqueta con la ventana de `window` trimestres, como
+   update_labels. Las demás variables (población si no se pasa
+   population_path, demografía, commodities, covid, …) se copian del último
+   trimestre del municipio hasta la próxima reconstrucción completa.
+
+Solo se reescribe lo tocado: en el dataset particionado (ver write_dataset),
+las particiones de los trimestres afectados y las nuevas; en un db.parquet de
+un solo archivo, solo los row groups con filas afectadas pasan por pandas (el
+archivo se vuelve a escribir entero, por eso conviene el dataset particionado).
+
+El estado (manifiesto + foto de conteos trimestrales) vive en `state_dir`.
+La primera ejecución crea ese estado y verifica que db.parquet coincida con
+las fuentes, sin modificarlo.
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .labeling import DEFAULT_VARIANTS, compute_indices
+from .panel import code_to_period, period_codes
+from .step01_data_loading import write_dataset
+from .instrumentation import instrumented
+
+
+# Archivos limpios (relativos a data/temp) por código de delito, como en indexes.ipynb
+MINDEF_SOURCES = {
+    '01': 'mindef/top5/homicides.parquet',
+    '02': 'mindef/top5/kidnappings.parquet',
+    '03': 'mindef/top5/terrorism.parquet',
+    '04': 'mindef/top5/extortion.parquet',
+    '05': 'massacres/massacres.parquet',
+    '07': 'mindef/other/illegal_mining_arrests.parquet',
+    '08': 'mindef/other/environmental_crimes.parquet',
+    '09': 'mindef/other/drug_infrastructure_destruction.parquet',
+    '10': 'mindef/other/eradication.parquet',
+    '11': 'mindef/other/coca_leaf.parquet',
+    '12': 'mindef/other/commerce_theft.parquet',
+    '13': 'mindef/other/person_theft.parquet',
+    '14': 'mindef/other/cocaine_seizure.parquet',
+    '15': 'mindef/other/intervened_mines.parquet',
+    '16': 'mindef/other/human_trafficking.parquet',
+    '17': 'mindef/other/pipeline_bombing.parquet',
+}
+
+# Variables con umbral y etiqueta atypical_violence_* en db.parquet
+LABEL_COLS = ['iacv', 'iacv2', 't_01', 't_02', 't_03', 't_04', 't_05']
+
+MANIFEST_FILE = 'manifest.json'
+COUNTS_FILE = 'counts.parquet'
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 del contenido de un archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _derived_variants(codes):
+    """Variantes (tasa simple t_XX + índices compuestos) que dependen de los códigos dados."""
+    variants = {f't_{c}': {f'qty_{c}': 1} for c in codes}
+    for name, weights in DEFAULT_VARIANTS.items():
+        if any(f'qty_{c}' in weights for c in codes):
+            variants[name] = weights
+    return variants
+
+
+def _quarterly_counts(path, code, municipality_col):
+    """Agrega un archivo mensual limpio (date, mun_code, qty) a municipio-trimestre."""
+    df = pd.read_parquet(path, columns=['date', municipality_col, 'qty'])
+    mun = (pd.to_numeric(df[municipality_col], errors='coerce')
+           .astype('Int64').astype(str).str.zfill(5))
+    period = pd.to_datetime(df['date']).dt.to_period('Q')
+    return (df.assign(**{municipality_col: mun, 'period': period_codes(period)})
+              .groupby([municipality_col, 'period'])['qty'].sum()
+              .rename(f'qty_{code}'))
+
+
+def _dataset_columns(db_path):
+    """Nombres de columna de db.parquet o del dataset particionado, sin leer datos."""
+    if Path(db_path).is_dir():
+        import pyarrow.dataset as ds
+
+        return ds.dataset(str(db_path), format='parquet', partitioning='hive').schema.names
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(db_path).names
+
+
+def _dataset_codes(db_path, time_col):
+    """
+    Códigos de trimestre del dataset completo sin leer las features.
+
+    Dataset particionado: un código por partición (de las carpetas).
+    Archivo único: el código de cada fila (solo se lee time_col).
+    """
+    if Path(db_path).is_dir():
+        import pyarrow.dataset as ds
+
+        codes = set()
+        for frag in ds.dataset(str(db_path), format='parquet', partitioning='hive').get_fragments():
+            k = ds.get_partition_keys(frag.partition_expression)
+            codes.add(int(k['año']) * 4 + int(k['trimestre']) - 1)
+        return np.array(sorted(codes), dtype=np.int64)
+    return period_codes(pd.read_parquet(db_path, columns=[time_col])[time_col])
+
+
+def _read_partitions(dataset_dir, codes):
+    """Lee del dataset particionado solo los trimestres (códigos enteros) indicados."""
+    import pyarrow.dataset as ds
+
+    expr = None
+    for c in codes:
+        cond = (ds.field('año') == int(c // 4)) & (ds.field('trimestre') == int(c % 4 + 1))
+        expr = cond if expr is None else expr | cond
+    dataset = ds.dataset(str(dataset_dir), format='parquet', partitioning='hive')
+    return dataset.to_table(filter=expr).to_pandas()
+
+
+def _read_row_groups(path, row_codes, codes):
+    """Lee de un archivo único solo los row groups con filas de los trimestres indicados."""
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    sizes = [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)]
+    group = np.repeat(np.arange(len(sizes)), sizes)
+    groups = np.unique(group[np.isin(row_codes, codes)]).tolist()
+    return pf.read_row_groups(groups).to_pandas(), groups
+
+
+def _rewrite_row_groups(path, db, groups, new_rows):
+    """
+    Reescribe el archivo con los row groups `groups` reemplazados por db (en el
+    mismo orden) y new_rows al final. Los demás row groups no pasan por pandas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    pf = pq.ParquetFile(path)
+    schema = pf.schema_arrow
+    patched = pa.Table.from_pandas(db, schema=schema, preserve_index=False)
+    tmp = path.with_name(path.name + '.tmp')
+    offset = 0
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for i in range(pf.num_row_groups):
+            if i in groups:
+                n = pf.metadata.row_group(i).num_rows
+                writer.write_table(patched.slice(offset, n))
+                offset += n
+            else:
+                writer.write_table(pf.read_row_group(i))
+        if len(new_rows):
+            writer.write_table(pa.Table.from_pandas(new_rows, schema=schema, preserve_index=False))
+    os.replace(tmp, path)
+
+
+def _cell_keys(mun, codes):
+    return pd.MultiIndex.from_arrays([np.asarray(mun), np.asarray(codes, dtype=np.int64)])
+
+
+def _read_population(population_path, municipality_col, time_col):
+    pop = pd.read_parquet(population_path, columns=[municipality_col, time_col, 'population'])
+    keys = _cell_keys(pop[municipality_col],
+                      period_codes(pd.to_datetime(pop[time_col]).dt.to_period('Q')))
+    return keys, pop['population'].to_numpy(dtype=np.float64)
+
+
+def _lookup(source, keys):
+    """Valores de (keys_origen, valores) en las celdas keys; NaN donde no hay dato."""
+    src_keys, src_values = source
+    pos = src_keys.get_indexer(keys)
+    out = np.full(len(keys), np.nan)
+    out[pos >= 0] = src_values[pos[pos >= 0]]
+    return out
+
+
+def _lag_groups(columns):
+    """{variable: N} para cada variable con columnas de rezago <variable>_r1 … _rN."""
+    groups = {}
+    for col in columns:
+        m = re.fullmatch(r'(.+)_r(\d+)', col)
+        if m and m.group(1) in columns:
+            groups[m.group(1)] = max(groups.get(m.group(1), 0), int(m.group(2)))
+    return {base: n for base, n in groups.items()
+            if all(f'{base}_r{j}' in columns for j in range(1, n + 1))}
+
+
+def _relabel(db, rows, names, label_cols, window):
+    """Umbral (media + 1 std de los rezagos _r1 … _r{window}) y etiqueta en las filas dadas."""
+    for name in names:
+        if name not in label_cols or f'atypical_violence_{name}' not in db.columns:
+            continue
+        lags = db.iloc[rows][[f'{name}_r{j}' for j in range(1, window + 1)]].to_numpy(dtype=np.float64)
+        threshold = np.round(lags.mean(axis=1) + lags.std(axis=1, ddof=1), 3)
+        current = db.iloc[rows][name].to_numpy(dtype=np.float64)
+        db.iloc[rows, db.columns.get_loc(f'{name}_t')] = threshold
+        # Sin algún rezago el umbral es NaN y la etiqueta queda NA, como en label_panel(dropna=False)
+        label_col = f'atypical_violence_{name}'
+        missing = np.isnan(threshold)
+        if missing.any() and not isinstance(db[label_col].dtype, pd.api.extensions.ExtensionDtype):
+            db[label_col] = db[label_col].astype('Int64')
+        label = pd.array((current > threshold).astype(np.int64), dtype='Int64')
+        label[missing] = pd.NA
+        db.iloc[rows, db.columns.get_loc(label_col)] = label
+
+
+def _period_value(column, code):
+    """Trimestre `code` con el mismo tipo que la columna temporal de db (Period o 'YYYYQN')."""
+    label = code_to_period([code])[0]
+    if isinstance(column.dtype, pd.PeriodDtype):
+        return pd.Period(label, freq=column.dtype.freq)
+    return label
+
+
+def _new_quarters(last, new_codes, counts, variants, population, label_cols, window,
+                  municipality_col, time_col):
+    """
+    Filas de los trimestres nuevos, una por municipio del último trimestre de db.
+
+    Cada trimestre parte del anterior: los rezagos se desplazan (_r1 = valor del
+    trimestre previo), tasas e índices salen de los conteos y el resto de las
+    variables se copia.
+    """
+    lag_groups = _lag_groups(set(last.columns))
+    names = list(variants)
+    qty_cols = sorted({c for w in variants.values() for c in w})
+    out, prev = [], last.reset_index(drop=True)
+    for code in new_codes:
+        row = prev.copy()
+        for base, n in lag_groups.items():
+            for j in range(n, 1, -1):
+                row[f'{base}_r{j}'] = prev[f'{base}_r{j - 1}'].to_numpy()
+            row[f'{base}_r1'] = prev[base].to_numpy()
+        row[time_col] = _period_value(last[time_col], code)
+        for col, value in (('Año', code // 4), ('año', code // 4), ('trimestre', code % 4 + 1)):
+            if col in row.columns:
+                row[col] = value
+
+        keys = _cell_keys(row[municipality_col], np.full(len(row), code))
+        if population is not None:
+            pop = _lookup(population, keys)
+            row['population'] = np.where(np.isnan(pop), row['population'].to_numpy(dtype=np.float64), pop)
+        base = counts.reindex(keys)[qty_cols].fillna(0).reset_index(drop=True)
+        base['population'] = row['population'].to_numpy(dtype=np.float64)
+        values = compute_indices(base, variants)
+        for name in names:
+            row[name] = values[name].to_numpy()
+        _relabel(row, np.arange(len(row)), names, label_cols, window)
+        out.append(row)
+        prev = row
+    return pd.concat(out, ignore_index=True)
+
+
+def _carried_columns(columns, variants, with_population, municipality_col, time_col):
+    """Columnas de los trimestres nuevos que se copian del trimestre anterior."""
+    derived = {municipality_col, time_col, 'Año', 'año', 'trimestre'}
+    if with_population:
+        derived.add('population')
+    for name in variants:
+        derived |= {name, f'{name}_t', f'atypical_violence_{name}'}
+    for base, n in _lag_groups(set(columns)).items():
+        derived |= {f'{base}_r{j}' for j in range(1, n + 1)}
+    return [c for c in columns if c not in derived]
+
+
+def _check_db(db_path, counts, variants, municipality_col, time_col, tol=0.011):
+    """Celdas de db cuyas tasas e índices no coinciden con los conteos de las fuentes."""
+    names = list(variants)
+    qty_cols = sorted({c for w in variants.values() for c in w})
+    db = pd.read_parquet(db_path, columns=[municipality_col, time_col, 'population'] + names)
+    keys = _cell_keys(db[municipality_col], period_codes(db[time_col]))
+    base = counts.reindex(keys)[qty_cols].fillna(0).reset_index(drop=True)
+    base['population'] = db['population'].to_numpy(dtype=np.float64)
+    expected = compute_indices(base, variants)[names].to_numpy()
+    actual = db[names].to_numpy(dtype=np.float64)
+    bad = ~np.isclose(expected, actual, rtol=0, atol=tol, equal_nan=True)
+    return int(bad.any(axis=1).sum()), dict(zip(names, bad.sum(axis=0).tolist()))
+
+
+@instrumented
+def update_db(
+    db_path,
+    state_dir,
+    temp_dir=None,
+    sources=None,
+    population_path=None,
+    label_cols=None,
+    n_lags=4,
+    window=4,
+    municipality_col='mun_code',
+    time_col='quarter',
+):
+    """
+    Parchea db.parquet recalculando solo las celdas afectadas por fuentes nuevas
+    y agrega las filas de los trimestres nuevos.
+
+    Parámetros
+    ----------
+    db_path : str | Path
+        Dataset procesado a actualizar: db.parquet o la carpeta del dataset
+        particionado (ver write_dataset). En el segundo caso solo se leen y
+        reescriben las particiones de los trimestres afectados.
+    state_dir : str | Path
+        Carpeta con el manifiesto de hashes y la foto de conteos trimestrales.
+    temp_dir : str | Path, optional
+        Carpeta data/temp; resuelve las rutas relativas de MINDEF_SOURCES.
+    sources : dict[str, str | Path], optional
+        {código de delito: archivo limpio}. Default: MINDEF_SOURCES bajo temp_dir.
+    population_path : str | Path, optional
+        dane_demografia.parquet. Población de las celdas modificadas que no están
+        en db.parquet y de los trimestres nuevos (si falta, se copia la del
+        último trimestre del municipio).
+    label_cols : list[str], optional
+        Variables con umbral y etiqueta. Default: LABEL_COLS.
+    n_lags : int
+        Rezagos _r1 … _rN guardados en db.parquet.
+    window : int
+        Trimestres usados por el umbral (deben existir como rezagos).
+
+    Retorna
+    -------
+    report : dict
+        changed_sources, changed_cells, patched_rows, new_quarters, new_rows,
+        new_cells, skipped_cells, carried_cols, mismatched_cells.
+
+    Notas
+    -----
+    Un trimestre nuevo se agrega con los meses que traiga la entrega; si llega
+    incompleto, la siguiente entrega lo parchea como cualquier otra celda.
+    """
+    state_dir = Path(state_dir)
+    label_cols = LABEL_COLS if label_cols is None else label_cols
+    if window > n_lags:
+        raise ValueError(f"window={window} requiere al menos {window} rezagos (n_lags={n_lags})")
+    if sources is None:
+        if temp_dir is None:
+            raise ValueError("Debe indicar temp_dir o sources")
+        sources = {code: Path(temp_dir) / rel for code, rel in MINDEF_SOURCES.items()}
+    sources = {code: Path(p) for code, p in sources.items() if Path(p).exists()}
+
+    manifest_path = state_dir / MANIFEST_FILE
+    counts_path = state_dir / COUNTS_FILE
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    hashes = {code: file_hash(p) for code, p in sources.items()}
+    changed = [c for c in sources if manifest.get(c) != hashes[c]]
+    report = dict(changed_sources=changed, changed_cells=0, patched_rows=0, new_quarters=[],
+                  new_rows=0, new_cells=0, skipped_cells=0, carried_cols=[], mismatched_cells=0)
+
+    if not changed:
+        print("✓ Sin cambios en las fuentes: db.parquet ya está al día")
+        return report
+    print(f"Fuentes modificadas: {changed}")
+
+    # ── Celdas modificadas: conteos nuevos vs. foto de la última construcción ──
+    fresh = pd.concat([_quarterly_counts(sources[c], c, municipality_col) for c in changed], axis=1)
+    if counts_path.exists():
+        counts = pd.read_parquet(counts_path)
+        counts = counts.set_index([municipality_col, period_codes(counts.pop(time_col))])
+        counts.index.names = [municipality_col, 'period']
+    else:
+        counts = None
+
+    state_dir.mkdir(parents=True, exist_ok=True)
+    columns = _dataset_columns(db_path)
+
+    def _save_state(counts):
+        out = counts.reset_index()
+        out[time_col] = code_to_period(out.pop('period'))
+        out.to_parquet(counts_path, index=False)
+        manifest.update(hashes)
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+    def _known_variants(counts):
+        """Variantes de db cuyos conteos están todos en la foto."""
+        codes = [c[len('qty_'):] for c in counts.columns]
+        return {k: v for k, v in _derived_variants(codes).items()
+                if k in columns and all(c in counts.columns for c in v)}
+
+    if counts is None:
+        counts = fresh.fillna(0)
+        mismatched, by_variant = _check_db(db_path, counts, _known_variants(counts),
+                                           municipality_col, time_col)
+        report['mismatched_cells'] = mismatched
+        _save_state(counts)
+        print(f"✓ Estado inicial creado en {state_dir} (db.parquet no se modifica)")
+        if mismatched:
+            worst = {k: v for k, v in by_variant.items() if v}
+            print(f"⚠️  {mismatched:,} celdas de db.parquet no coinciden con las fuentes {worst}: "
+                  f"reconstruir con indexes.ipynb antes de usar update_db")
+        else:
+            print("✓ db.parquet coincide con las fuentes")
+        return report
+
+    cols = fresh.columns.tolist()
+    old = counts.reindex(columns=cols)
+    union = old.index.union(fresh.index)
+    old_vals = old.reindex(union).fillna(0)
+    new_vals = fresh.reindex(union).fillna(0)
+    diff = (old_vals.to_numpy() != new_vals.to_numpy()).any(axis=1)
+    cells = union[diff]
+
+    counts = counts.reindex(counts.index.union(fresh.index))
+    counts[cols] = new_vals.reindex(counts.index)
+    counts = counts.fillna(0)
+    report['changed_cells'] = len(cells)
+
+    if len(cells) == 0:
+        _save_state(counts)
+        print("✓ Las fuentes cambiaron pero los conteos trimestrales son idénticos")
+        return report
+    print(f"Celdas (mun_code, quarter) modificadas: {len(cells):,}")
+
+    # ── Trimestres de todo el dataset (no solo de las particiones leídas) ──
+    partitioned = Path(db_path).is_dir()
+    row_codes = _dataset_codes(db_path, time_col)
+    db_max = int(row_codes.max())
+    cell_per = cells.get_level_values(1).to_numpy()
+    is_new = cell_per > db_max
+    new_codes = np.arange(db_max + 1, cell_per.max() + 1, dtype=np.int64)
+    report['new_cells'] = int(is_new.sum())
+    new_cells, cells = cells[is_new], cells[~is_new]
+
+    # Trimestres cuyo valor o rezagos cambian, más el último si hay trimestres nuevos
+    shifted = cells.get_level_values(1).to_numpy()[:, None] + np.arange(n_lags + 1)
+    affected = np.unique(shifted[shifted <= db_max])
+    to_read = np.union1d(affected, [db_max]) if len(new_codes) else affected
+    if partitioned:
+        db = _read_partitions(db_path, to_read)
+    else:
+        db, groups = _read_row_groups(db_path, row_codes, to_read)
+    db_codes = period_codes(db[time_col])
+    db_keys = _cell_keys(db[municipality_col], db_codes)
+
+    population = None
+    if population_path is not None:
+        population = _read_population(population_path, municipality_col, time_col)
+
+    # ── Nuevos valores de tasas e índices en las celdas modificadas ──
+    variants = _derived_variants(changed)
+    variants = {k: v for k, v in variants.items() if k in db.columns}
+    names = list(variants)
+    qty_cols = sorted({c for w in variants.values() for c in w})
+
+    cell_mun = cells.get_level_values(0)
+    cell_per = cells.get_level_values(1).to_numpy()
+    base = counts.reindex(cells)[qty_cols].reset_index(drop=True)
+
+    pos = db_keys.get_indexer(cells)
+    pop_cells = np.full(len(cells), np.nan)
+    pop_cells[pos >= 0] = db['population'].to_numpy(dtype=np.float64)[pos[pos >= 0]]
+    if population is not None and (pos < 0).any():
+        pop_cells[pos < 0] = _lookup(population, cells[pos < 0])
+    base['population'] = pop_cells
+
+    values = compute_indices(base, variants)[names].to_numpy()
+    resolved = ~np.isnan(pop_cells)
+    report['skipped_cells'] = int((~resolved).sum())
+
+    # ── Parche: valor actual (j = 0) y rezagos j = 1 … n_lags ──
+    touched = []
+    for j in range(n_lags + 1):
+        target = db_keys.get_indexer(_cell_keys(cell_mun, cell_per + j))
+        ok = (target >= 0) & resolved
+        if not ok.any():
+            continue
+        for k, name in enumerate(names):
+            col = name if j == 0 else f'{name}_r{j}'
+            if col in db.columns:
+                db.iloc[target[ok], db.columns.get_loc(col)] = values[ok, k]
+        if j <= window:
+            touched.append(target[ok])
+
+    rows = np.unique(np.concatenate(touched)) if touched else np.array([], dtype=np.int64)
+    _relabel(db, rows, names, label_cols, window)
+    report['patched_rows'] = len(rows)
+
+    # ── Trimestres nuevos a partir del último trimestre (ya parcheado) ──
+    new_rows = db.iloc[:0]
+    if len(new_codes):
+        all_variants = _known_variants(counts)
+        last = db[db_codes == db_max]
+        new_rows = _new_quarters(last, new_codes, counts, all_variants, population,
+                                 label_cols, window, municipality_col, time_col)
+        known = last[municipality_col].unique()
+        report['skipped_cells'] += int((~new_cells.get_level_values(0).isin(known)).sum())
+        report['new_quarters'] = code_to_period(new_codes)
+        report['new_rows'] = len(new_rows)
+        report['carried_cols'] = _carried_columns(db.columns, all_variants, population is not None,
+                                                  municipality_col, time_col)
+
+    if partitioned:
+        out = pd.concat([db, new_rows], ignore_index=True) if len(new_rows) else db
+        written = np.union1d(affected, new_codes).astype(np.int64)
+        write_dataset(out, db_path, time_col, municipality_col, periods=code_to_period(written))
+    else:
+        _rewrite_row_groups(db_path, db, groups, new_rows)
+    _save_state(counts)
+
+    print(f"✓ db.parquet actualizado: {len(rows):,} filas recalculadas de {len(db):,} leídas")
+    if len(new_rows):
+        print(f"✓ Trimestres nuevos: {report['new_quarters']} ({len(new_rows):,} filas)")
+        if report['carried_cols']:
+            print(f"⚠️  {len(report['carried_cols'])} variables sin fuente en MinDefensa se copian "
+                  f"del último trimestre hasta la reconstrucción completa: "
+                  f"{report['carried_cols'][:8]}{' …' if len(report['carried_cols']) > 8 else ''}")
+    if report['skipped_cells']:
+        print(f"⚠️  {report['skipped_cells']:,} celdas sin población o sin fila en db.parquet: "
+              f"no se propagaron (pasar population_path)")
+    return report
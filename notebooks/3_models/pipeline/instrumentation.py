@@ -0,0 +1,199 @@
+"""
+Instrumentación de pasos y modo silencioso
+==========================================
+
+Cada función pública del pipeline está decorada con @instrumented. Fuera de
+trace_steps() el decorador solo delega la llamada. Dentro de trace_steps():
+
+- se registra un evento por llamada: paso, tiempo de reloj y de CPU, RSS actual
+  y máximo del proceso, formas de entradas / salidas y estadísticas clave
+  (las que el paso agregue con record_stats, más los escalares de un dict de
+  salida como el de evaluate_model);
+- con quiet=True se descarta todo lo que los pasos escriben en stdout y
+  stderr (incluidos warnings y barras de progreso) y se fuerza plot=False en
+  los que grafican.
+
+>>> with trace_steps(log_path='trace.jsonl', quiet=True) as trace:
+...     df = load_data(DATA_PATH)
+...     ...
+>>> pd.DataFrame(trace)[['step', 'wall_s', 'max_rss_mb']]
+"""
+import contextlib
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_STATE = {'events': None, 'log_path': None, 'quiet': False, 'stack': []}
+
+
+def is_quiet():
+    """True dentro de trace_steps(quiet=True) o tras set_quiet(True)."""
+    return _STATE['quiet']
+
+
+def set_quiet(quiet=True):
+    """Activa / desactiva el modo silencioso de forma global (sin traza)."""
+    _STATE['quiet'] = bool(quiet)
+
+
+def record_stats(**stats):
+    """Agrega estadísticas al evento del paso en curso (no hace nada fuera de una traza)."""
+    if _STATE['stack']:
+        _STATE['stack'][-1].update(stats)
+
+
+def _rss_mb():
+    """RSS actual del proceso en MB (Linux: /proc/self/statm)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss_mb():
+    """RSS máximo alcanzado por el proceso hasta ahora, en MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3   # bytes en macOS, KB en Linux
+
+
+def _shape(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return list(obj.shape)
+    return None
+
+
+def _shapes(objs):
+    out = {}
+    for name, obj in objs:
+        shape = _shape(obj)
+        if shape is not None:
+            out[name] = shape
+    return out
+
+
+def _output_shapes(result):
+    items = result if isinstance(result, tuple) else (result,)
+    return _shapes((str(i), obj) for i, obj in enumerate(items))
+
+
+def _scalar_stats(result):
+    """Escalares de un dict de salida (métricas, estadísticas del target, reportes)."""
+    items = result if isinstance(result, tuple) else (result,)
+    stats = {}
+    for obj in items:
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool):
+                    stats[str(k)] = float(v)
+    return stats
+
+
+def _emit(event):
+    if _STATE['events'] is not None:
+        _STATE['events'].append(event)
+    if _STATE['log_path'] is not None:
+        with open(_STATE['log_path'], 'a') as f:
+            f.write(json.dumps(event, default=str) + '\n')
+
+
+def instrumented(fn):
+    """Decorador: registra el paso en la traza activa y respeta el modo silencioso."""
+    signature = inspect.signature(fn)
+    params = signature.parameters
+    has_plot = 'plot' in params
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tracing = _STATE['events'] is not None or _STATE['log_path'] is not None
+        quiet = _STATE['quiet']
+        if not tracing and not quiet:
+            return fn(*args, **kwargs)
+
+        if quiet and has_plot:
+            # plot puede venir por posición: se fuerza sobre los argumentos ya enlazados
+            bound = signature.bind(*args, **kwargs)
+            bound.arguments['plot'] = False
+            args, kwargs = bound.args, bound.kwargs
+
+        stats = {}
+        _STATE['stack'].append(stats)
+        rss0, max0 = _rss_mb(), _max_rss_mb()
+        t0, c0 = time.perf_counter(), time.process_time()
+        try:
+            if quiet:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                        contextlib.redirect_stderr(devnull), warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    result = fn(*args, **kwargs)
+            else:
+                result = fn(*args, **kwargs)
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+            _STATE['stack'].pop()
+
+        if tracing:
+            rss1, max1 = _rss_mb(), _max_rss_mb()
+            inputs = _shapes(zip(params, args))
+            inputs.update(_shapes(kwargs.items()))
+            _emit({
+                'step': fn.__name__,
+                'module': fn.__module__.rsplit('.', 1)[-1],
+                'depth': len(_STATE['stack']),
+                'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+                'wall_s': wall,
+                'cpu_s': cpu,
+                'rss_mb': rss1,
+                'rss_delta_mb': None if rss0 is None else rss1 - rss0,
+                'max_rss_mb': max1,
+                'max_rss_growth_mb': None if max0 is None else max1 - max0,
+                'input_shapes': inputs,
+                'output_shapes': _output_shapes(result),
+                'stats': {**_scalar_stats(result), **stats},
+            })
+        return result
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def trace_steps(log_path=None, quiet=False):
+    """
+    Registra un evento por cada paso del pipeline ejecutado dentro del bloque.
+
+    Parámetros
+    ----------
+    log_path : str | Path, optional
+        Archivo JSON Lines al que se agrega cada evento al terminar el paso.
+    quiet : bool
+        Suprime la salida por consola y los gráficos de los pasos.
+
+    Retorna (en el with)
+    --------------------
+    events : list[dict]  — traza en memoria; pd.DataFrame(events) la tabula.
+    """
+    previous = dict(_STATE)
+    events = []
+    _STATE.update(events=events, log_path=None if log_path is None else str(log_path),
+                  quiet=quiet or previous['quiet'], stack=[])
+    try:
+        yield events
+    finally:
+        _STATE.update(previous)
@@ -0,0 +1,241 @@
+"""
+Índices de violencia (IACV) y etiquetas de violencia atípica sobre el panel completo
+===================================================================================
+
+Replica la construcción de indexes.ipynb en una sola pasada vectorizada:
+
+1. Índice = suma ponderada de conteos (pesos = años promedio de pena) por cada
+   100,000 habitantes.
+2. Umbral = media + n_std × desviación estándar de los `window` trimestres previos
+   del mismo municipio.
+3. Violencia atípica = índice del trimestre > umbral.
+
+Todas las variantes (iacv, iacv2, tasas por delito) se calculan a la vez sobre un
+cubo municipio × trimestre × variante, sin groupby por municipio.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .panel import panel_to_cube, period_codes
+from .caching import cached
+from .instrumentation import instrumented
+
+
+# Pesos = años promedio de pena por delito (ver indexes.ipynb)
+PENAS = {
+    'qty_01': 19,     # Homicidio
+    'qty_02': 16,     # Secuestro
+    'qty_03': 15,     # Terrorismo
+    'qty_04': 11.5,   # Extorsión
+    'qty_05': 50,     # Masacres
+}
+
+DEFAULT_VARIANTS = {
+    'iacv':  PENAS,
+    'iacv2': {k: v for k, v in PENAS.items() if k != 'qty_05'},
+}
+
+
+def compute_indices(df, variants=None, population_col='population'):
+    """
+    Calcula los índices ponderados por cada 100,000 habitantes, fila a fila.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Debe contener las columnas qty_XX usadas por las variantes y la población.
+    variants : dict[str, dict[str, float]], optional
+        {nombre: {columna_qty: peso}}. Los pesos se normalizan para sumar 1.
+        Usa DEFAULT_VARIANTS (iacv, iacv2) si no se especifica. Una variante con
+        un solo delito, p. ej. {'t_01': {'qty_01': 1}}, reproduce la tasa simple.
+    population_col : str
+
+    Retorna
+    -------
+    indices : pd.DataFrame
+        Columnas qty_<variante> y <variante> para cada variante, mismo índice que df.
+    """
+    if variants is None:
+        variants = DEFAULT_VARIANTS
+
+    qty_cols = sorted({c for w in variants.values() for c in w})
+    missing = [c for c in qty_cols + [population_col] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Columnas no encontradas en el dataset: {missing}")
+
+    # Matriz de pesos (n_qty × n_variantes): todas las variantes en un solo producto
+    W = np.zeros((len(qty_cols), len(variants)))
+    for j, weights in enumerate(variants.values()):
+        total = sum(weights.values())
+        for col, w in weights.items():
+            W[qty_cols.index(col), j] = w / total
+
+    counts = df[qty_cols].to_numpy(dtype=np.float64)
+    population = df[population_col].to_numpy(dtype=np.float64)[:, None]
+
+    qty = np.round(counts @ W, 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.round(qty / population * 100_000, 2)
+
+    out = {}
+    for j, name in enumerate(variants):
+        out[f'qty_{name}'] = qty[:, j]
+        out[name] = rates[:, j]
+    return pd.DataFrame(out, index=df.index)
+
+
+def _atypical_from_cube(values, window, n_std):
+    """
+    Umbral y etiqueta para cada celda de un cubo (municipios × trimestres × variantes).
+
+    La celda t usa los trimestres t-window … t-1. Si alguno falta (inicio de la serie
+    o hueco en el panel) el umbral queda en NaN.
+    """
+    n_mun, n_per, n_var = values.shape
+    threshold = np.full(values.shape, np.nan)
+
+    if n_per > window:
+        # windows[:, j] cubre los trimestres j … j+window-1 → umbral del trimestre j+window
+        windows = sliding_window_view(values, window, axis=1)[:, :n_per - window]
+        mean = windows.mean(axis=-1)
+        std = windows.std(axis=-1, ddof=1)
+        threshold[:, window:] = np.round(mean + n_std * std, 3)
+
+    with np.errstate(invalid='ignore'):
+        label = np.where(np.isnan(threshold) | np.isnan(values), np.nan,
+                         (values > threshold).astype(np.float64))
+    return threshold, label
+
+
+def _attach_labels(df, names, window, n_std, municipality_col, time_col):
+    """Construye el cubo de índices de df y devuelve umbrales y etiquetas por fila."""
+    cube, index = panel_to_cube(df, list(names), municipality_col, time_col)
+    threshold, label = _atypical_from_cube(cube, window, n_std)
+
+    rows = (index['mun_idx'], index['period_idx'])
+    out = {}
+    for j, name in enumerate(names):
+        out[f'{name}_t'] = threshold[rows][:, j]
+        out[f'atypical_violence_{name}'] = label[rows][:, j]
+    return pd.DataFrame(out, index=df.index)
+
+
+def _finalize(df, names, dropna):
+    label_cols = [f'atypical_violence_{n}' for n in names]
+    if dropna:
+        df = df.dropna(subset=label_cols).reset_index(drop=True)
+        df[label_cols] = df[label_cols].astype(np.int64)
+    else:
+        df[label_cols] = df[label_cols].astype('Int64')
+    return df
+
+
+@instrumented
+@cached
+def label_panel(
+    df,
+    variants=None,
+    window=4,
+    n_std=1.0,
+    municipality_col='mun_code',
+    time_col='quarter',
+    population_col='population',
+    dropna=True,
+):
+    """
+    Calcula índices, umbrales y etiquetas de violencia atípica para todo el panel.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Panel largo con conteos qty_XX y población por municipio-trimestre.
+    variants : dict, optional
+        Ver compute_indices. Default: iacv e iacv2.
+    window : int
+        Trimestres previos usados para el umbral (default: 4).
+    n_std : float
+        Desviaciones estándar sobre la media (default: 1).
+    municipality_col, time_col, population_col : str
+    dropna : bool
+        Si True (default), descarta las filas sin `window` trimestres previos, igual
+        que el dropna() de indexes.ipynb, y deja las etiquetas como enteros 0/1.
+
+    Retorna
+    -------
+    df : pd.DataFrame
+        Copia de df con qty_<v>, <v>, <v>_t y atypical_violence_<v> por variante.
+    """
+    if variants is None:
+        variants = DEFAULT_VARIANTS
+    names = list(variants)
+
+    indices = compute_indices(df, variants, population_col)
+    out = pd.concat([df.drop(columns=indices.columns, errors='ignore'), indices], axis=1)
+    labels = _attach_labels(out, names, window, n_std, municipality_col, time_col)
+    out = pd.concat([out.drop(columns=labels.columns, errors='ignore'), labels], axis=1)
+
+    out = _finalize(out, names, dropna)
+    positives = ', '.join(f"{n}: {out[f'atypical_violence_{n}'].mean():.2%}" for n in names)
+    print(f"✓ Panel etiquetado: {len(out):,} filas | prevalencia → {positives}")
+    return out
+
+
+@instrumented
+def update_labels(
+    history,
+    new_rows,
+    variants=None,
+    window=4,
+    n_std=1.0,
+    municipality_col='mun_code',
+    time_col='quarter',
+    population_col='population',
+    dropna=True,
+):
+    """
+    Etiqueta solo los trimestres nuevos reutilizando la ventana final del histórico.
+
+    Del histórico solo se leen las columnas de índice de los últimos `window`
+    trimestres previos al primer trimestre nuevo; el costo no depende del largo
+    de la historia.
+
+    Parámetros
+    ----------
+    history : pd.DataFrame
+        Panel ya etiquetado (salida de label_panel), con las columnas de índice.
+    new_rows : pd.DataFrame
+        Filas de los trimestres nuevos con conteos qty_XX y población.
+    (resto) : ver label_panel.
+
+    Retorna
+    -------
+    new_labeled : pd.DataFrame
+        Solo las filas nuevas, con las mismas columnas añadidas que label_panel.
+    """
+    if variants is None:
+        variants = DEFAULT_VARIANTS
+    names = list(variants)
+
+    missing = [n for n in names if n not in history.columns]
+    if missing:
+        raise ValueError(f"El histórico no tiene las columnas de índice: {missing}")
+
+    indices = compute_indices(new_rows, variants, population_col)
+    new = pd.concat([new_rows.drop(columns=indices.columns, errors='ignore'), indices], axis=1)
+
+    first_new = period_codes(new[time_col]).min()
+    hist_codes = period_codes(history[time_col])
+    in_window = (hist_codes >= first_new - window) & (hist_codes < first_new)
+    tail = history.loc[in_window, [municipality_col, time_col] + names]
+
+    # Índices del histórico + nuevos en un cubo de a lo sumo window + n_nuevos trimestres
+    combined = pd.concat([tail, new[[municipality_col, time_col] + names]], ignore_index=True)
+    labels = _attach_labels(combined, names, window, n_std, municipality_col, time_col)
+    labels = labels.iloc[len(tail):].set_axis(new.index)
+
+    new = pd.concat([new.drop(columns=labels.columns, errors='ignore'), labels], axis=1)
+    new = _finalize(new, names, dropna)
+    print(f"✓ Trimestres nuevos etiquetados: {new[time_col].nunique()} "
+          f"({len(new):,} filas, ventana de {window} trimestres del histórico)")
+    return new
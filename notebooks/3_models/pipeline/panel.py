@@ -0,0 +1,106 @@
+"""
+Utilidades de panel — conversión entre formato largo y cubo denso
+=================================================================
+
+El panel municipio × trimestre se guarda en formato largo (una fila por
+par mun_code / quarter). Las operaciones temporales por municipio (rezagos,
+ventanas móviles, umbrales de violencia atípica) son mucho más rápidas sobre
+un arreglo denso de forma (municipios, trimestres, variables), donde un
+desplazamiento en el tiempo es un simple slicing sobre el eje 1.
+"""
+import numpy as np
+import pandas as pd
+
+
+def period_codes(periods):
+    """
+    Convierte trimestres a códigos enteros consecutivos (año * 4 + trimestre - 1).
+
+    Acepta pd.Period con frecuencia trimestral o strings 'YYYYQN'. Dos trimestres
+    consecutivos siempre difieren en exactamente 1, de modo que los huecos del
+    panel se detectan comparando códigos.
+
+    Parámetros
+    ----------
+    periods : pd.Series | array-like
+
+    Retorna
+    -------
+    codes : np.ndarray[int64]
+    """
+    s = pd.Series(periods)
+    if isinstance(s.dtype, pd.PeriodDtype):
+        return (s.dt.year * 4 + s.dt.quarter - 1).to_numpy(dtype=np.int64)
+
+    # Se parsea solo cada valor único: el panel repite cada trimestre ~1,100 veces
+    uniques, inverse = np.unique(s.astype(str).to_numpy(), return_inverse=True)
+    years = np.array([int(u[:4]) for u in uniques], dtype=np.int64)
+    quarters = np.array([int(u[-1]) for u in uniques], dtype=np.int64)
+    return (years * 4 + quarters - 1)[inverse]
+
+
+def code_to_period(codes):
+    """Convierte códigos enteros de trimestre de vuelta a strings 'YYYYQN'."""
+    codes = np.asarray(codes, dtype=np.int64)
+    return [f"{c // 4}Q{c % 4 + 1}" for c in codes]
+
+
+def panel_to_cube(df, value_cols, municipality_col='mun_code', time_col='quarter',
+                  dtype=np.float64):
+    """
+    Pasa un panel largo a un cubo denso (municipios × trimestres × variables).
+
+    Las celdas sin observación quedan en NaN, por lo que los huecos del panel
+    se respetan en cualquier operación posterior sobre el eje temporal.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+    value_cols : list[str]
+        Columnas numéricas a incluir en el cubo.
+    municipality_col, time_col : str
+    dtype : np.dtype
+        Tipo de dato del cubo (float64 por defecto).
+
+    Retorna
+    -------
+    cube : np.ndarray  (n_municipios, n_trimestres, len(value_cols))
+    index : dict
+        municipalities : valores únicos de municipio (orden del eje 0).
+        periods        : códigos enteros de trimestre (orden del eje 1, sin huecos).
+        mun_idx, period_idx : posición de cada fila de df en el cubo.
+    """
+    mun_idx, municipalities = pd.factorize(df[municipality_col], sort=True)
+    codes = period_codes(df[time_col])
+    first = codes.min()
+    periods = np.arange(first, codes.max() + 1, dtype=np.int64)
+    period_idx = codes - first
+
+    cube = np.full((len(municipalities), len(periods), len(value_cols)), np.nan, dtype=dtype)
+    cube[mun_idx, period_idx] = df[value_cols].to_numpy(dtype=dtype)
+
+    index = dict(
+        municipalities=np.asarray(municipalities),
+        periods=periods,
+        mun_idx=mun_idx,
+        period_idx=period_idx,
+    )
+    return cube, index
+
+
+def cube_to_panel(cube, index, columns):
+    """
+    Devuelve los valores del cubo alineados con las filas originales del panel.
+
+    Parámetros
+    ----------
+    cube : np.ndarray  (n_municipios, n_trimestres, n_variables)
+    index : dict  (el retornado por panel_to_cube).
+    columns : list[str]  — nombres de las variables del eje 2.
+
+    Retorna
+    -------
+    pd.DataFrame  con una fila por fila del panel original (mismo orden).
+    """
+    values = cube[index['mun_idx'], index['period_idx']]
+    return pd.DataFrame(values, columns=list(columns))
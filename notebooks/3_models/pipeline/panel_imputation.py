@@ -0,0 +1,241 @@
+"""
+Imputación por municipio sobre el cubo del panel (impute_missing(numeric_strategy='panel'))
+==========================================================================================
+
+SimpleImputer llena cada faltante con una sola mediana global de train. Aquí
+cada celda municipio × trimestre × variable se imputa con la historia del
+propio municipio, en este orden:
+
+1. Interpolación lineal de huecos internos de hasta `limit` trimestres, solo
+   si la observación que cierra el hueco cae dentro de train (esa historia ya
+   es conocida al final de train; val / test nunca usan valores posteriores).
+2. LOCF: último valor observado del municipio, si tiene a lo sumo `limit`
+   trimestres de antigüedad.
+3. Mediana (o media) del municipio en train.
+4. Mediana (o media) global de train, como SimpleImputer.
+
+Todo se resuelve con acumulados (maximum / minimum.accumulate) sobre el eje
+temporal del cubo (ver panel.panel_to_cube): todos los municipios a la vez,
+sin groupby().apply. Las variables se procesan por bloques para acotar la
+memoria.
+
+El estado ajustado (medianas, valores de relleno y la última observación de
+cada municipio × variable) queda en imputers['panel'] y score_quarter lo usa
+para imputar el trimestre puntuado con los mismos criterios (sin interpolación).
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .panel import code_to_period, panel_to_cube, period_codes
+
+
+# Celdas municipio × trimestre por bloque de variables (~8 arreglos auxiliares)
+_BLOCK_CELLS = 4_000_000
+
+METHODS = ('observado', 'interpolado', 'locf', 'mediana_municipio', 'global')
+
+_NO_PERIOD = -10 ** 9   # "sin observación previa": nunca queda a ≤ limit trimestres
+
+
+def _nan_stat(values, axis, strategy):
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', category=RuntimeWarning)
+        return np.nanmedian(values, axis=axis) if strategy == 'median' else np.nanmean(values, axis=axis)
+
+
+def _fill_block(cube, periods, limit, interp_until, mun_stat, global_fill,
+                seed_value=None, seed_period=None):
+    """
+    Imputa un bloque del cubo (municipios × trimestres × variables) en su lugar.
+
+    Retorna el método de cada celda: índice en METHODS (int8, mismo shape).
+    """
+    M, T, F = cube.shape
+    obs = ~np.isnan(cube)
+    t = np.arange(T, dtype=np.int32)[None, :, None]
+
+    prev = np.maximum.accumulate(np.where(obs, t, -1), axis=1)
+    prev_val = np.take_along_axis(cube, np.maximum(prev, 0), axis=1)
+    prev_code = np.where(prev >= 0, periods[np.maximum(prev, 0)], _NO_PERIOD)
+    code = periods[None, :, None]
+
+    if seed_value is not None:
+        # La última observación del ajuste gana si es más reciente y no posterior a t
+        use_seed = ((seed_period[:, None, :] > prev_code) & (seed_period[:, None, :] <= code)
+                    & ~np.isnan(seed_value)[:, None, :])
+        prev_val = np.where(use_seed, seed_value[:, None, :], prev_val)
+        prev_code = np.where(use_seed, seed_period[:, None, :], prev_code)
+
+    missing = ~obs
+    method = np.zeros(cube.shape, dtype=np.int8)
+
+    done = np.zeros_like(missing)
+    if interp_until is not None:
+        nxt = np.minimum.accumulate(np.where(obs, t, T)[:, ::-1], axis=1)[:, ::-1]
+        next_val = np.take_along_axis(cube, np.minimum(nxt, T - 1), axis=1)
+        ok = (missing & (prev >= 0) & (nxt < T) & (nxt - prev - 1 <= limit)
+              & (periods[np.minimum(nxt, T - 1)] <= interp_until))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            interp = prev_val + (next_val - prev_val) * (t - prev) / (nxt - prev)
+        cube[ok] = interp[ok]
+        method[ok] = 1
+        done |= ok
+
+    locf = missing & ~done & (code - prev_code <= limit)
+    cube[locf] = prev_val[locf]
+    method[locf] = 2
+    done |= locf
+
+    med = missing & ~done & ~np.isnan(mun_stat)[:, None, :]
+    cube[med] = np.broadcast_to(mun_stat[:, None, :], cube.shape)[med]
+    method[med] = 3
+    done |= med
+
+    rest = missing & ~done
+    cube[rest] = np.broadcast_to(global_fill[None, None, :], cube.shape)[rest]
+    method[rest] = 4
+    return method
+
+
+def _frame(X, ids, municipality_col, time_col):
+    frame = X.copy()
+    frame[municipality_col] = ids[municipality_col].to_numpy()
+    frame[time_col] = ids[time_col].to_numpy()
+    return frame
+
+
+def _blocks(n_cols, cells):
+    step = max(1, _BLOCK_CELLS // max(cells, 1))
+    return [slice(j, min(j + step, n_cols)) for j in range(0, n_cols, step)]
+
+
+def fit_panel_imputer(X, ids, train_mask, limit=4, interpolate=True, strategy='median'):
+    """
+    Ajusta la imputación por municipio e imputa X.
+
+    Parámetros
+    ----------
+    X : pd.DataFrame
+        Features numéricas de todas las filas (train + val + test).
+    ids : pd.DataFrame
+        Dos columnas alineadas con X: municipio y trimestre (en ese orden).
+    train_mask : array-like de bool
+        Filas de train: de ahí salen las medianas y el límite de la interpolación.
+    limit : int
+        Máximo de trimestres de un hueco interpolado y antigüedad máxima de LOCF.
+    interpolate : bool
+    strategy : str
+        'median' o 'mean' para las estadísticas municipales y globales.
+
+    Retorna
+    -------
+    X_imputed : pd.DataFrame  (mismo índice y columnas que X)
+    state : dict
+        feature_cols, municipality_col, time_col, limit, strategy, train_end,
+        municipalities, mun_stat, global_fill, last_value, last_period, counts.
+    """
+    if strategy not in ('median', 'mean'):
+        raise ValueError(f"strategy debe ser 'median' o 'mean', no {strategy!r}")
+    municipality_col, time_col = ids.columns[:2]
+    feature_cols = list(X.columns)
+    train_mask = np.asarray(train_mask, dtype=bool)
+
+    cube, index = panel_to_cube(_frame(X, ids, municipality_col, time_col), feature_cols,
+                                municipality_col, time_col)
+    M, T, F = cube.shape
+    periods = index['periods']
+    train_end = int(periods[index['period_idx'][train_mask]].max())
+
+    in_train = np.zeros((M, T), dtype=bool)
+    in_train[index['mun_idx'][train_mask], index['period_idx'][train_mask]] = True
+    train_values = X.to_numpy(dtype=np.float64, na_value=np.nan)[train_mask]
+    global_fill = np.nan_to_num(_nan_stat(train_values, 0, strategy), nan=0.0)
+
+    mun_stat = np.empty((M, F))
+    last_value = np.full((M, F), np.nan)
+    last_period = np.full((M, F), -1, dtype=np.int64)
+    counts = np.zeros(len(METHODS), dtype=np.int64)
+    t = np.arange(T)[None, :, None]
+    for cols in _blocks(F, M * T):
+        block = cube[:, :, cols]
+        obs = ~np.isnan(block)
+        mun_stat[:, cols] = _nan_stat(np.where(in_train[:, :, None], block, np.nan), 1, strategy)
+        last = np.where(obs, t, -1).max(axis=1)
+        at = np.maximum(last, 0)
+        last_value[:, cols] = np.where(last >= 0, np.take_along_axis(block, at[:, None], 1)[:, 0], np.nan)
+        last_period[:, cols] = np.where(last >= 0, periods[at], -1)
+
+        # block es una vista: _fill_block imputa el cubo en su lugar
+        method = _fill_block(block, periods, limit, train_end if interpolate else None,
+                             mun_stat[:, cols], global_fill[cols])
+        # Solo cuentan las filas del panel (no los huecos del cubo)
+        counts += np.bincount(method[index['mun_idx'], index['period_idx']].ravel(),
+                              minlength=len(METHODS))
+
+    X_imputed = pd.DataFrame(cube[index['mun_idx'], index['period_idx']],
+                             columns=feature_cols, index=X.index)
+    state = {
+        'feature_cols':     feature_cols,
+        'municipality_col': municipality_col,
+        'time_col':         time_col,
+        'limit':            int(limit),
+        'strategy':         strategy,
+        'train_end':        code_to_period([train_end])[0],
+        'municipalities':   np.asarray(index['municipalities']),
+        'mun_stat':         mun_stat,
+        'global_fill':      global_fill,
+        'last_value':       last_value,
+        'last_period':      last_period,
+        'counts':           dict(zip(METHODS, counts.tolist())),
+    }
+    return X_imputed, state
+
+
+def transform_panel(X, ids, state):
+    """
+    Imputa filas nuevas con un estado de fit_panel_imputer (LOCF, medianas, global).
+
+    Sin interpolación: al puntuar no hay observaciones posteriores. La última
+    observación guardada en el estado sirve de historia para municipios sin
+    filas previas en X.
+
+    Parámetros
+    ----------
+    X : pd.DataFrame  con las feature_cols del estado.
+    ids : pd.DataFrame  municipio y trimestre alineados con X.
+    state : dict
+
+    Retorna
+    -------
+    X_imputed : pd.DataFrame
+    """
+    feature_cols = state['feature_cols']
+    municipality_col, time_col = ids.columns[:2]
+    X = X[feature_cols]
+    cube, index = panel_to_cube(_frame(X, ids, municipality_col, time_col), feature_cols,
+                                municipality_col, time_col)
+    M, T, F = cube.shape
+
+    # Municipios nuevos: sin historia ni mediana propia → relleno global
+    pos = pd.Index(state['municipalities']).get_indexer(index['municipalities'])
+    known = pos >= 0
+    mun_stat = np.full((M, F), np.nan)
+    seed_value = np.full((M, F), np.nan)
+    seed_period = np.full((M, F), -1, dtype=np.int64)
+    mun_stat[known] = state['mun_stat'][pos[known]]
+    seed_value[known] = state['last_value'][pos[known]]
+    seed_period[known] = state['last_period'][pos[known]]
+
+    for cols in _blocks(F, M * T):
+        _fill_block(cube[:, :, cols], index['periods'], state['limit'], None, mun_stat[:, cols],
+                    state['global_fill'][cols], seed_value[:, cols], seed_period[:, cols])
+    return pd.DataFrame(cube[index['mun_idx'], index['period_idx']],
+                        columns=feature_cols, index=X.index)
+
+
+def history_start(period, state):
+    """Primer trimestre que hace falta leer para imputar `period` con LOCF."""
+    code = period_codes(pd.Series([str(period)]))[0]
+    return code_to_period([code - state['limit']])[0]
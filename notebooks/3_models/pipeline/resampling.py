@@ -0,0 +1,181 @@
+"""
+Alineación de frecuencias: fuentes anuales y mensuales → panel trimestral
+=========================================================================
+
+Versión vectorizada de lo que hacen dane_demografia.ipynb (expandir_a_trimestres
++ interpolar_iterativo) y night_lights.ipynb (index.repeat(4)):
+
+- annual_to_quarterly   : una fila anual → cuatro trimestres, con el valor anual
+                          en el trimestre ancla (Q4) o repetido en los cuatro.
+- monthly_to_quarterly  : agrega meses a trimestres por municipio.
+- interpolate_anchored  : llena Q1–Q3 a partir de los Q4 vecinos, con la misma
+                          regla secuencial del notebook de demografía.
+
+Todo opera sobre el panel completo con arreglos, sin loops por municipio ni iterrows.
+"""
+import numpy as np
+import pandas as pd
+
+from .panel import panel_to_cube
+from .instrumentation import instrumented
+
+
+@instrumented
+def annual_to_quarterly(
+    df,
+    value_cols,
+    id_col='mun_code',
+    year_col='year',
+    fill='anchor',
+    anchor_quarter=4,
+):
+    """
+    Expande un panel anual a trimestral.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Una fila por (id, año).
+    value_cols : list[str]
+    id_col, year_col : str
+    fill : str
+        'anchor' — el valor anual va al trimestre `anchor_quarter`, los demás quedan
+                   en NaN (para interpolate_anchored). Es el caso de demografía.
+        'repeat' — el valor anual se repite en los cuatro trimestres (luces nocturnas).
+    anchor_quarter : int  (1–4)
+
+    Retorna
+    -------
+    out : pd.DataFrame
+        Columnas id_col, year_col, 'quarter' (pd.Period trimestral) y value_cols,
+        ordenado por id y trimestre.
+    """
+    if fill not in ('anchor', 'repeat'):
+        raise ValueError(f"fill debe ser 'anchor' o 'repeat', no {fill!r}")
+
+    df = df.sort_values([id_col, year_col])
+    n = len(df)
+    years = df[year_col].to_numpy(dtype=np.int64)
+    q = np.tile(np.arange(1, 5), n)
+
+    out = pd.DataFrame({
+        id_col: np.repeat(df[id_col].to_numpy(), 4),
+        year_col: np.repeat(years, 4),
+    })
+    out['quarter'] = pd.PeriodIndex.from_ordinals(
+        np.repeat((years - 1970) * 4, 4) + q - 1, freq='Q'
+    )
+
+    for col in value_cols:
+        values = np.repeat(df[col].to_numpy(dtype=np.float64), 4)
+        if fill == 'anchor':
+            values[q != anchor_quarter] = np.nan
+        out[col] = values
+    return out
+
+
+@instrumented
+def monthly_to_quarterly(df, value_cols, id_col='mun_code', date_col='date', agg='sum'):
+    """
+    Agrega un panel mensual a trimestral por identificador.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Una fila por (id, mes). date_col puede ser fecha o pd.Period mensual.
+    value_cols : list[str]
+    id_col, date_col : str
+    agg : str | dict
+        Agregación de pandas ('sum', 'mean', 'last', …) o dict por columna.
+
+    Retorna
+    -------
+    out : pd.DataFrame  con id_col, 'quarter' (pd.Period trimestral) y value_cols.
+    """
+    dates = df[date_col]
+    if isinstance(dates.dtype, pd.PeriodDtype):
+        quarters = dates.dt.asfreq('Q')
+    else:
+        quarters = pd.to_datetime(dates).dt.to_period('Q')
+
+    out = (df[[id_col] + list(value_cols)]
+           .assign(quarter=quarters)
+           .groupby([id_col, 'quarter'], sort=True)[list(value_cols)]
+           .agg(agg)
+           .reset_index())
+    return out
+
+
+def _fill_anchored(values, floor):
+    """
+    Llena huecos interiores de cada fila de una matriz (ids × trimestres).
+
+    Reproduce interpolar_iterativo: recorriendo el tiempo hacia adelante, cada NaN
+    con un valor conocido antes y después toma el promedio entre el valor anterior
+    (ya llenado) y el siguiente valor conocido original. Los extremos sin vecino
+    en ambos lados quedan en NaN.
+    """
+    values = values.copy()
+    n_t = values.shape[1]
+    t = np.arange(n_t)
+    known = ~np.isnan(values)
+
+    # Último conocido hacia atrás y siguiente conocido hacia adelante (por fila)
+    last_idx = np.maximum.accumulate(np.where(known, t, -1), axis=1)
+    next_idx = np.minimum.accumulate(np.where(known, t, n_t)[:, ::-1], axis=1)[:, ::-1]
+
+    fillable = ~known & (last_idx >= 0) & (next_idx < n_t)
+    if not fillable.any():
+        return values
+
+    rows, cols = np.nonzero(fillable)
+    next_vals = values[rows, next_idx[rows, cols]]
+    offset = (cols - last_idx[rows, cols])
+
+    # Una pasada por posición dentro del hueco (3 para datos anuales anclados en Q4)
+    for k in range(1, offset.max() + 1):
+        sel = offset == k
+        r, c = rows[sel], cols[sel]
+        mid = (values[r, c - 1] + next_vals[sel]) / 2
+        values[r, c] = np.floor(mid) if floor else mid
+    return values
+
+
+@instrumented
+def interpolate_anchored(
+    df,
+    value_cols,
+    id_col='mun_code',
+    time_col='quarter',
+    floor=True,
+):
+    """
+    Llena los trimestres sin dato entre dos valores anuales conocidos.
+
+    Equivalente vectorizado de procesar_municipio / interpolar_iterativo de
+    dane_demografia.ipynb, aplicado a todos los municipios y columnas a la vez.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Panel trimestral (p. ej. salida de annual_to_quarterly con fill='anchor').
+    value_cols : list[str]
+    id_col, time_col : str
+    floor : bool
+        Si True (default), redondea hacia abajo cada valor interpolado (conteos de
+        población), como en el notebook.
+
+    Retorna
+    -------
+    out : pd.DataFrame  — copia de df con value_cols interpolados.
+    """
+    cube, index = panel_to_cube(df, list(value_cols), id_col, time_col)
+    n_id, n_t, n_var = cube.shape
+
+    # Todas las columnas se procesan como filas independientes de una sola matriz
+    flat = cube.transpose(2, 0, 1).reshape(n_var * n_id, n_t)
+    filled = _fill_anchored(flat, floor).reshape(n_var, n_id, n_t).transpose(1, 2, 0)
+
+    out = df.copy()
+    out[list(value_cols)] = filled[index['mun_idx'], index['period_idx']]
+    return out
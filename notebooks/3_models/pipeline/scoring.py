@@ -0,0 +1,329 @@
+"""
+Bundle del modelo y scoring del último trimestre
+================================================
+
+save_bundle guarda en un solo archivo todo lo necesario para puntuar sin volver
+a correr el notebook: imputadores de impute_missing, StandardScaler, modelo,
+threshold y feature_cols.
+
+Para modelos lineales (coef_ / intercept_) el bundle incluye además la versión
+fusionada imputación → escala → modelo:
+
+    z = where(isnan(x), fill, x) @ (coef / scale) + (intercept - (mean / scale) @ coef)
+
+de modo que score_quarter puntúa todos los municipios de un trimestre con un
+solo producto matriz-vector, sin pasar por los transformadores de sklearn.
+
+Este módulo no importa matplotlib ni seaborn:
+
+>>> from pipeline.scoring import score_quarter
+>>> alerts = score_quarter('modelo.joblib', DATA_PATH, period='2024Q4')
+
+serve() deja el bundle cargado detrás de un endpoint HTTP local.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrumented
+from .panel import code_to_period, period_codes
+from .panel_imputation import history_start, transform_panel
+
+
+BUNDLE_FORMAT = 1
+
+_LOADED = {}   # ruta → (mtime, bundle)
+
+
+def _fuse_linear(model, scaler, imputers, feature_cols):
+    """Pesos y sesgo de imputación + escala + modelo lineal; None si no aplica."""
+    coef = getattr(model, 'coef_', None)
+    if coef is None or coef.shape[0] != 1 or 'categorical' in imputers:
+        return None
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(feature_cols))
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(feature_cols))
+
+    # Sin imputador (train sin faltantes) un NaN se reemplaza por la media: aporte 0
+    fill = np.asarray(mean, dtype=np.float64).copy()
+    if 'numeric' in imputers:
+        imp = imputers['numeric']
+        pos = {c: i for i, c in enumerate(feature_cols)}
+        for c, v in zip(imp.feature_names_in_, imp.statistics_):
+            fill[pos[c]] = v
+
+    weights = coef[0] / scale
+    bias = float(model.intercept_[0] - mean @ weights)
+    return {'fill': fill, 'weights': weights, 'bias': bias}
+
+
+@instrumented
+def save_bundle(
+    path,
+    model,
+    scaler,
+    imputers,
+    threshold,
+    feature_cols,
+    municipality_col='mun_code',
+    time_col='quarter',
+    metadata=None,
+):
+    """
+    Guarda el modelo ajustado y su preprocesamiento en un archivo joblib.
+
+    Parámetros
+    ----------
+    path : str | Path
+    model : modelo ajustado con predict_proba (p. ej. de tune_hyperparameters).
+    scaler : StandardScaler de scale_features.
+    imputers : dict  de impute_missing ({'numeric': ..., 'categorical': ...}).
+    threshold : float  de optimize_threshold.
+    feature_cols : list[str]
+    municipality_col, time_col : str
+    metadata : dict, optional
+        Campos libres (experimento, target, último trimestre de entrenamiento …).
+
+    Retorna
+    -------
+    path : Path
+    """
+    import sklearn
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    bundle = {
+        'format':           BUNDLE_FORMAT,
+        'model':            model,
+        'scaler':           scaler,
+        'imputers':         dict(imputers),
+        'threshold':        float(threshold),
+        'feature_cols':     list(feature_cols),
+        'municipality_col': municipality_col,
+        'time_col':         time_col,
+        'linear':           _fuse_linear(model, scaler, imputers, list(feature_cols)),
+        'created':          datetime.now().isoformat(timespec='seconds'),
+        'sklearn_version':  sklearn.__version__,
+        'metadata':         dict(metadata or {}),
+    }
+    tmp = path.with_name(f'.{path.name}.tmp')
+    joblib.dump(bundle, tmp)
+    os.replace(tmp, path)
+    print(f"✓ Bundle guardado: {path} ({path.stat().st_size / 1e3:,.1f} KB, "
+          f"{len(feature_cols)} features, threshold {threshold:.4f})")
+    return path
+
+
+def load_bundle(path):
+    """Carga un bundle (queda en memoria; se relee solo si el archivo cambia)."""
+    path = Path(path)
+    mtime = path.stat().st_mtime_ns
+    cached = _LOADED.get(path)
+    if cached is None or cached[0] != mtime:
+        bundle = joblib.load(path)
+        if bundle.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"{path}: formato de bundle {bundle.get('format')} no soportado")
+        _LOADED[path] = cached = (mtime, bundle)
+    return cached[1]
+
+
+def _panel_imputed(bundle, X):
+    """Aplica imputers['panel'] (impute_missing(numeric_strategy='panel')) si hay faltantes."""
+    state = bundle['imputers'].get('panel')
+    if state is None:
+        return X
+    cols = state['feature_cols']
+    if not X[cols].isna().to_numpy().any():
+        return X
+    X = X.copy()
+    X[cols] = transform_panel(X[cols], X[[bundle['municipality_col'], bundle['time_col']]], state)
+    return X
+
+
+def _scaled(bundle, X):
+    """Features de X imputadas y estandarizadas como en el entrenamiento (ndarray)."""
+    cols = bundle['feature_cols']
+    X = X[cols].copy()
+    for kind in ('numeric', 'categorical'):
+        imp = bundle['imputers'].get(kind)
+        if imp is not None:
+            sub = list(imp.feature_names_in_)
+            X[sub] = imp.transform(X[sub])
+    return bundle['scaler'].transform(X)
+
+
+def predict_proba(bundle, X):
+    """Probabilidad de clase 1 para X (DataFrame con las feature_cols del bundle)."""
+    cols = bundle['feature_cols']
+    linear = bundle['linear']
+    X = _panel_imputed(bundle, X)
+    if linear is not None:
+        values = np.asarray(X[cols], dtype=np.float64)
+        values = np.where(np.isnan(values), linear['fill'], values)
+        z = values @ linear['weights'] + linear['bias']
+        return np.exp(-np.logaddexp(0.0, -z))            # sigmoide estable
+
+    X_sc = pd.DataFrame(_scaled(bundle, X), columns=cols, index=X.index)
+    return bundle['model'].predict_proba(X_sc)[:, 1]
+
+
+def _quarter_rows(bundle, data, period):
+    """
+    (filas del trimestre, trimestre) de un panel en memoria o de la ruta de load_data.
+
+    Con imputers['panel'] se leen también los `limit` trimestres previos y las
+    filas se imputan con esa historia antes de seleccionar el trimestre.
+    """
+    mun_col, time_col = bundle['municipality_col'], bundle['time_col']
+    state = bundle['imputers'].get('panel')
+    if not isinstance(data, pd.DataFrame):
+        from .step01_data_loading import load_data
+
+        periods = None
+        if period is not None:
+            periods = (period if state is None else history_start(period, state), period)
+        data = load_data(data, time_col=time_col, municipality_col=mun_col,
+                         columns=bundle['feature_cols'], periods=periods)
+
+    quarters = data[time_col].astype(str)
+    if period is None:
+        # El trimestre más reciente, no el de la última fila (el panel puede no estar ordenado)
+        period = code_to_period([period_codes(quarters).max()])[0] if len(quarters) else None
+    if state is not None and len(data):
+        codes = period_codes(quarters)
+        end = period_codes(pd.Series([str(period)]))[0]
+        data = _panel_imputed(bundle, data[(codes >= end - state['limit']) & (codes <= end)])
+        quarters = data[time_col].astype(str)
+    rows = data[(quarters == str(period)).to_numpy()]
+    if rows.empty:
+        raise ValueError(f"Sin filas para el trimestre {period}")
+    return rows, str(period)
+
+
+@instrumented
+def score_quarter(bundle, data, period=None):
+    """
+    Puntúa todos los municipios de un trimestre.
+
+    Parámetros
+    ----------
+    bundle : str | Path | dict
+        Ruta del bundle (ver save_bundle) o el bundle ya cargado.
+    data : pd.DataFrame | str | Path
+        Panel con las feature_cols, o ruta para load_data (solo se leen las
+        columnas del modelo y el trimestre pedido).
+    period : str, optional
+        Trimestre 'YYYYQN'. Default: el más reciente presente en data.
+
+    Retorna
+    -------
+    scores : pd.DataFrame
+        municipio, trimestre, proba, alerta y rank (1 = mayor probabilidad),
+        ordenado de mayor a menor probabilidad.
+    """
+    if not isinstance(bundle, dict):
+        bundle = load_bundle(bundle)
+    mun_col, time_col = bundle['municipality_col'], bundle['time_col']
+    rows, period = _quarter_rows(bundle, data, period)
+
+    proba = predict_proba(bundle, rows)
+    scores = pd.DataFrame({
+        mun_col:  rows[mun_col].to_numpy(),
+        time_col: period,
+        'proba':  proba,
+        'alerta': (proba >= bundle['threshold']).astype(np.int8),
+    })
+    order = np.argsort(-proba, kind='stable')
+    scores = scores.iloc[order].reset_index(drop=True)
+    scores['rank'] = np.arange(1, len(scores) + 1)
+    return scores
+
+
+# ── Endpoint HTTP local ────────────────────────────────────────────────────
+
+def _make_handler(bundle_path, data_path):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _score(self, data, period):
+            t0 = time.perf_counter()
+            scores = score_quarter(bundle_path, data, period=period)
+            return {'period': scores[load_bundle(bundle_path)['time_col']].iloc[0],
+                    'n_alerts': int(scores['alerta'].sum()),
+                    'elapsed_ms': (time.perf_counter() - t0) * 1e3,
+                    'scores': scores.to_dict(orient='records')}
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                if url.path == '/health':
+                    b = load_bundle(bundle_path)
+                    self._send(200, {'status': 'ok', 'created': b['created'],
+                                     'threshold': b['threshold'],
+                                     'n_features': len(b['feature_cols']),
+                                     'metadata': b['metadata']})
+                elif url.path == '/score':
+                    if data_path is None:
+                        self._send(400, {'error': 'servidor sin data_path: usar POST /score'})
+                        return
+                    period = parse_qs(url.query).get('period', [None])[0]
+                    self._send(200, self._score(data_path, period))
+                else:
+                    self._send(404, {'error': f'ruta desconocida: {url.path}'})
+            except Exception as exc:
+                self._send(500, {'error': f'{type(exc).__name__}: {exc}'})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/score':
+                self._send(404, {'error': f'ruta desconocida: {self.path}'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                rows = pd.DataFrame(payload['rows'])
+                for c in load_bundle(bundle_path)['feature_cols']:
+                    if c in rows:
+                        rows[c] = pd.to_numeric(rows[c], errors='coerce')
+                self._send(200, self._score(rows, payload.get('period')))
+            except Exception as exc:
+                self._send(400, {'error': f'{type(exc).__name__}: {exc}'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(bundle_path, data_path=None, host='127.0.0.1', port=8000):
+    """
+    Sirve el bundle por HTTP local (bloquea hasta Ctrl+C).
+
+    GET  /health               — metadatos del bundle.
+    GET  /score?period=YYYYQN  — puntúa el trimestre leyendo data_path.
+    POST /score                — {"rows": [{mun_code, quarter, features…}, …],
+                                  "period": "YYYYQN" (opcional; default: el trimestre
+                                  más reciente de rows)}.
+
+    El bundle se carga una vez y se relee solo si el archivo cambia.
+    """
+    load_bundle(bundle_path)
+    server = ThreadingHTTPServer((host, port), _make_handler(bundle_path, data_path))
+    print(f"✓ Scoring en http://{host}:{port} (bundle: {bundle_path})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
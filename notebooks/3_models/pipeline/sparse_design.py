@@ -0,0 +1,147 @@
+"""
+Matriz de diseño dispersa (CSR) y float32: imputación + escala + ajuste
+======================================================================
+
+Alternativa a impute_missing + scale_features para paneles anchos donde la
+mayoría de columnas (conteos de delitos, rezagos) son cero en casi todos los
+municipio-trimestres.
+
+- Las columnas con al menos `sparse_threshold` de ceros en train se guardan en
+  CSR y se escalan SIN centrar (x / std). Centrar solo desplaza el intercepto:
+  w·(x - m)/s + b = w·x/s + (b - w·m/s), y el intercepto no se penaliza, así que
+  el Elastic Net converge a los mismos coeficientes que con StandardScaler.
+- Las demás columnas se imputan y estandarizan como siempre (también en la CSR).
+- Todo se almacena en float32; saga ajusta directamente sobre la CSR.
+
+La matriz se arma columna por columna desde el DataFrame (o el panel completo con
+feature_cols), sin copias densas intermedias en float64.
+
+>>> X_tr, X_va, X_te, design = build_sparse_design(df, train_mask, val_mask, test_mask,
+...                                                feature_cols=feature_cols)
+>>> best_model, cv_results = tune_hyperparameters(sp.vstack([X_tr, X_va]), ...)
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from .instrumentation import instrumented, record_stats
+
+
+def _column_block(values, rows, fill, mean, scale, dtype):
+    """(índices, datos) no nulos de una columna ya imputada y escalada, para las filas dadas."""
+    v = values[rows]
+    v = np.where(np.isnan(v), fill, v)
+    v = ((v - mean) / scale).astype(dtype, copy=False)
+    nz = np.flatnonzero(v)
+    return nz, v[nz]
+
+
+def _to_csr(blocks, n_rows, n_cols, dtype):
+    """Arma una CSR a partir de bloques (índices de fila, datos) por columna."""
+    nnz = np.array([len(idx) for idx, _ in blocks], dtype=np.int64)
+    indptr = np.concatenate([[0], np.cumsum(nnz)])
+    index_dtype = np.int32 if indptr[-1] < np.iinfo(np.int32).max else np.int64
+    indices = np.empty(indptr[-1], dtype=index_dtype)
+    data = np.empty(indptr[-1], dtype=dtype)
+    for j, (idx, vals) in enumerate(blocks):
+        indices[indptr[j]:indptr[j + 1]] = idx
+        data[indptr[j]:indptr[j + 1]] = vals
+    csc = sp.csc_matrix((data, indices, indptr.astype(index_dtype)), shape=(n_rows, n_cols))
+    return csc.tocsr()
+
+
+@instrumented
+def build_sparse_design(
+    X,
+    train_mask,
+    val_mask,
+    test_mask,
+    feature_cols=None,
+    sparse_threshold=0.7,
+    strategy='median',
+    dtype=np.float32,
+):
+    """
+    Imputa y escala con estadísticas de train, y retorna matrices CSR.
+
+    Parámetros
+    ----------
+    X : pd.DataFrame
+        Features (salida de prepare_features) o el panel completo con feature_cols.
+    train_mask, val_mask, test_mask : array-like de bool
+        Máscaras de create_temporal_splits.
+    feature_cols : list[str], optional
+        Default: todas las columnas de X.
+    sparse_threshold : float
+        Fracción mínima de ceros en train para escalar una columna sin centrar.
+    strategy : str
+        'median' o 'mean' — imputación, como en impute_missing.
+    dtype : np.dtype
+        float32 (default) o float64.
+
+    Retorna
+    -------
+    X_train, X_val, X_test : scipy.sparse.csr_matrix
+    design : dict
+        feature_cols, fill, mean (0 en columnas dispersas), scale, sparse
+        (máscara de columnas dispersas) — ver transform_design.
+    """
+    if strategy not in ('median', 'mean'):
+        raise ValueError(f"strategy debe ser 'median' o 'mean', no {strategy!r}")
+    feature_cols = list(X.columns if feature_cols is None else feature_cols)
+    masks = [np.asarray(m, dtype=bool) for m in (train_mask, val_mask, test_mask)]
+    rows = [np.flatnonzero(m) for m in masks]
+    train_rows = rows[0]
+
+    n_cols = len(feature_cols)
+    fill = np.zeros(n_cols)
+    mean = np.zeros(n_cols)
+    scale = np.ones(n_cols)
+    is_sparse = np.zeros(n_cols, dtype=bool)
+    blocks = ([], [], [])
+
+    for j, col in enumerate(feature_cols):
+        values = X[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        tr = values[train_rows]
+        valid = tr[~np.isnan(tr)]
+        if len(valid):
+            fill[j] = np.median(valid) if strategy == 'median' else valid.mean()
+        tr = np.where(np.isnan(tr), fill[j], tr)
+
+        is_sparse[j] = (tr == 0).mean() >= sparse_threshold
+        if not is_sparse[j]:
+            mean[j] = tr.mean()
+        std = np.sqrt(((tr - tr.mean()) ** 2).mean()) if len(tr) else 0.0
+        scale[j] = std if std > 0 else 1.0
+
+        for out, r in zip(blocks, rows):
+            out.append(_column_block(values, r, fill[j], mean[j], scale[j], dtype))
+
+    X_train, X_val, X_test = (_to_csr(b, len(r), n_cols, dtype) for b, r in zip(blocks, rows))
+
+    design = {'feature_cols': feature_cols, 'fill': fill, 'mean': mean,
+              'scale': scale, 'sparse': is_sparse, 'dtype': np.dtype(dtype).str}
+
+    dense_bytes = sum(len(r) for r in rows) * n_cols * 8
+    sparse_bytes = sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+                       for m in (X_train, X_val, X_test))
+    density = X_train.nnz / max(X_train.shape[0] * n_cols, 1)
+    record_stats(n_sparse_cols=int(is_sparse.sum()), density=float(density),
+                 dense_mb=dense_bytes / 1e6, sparse_mb=sparse_bytes / 1e6)
+
+    print(f"✓ Matriz de diseño dispersa ({np.dtype(dtype).name}): {n_cols} features, "
+          f"{is_sparse.sum()} sin centrar (≥ {sparse_threshold:.0%} ceros)")
+    print(f"  Densidad train: {density:.1%} | Memoria: {sparse_bytes / 1e6:,.1f} MB "
+          f"(denso float64: {dense_bytes / 1e6:,.1f} MB)")
+    return X_train, X_val, X_test, design
+
+
+def transform_design(X, design):
+    """Aplica la imputación y escala de un design a nuevas filas (p. ej. el último trimestre)."""
+    dtype = np.dtype(design['dtype'])
+    rows = np.arange(len(X))
+    blocks = [
+        _column_block(X[col].to_numpy(dtype=np.float64, na_value=np.nan), rows,
+                      design['fill'][j], design['mean'][j], design['scale'][j], dtype)
+        for j, col in enumerate(design['feature_cols'])
+    ]
+    return _to_csr(blocks, len(X), len(design['feature_cols']), dtype)
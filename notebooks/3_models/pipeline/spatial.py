@@ -0,0 +1,401 @@
+"""
+Índice espacial de municipios y rezagos espaciales del panel
+============================================================
+
+build_spatial_index lee una vez los polígonos DIVIPOLA (shapefile o GeoJSON
+del MGN del DANE) y guarda la vecindad como matriz dispersa municipio ×
+municipio:
+
+- 'queen': municipios que comparten al menos un vértice de su frontera
+  (contigüidad tipo reina, como libpysal). Los municipios sin vecinos (islas)
+  se conectan a su centroide más cercano.
+- 'knn':   los k centroides más cercanos (distancia sobre la esfera si las
+  coordenadas son lon / lat).
+
+Los archivos se leen sin geopandas: GeoJSON con json y el .shp / .dbf con
+struct y numpy (solo la geometría de polígonos y el campo del código).
+
+spatial_lag_features calcula, para todas las columnas y todos los trimestres a
+la vez, la media, el máximo y la suma (p. ej. vecinos en alerta) sobre los
+vecinos con productos matriz dispersa × cubo del panel (ver panel_to_cube).
+
+>>> index = build_spatial_index(raw / 'dane' / 'MGN_MPIO_POLITICO.shp',
+...                             cache_dir=temp / 'spatial')
+>>> lags = spatial_lag_features(df, index, ['iacv', 'atypical_violence_iacv'],
+...                             stats=['mean', 'max', 'sum'], lag=1)
+"""
+import hashlib
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .instrumentation import instrumented, record_stats
+from .panel import panel_to_cube
+
+
+SPATIAL_VERSION = '1'   # Cambiar si cambia la construcción del índice
+
+SPATIAL_STATS = ('mean', 'max', 'sum', 'count')
+
+
+# ── Lectura de polígonos ────────────────────────────────────────────────────
+
+def _geojson_rings(path, code_field):
+    with open(path, encoding='utf-8') as f:
+        features = json.load(f)['features']
+    codes, rings = [], []
+    for feat in features:
+        geom = feat.get('geometry') or {}
+        if geom.get('type') == 'Polygon':
+            polygons = [geom['coordinates']]
+        elif geom.get('type') == 'MultiPolygon':
+            polygons = geom['coordinates']
+        else:
+            continue
+        codes.append(str(feat['properties'][code_field]))
+        rings.append([np.asarray(ring, dtype=np.float64)[:, :2] for poly in polygons for ring in poly])
+    return codes, rings
+
+
+def _dbf_column(path, field):
+    """Valores (str) de un campo de un .dbf."""
+    data = Path(path).read_bytes()
+    n_records, header_len, record_len = struct.unpack('<IHH', data[4:12])
+    offset, pos = 1, 32                     # byte 0 de cada registro: marca de borrado
+    while data[pos] != 0x0D:
+        name = data[pos:pos + 11].split(b'\0')[0].decode('latin-1')
+        length = data[pos + 16]
+        if name.upper() == field.upper():
+            break
+        offset += length
+        pos += 32
+    else:
+        raise KeyError(f"{Path(path).name}: no existe el campo {field!r}")
+    records = np.frombuffer(data, dtype=np.uint8, count=n_records * record_len,
+                            offset=header_len).reshape(n_records, record_len)
+    raw = records[:, offset:offset + length]
+    return [bytes(r).decode('latin-1').strip() for r in raw]
+
+
+def _shp_rings(path):
+    """Anillos de cada registro poligonal (tipos 5, 15, 25) de un .shp."""
+    data = Path(path).read_bytes()
+    if struct.unpack('>i', data[:4])[0] != 9994:
+        raise ValueError(f"{Path(path).name} no es un shapefile")
+    rings, pos = [], 100
+    while pos < len(data):
+        length = struct.unpack('>i', data[pos + 4:pos + 8])[0] * 2
+        content = pos + 8
+        shape_type = struct.unpack('<i', data[content:content + 4])[0]
+        if shape_type == 0:
+            rings.append([])
+        elif shape_type in (5, 15, 25):
+            n_parts, n_points = struct.unpack('<ii', data[content + 36:content + 44])
+            parts = np.frombuffer(data, dtype='<i4', count=n_parts, offset=content + 44)
+            points = np.frombuffer(data, dtype='<f8', count=2 * n_points,
+                                   offset=content + 44 + 4 * n_parts).reshape(n_points, 2)
+            bounds = np.append(parts, n_points)
+            rings.append([points[a:b] for a, b in zip(bounds[:-1], bounds[1:])])
+        else:
+            raise ValueError(f"{Path(path).name}: tipo de geometría {shape_type} no es polígono")
+        pos = content + length
+    return rings
+
+
+def read_polygons(path, code_field='MPIO_CDPMP'):
+    """
+    Códigos DIVIPOLA y anillos de cada municipio.
+
+    Parámetros
+    ----------
+    path : str | Path
+        .shp (con su .dbf al lado), .geojson o .json.
+    code_field : str
+        Campo con el código de municipio (5 dígitos; se completa con ceros).
+
+    Retorna
+    -------
+    codes : list[str]
+    rings : list[list[np.ndarray]]  anillos (n × 2) de cada municipio.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.shp':
+        rings = _shp_rings(path)
+        codes = _dbf_column(path.with_suffix('.dbf'), code_field)
+    elif path.suffix.lower() in ('.geojson', '.json'):
+        codes, rings = _geojson_rings(path, code_field)
+    else:
+        raise ValueError(f"Formato no soportado: {path.suffix} (usar .shp o .geojson)")
+    codes = [c.split('.')[0].zfill(5) for c in codes]
+    if len(set(codes)) != len(codes):
+        raise ValueError(f"{path.name}: códigos {code_field} repetidos")
+    return codes, rings
+
+
+# ── Construcción del índice ─────────────────────────────────────────────────
+
+def _flatten(rings):
+    """Vértices concatenados, municipio de cada vértice y marca de fin de anillo."""
+    blocks = [r for poly in rings for r in poly]
+    owner = np.repeat(np.arange(len(rings)),
+                      [sum(len(r) for r in poly) for poly in rings])
+    xy = np.concatenate(blocks) if blocks else np.empty((0, 2))
+    ring_end = np.zeros(len(xy), dtype=bool)
+    ring_end[np.cumsum([len(r) for r in blocks]) - 1] = True
+    return xy, owner, ring_end
+
+
+def _centroids(xy, owner, ring_end, n):
+    """Centroides por área (fórmula del polígono; los huecos restan por su orientación)."""
+    x0, y0 = xy[:-1].T
+    x1, y1 = xy[1:].T
+    cross = np.where(ring_end[:-1], 0.0, x0 * y1 - x1 * y0)
+    who = owner[:-1]
+    area = np.bincount(who, cross, minlength=n) / 2
+    cx = np.bincount(who, (x0 + x1) * cross, minlength=n) / (6 * np.where(area == 0, 1, area))
+    cy = np.bincount(who, (y0 + y1) * cross, minlength=n) / (6 * np.where(area == 0, 1, area))
+    # Polígonos degenerados: promedio de vértices
+    flat = area == 0
+    if flat.any():
+        counts = np.maximum(np.bincount(owner, minlength=n), 1)
+        cx[flat] = (np.bincount(owner, xy[:, 0], minlength=n) / counts)[flat]
+        cy[flat] = (np.bincount(owner, xy[:, 1], minlength=n) / counts)[flat]
+    return np.column_stack([cx, cy])
+
+
+def _knn(centroids, k):
+    """Matriz (n × n) de los k vecinos más cercanos de cada centroide."""
+    from scipy.spatial import cKDTree
+
+    n = len(centroids)
+    k = min(k, n - 1)
+    if np.abs(centroids).max() <= 180:
+        lon, lat = np.radians(centroids).T
+        pts = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    else:
+        pts = centroids
+    _, nbrs = cKDTree(pts).query(pts, k=k + 1)
+    nbrs = nbrs[:, 1:]
+    rows = np.repeat(np.arange(n), k)
+    return sp.csr_matrix((np.ones(n * k), (rows, nbrs.ravel())), shape=(n, n))
+
+
+def _queen(xy, owner, n, precision):
+    """Municipios que comparten algún vértice (coordenadas redondeadas a `precision` decimales)."""
+    q = np.round(xy * 10 ** precision).astype(np.int64)
+    q -= q.min(axis=0)
+    key = q[:, 0] * (q[:, 1].max() + 1) + q[:, 1]
+    _, vertex = np.unique(key, return_inverse=True)
+    incidence = sp.csr_matrix((np.ones(len(vertex)), (vertex.ravel(), owner)),
+                              shape=(vertex.max() + 1, n))
+    incidence.data[:] = 1.0
+    shared = (incidence.T @ incidence).tocsr()
+    shared.setdiag(0)
+    shared.eliminate_zeros()
+    shared.data[:] = 1.0
+    return shared
+
+
+def _index_key(path, method, k, code_field, precision):
+    h = hashlib.sha256(f'{SPATIAL_VERSION}|{method}|{k}|{code_field}|{precision}'.encode())
+    path = Path(path)
+    for p in [path] + ([path.with_suffix('.dbf')] if path.suffix.lower() == '.shp' else []):
+        h.update(p.read_bytes())
+    return h.hexdigest()[:24]
+
+
+@instrumented
+def build_spatial_index(
+    polygons_path,
+    method='queen',
+    k=6,
+    code_field='MPIO_CDPMP',
+    precision=6,
+    cache_dir=None,
+):
+    """
+    Construye (o lee de caché) la matriz de vecindad entre municipios.
+
+    Parámetros
+    ----------
+    polygons_path : str | Path
+        Shapefile o GeoJSON de municipios DIVIPOLA.
+    method : str
+        'queen' (comparten frontera o vértice) o 'knn'.
+    k : int
+        Vecinos por municipio con 'knn'.
+    code_field : str
+        Campo con el código DIVIPOLA de 5 dígitos.
+    precision : int
+        Decimales al comparar vértices con 'queen' (6 ≈ 0.1 m en grados).
+    cache_dir : str | Path, optional
+        Si se indica, el índice se guarda en .npz con una llave derivada del
+        contenido del archivo y de los parámetros; una segunda llamada solo lee
+        el archivo.
+
+    Retorna
+    -------
+    index : dict
+        codes (códigos en el orden de la matriz), matrix (csr binaria n × n,
+        fila = municipio, columnas = vecinos), centroids, method, k.
+    """
+    if method not in ('queen', 'knn'):
+        raise ValueError(f"method debe ser 'queen' o 'knn', no {method!r}")
+
+    cache_path = None
+    if cache_dir is not None:
+        key = _index_key(polygons_path, method, k, code_field, precision)
+        cache_path = Path(cache_dir) / f'spatial_{method}_{key}.npz'
+        if cache_path.exists():
+            z = np.load(cache_path, allow_pickle=False)
+            n = len(z['codes'])
+            matrix = sp.csr_matrix((z['data'], z['indices'], z['indptr']), shape=(n, n))
+            print(f"✓ Índice espacial desde caché: {n:,} municipios, "
+                  f"{matrix.nnz:,} vecindades ({cache_path.name})")
+            return {'codes': z['codes'], 'matrix': matrix, 'centroids': z['centroids'],
+                    'method': method, 'k': int(k)}
+
+    codes, rings = read_polygons(polygons_path, code_field)
+    n = len(codes)
+    xy, owner, ring_end = _flatten(rings)
+    centroids = _centroids(xy, owner, ring_end, n)
+
+    if method == 'knn':
+        matrix = _knn(centroids, k)
+    else:
+        matrix = _queen(xy, owner, n, precision)
+        islands = np.flatnonzero(np.diff(matrix.indptr) == 0)
+        if len(islands) and n > 1:
+            nearest = _knn(centroids, 1)[islands]
+            link = sp.csr_matrix((np.ones(len(islands)), (islands, nearest.indices)), shape=(n, n))
+            matrix = ((matrix + link + link.T) > 0).astype(np.float64).tocsr()
+            print(f"  {len(islands)} municipios sin frontera común conectados a su vecino más cercano")
+
+    index = {'codes': np.asarray(codes), 'matrix': matrix, 'centroids': centroids,
+             'method': method, 'k': int(k)}
+    n_nbrs = np.diff(matrix.indptr)
+    record_stats(n_municipalities=n, n_links=int(matrix.nnz), n_vertices=len(xy))
+    print(f"✓ Índice espacial ({method}): {n:,} municipios, {len(xy):,} vértices | "
+          f"vecinos por municipio: media {n_nbrs.mean():.1f}, máx. {n_nbrs.max()}")
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_path, codes=index['codes'], data=matrix.data, indices=matrix.indices,
+                 indptr=matrix.indptr, centroids=centroids)
+    return index
+
+
+# ── Rezagos espaciales ──────────────────────────────────────────────────────
+
+def _neighbour_max(W, values):
+    """Máximo (ignorando NaN) de los vecinos de cada fila; NaN sin vecinos observados."""
+    # Tabla de vecinos rellena con una fila de NaN: una pasada de fmax por posición
+    # (el grado máximo es chico), en lugar de un reduceat sobre todas las vecindades.
+    n, m = values.shape
+    degree = np.diff(W.indptr)
+    table = np.full((n, max(int(degree.max(initial=0)), 1)), n, dtype=np.int64)
+    table[np.repeat(np.arange(n), degree), np.arange(W.nnz) - np.repeat(W.indptr[:-1], degree)] = W.indices
+    padded = np.vstack([values, np.full((1, m), np.nan, dtype=values.dtype)])
+    out = padded[table[:, 0]]
+    for d in range(1, table.shape[1]):
+        np.fmax(out, padded[table[:, d]], out=out)
+    return out
+
+
+def spatial_feature_names(columns, stats=('mean', 'max', 'sum')):
+    """Nombres de columnas de spatial_lag_features, en el orden de salida."""
+    return [f'{col}_sp_{stat}' for col in columns for stat in stats]
+
+
+@instrumented
+def spatial_lag_features(
+    df,
+    index,
+    columns,
+    stats=('mean', 'max', 'sum'),
+    lag=0,
+    municipality_col='mun_code',
+    time_col='quarter',
+    dtype=np.float64,
+):
+    """
+    Rezagos espaciales de columnas del panel para todos los trimestres.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+        Panel largo (una fila por municipio-trimestre).
+    index : dict  de build_spatial_index.
+    columns : list[str]
+    stats : list[str]
+        'mean'  — media de los vecinos observados;
+        'max'   — máximo;
+        'sum'   — suma (con una columna 0/1, vecinos en alerta);
+        'count' — vecinos con valor observado.
+    lag : int
+        Trimestres de rezago de los valores de los vecinos. Con variables del
+        mismo trimestre que el target (o el target mismo) usar lag ≥ 1.
+    municipality_col, time_col : str
+    dtype : np.dtype
+
+    Retorna
+    -------
+    features : pd.DataFrame
+        Columnas <col>_sp_<stat> (ver spatial_feature_names), mismo índice que df.
+        Municipios ausentes del índice o sin vecinos observados quedan en NaN
+        (0 en 'sum' y 'count').
+    """
+    stats = list(stats)
+    unknown = set(stats) - set(SPATIAL_STATS)
+    if unknown:
+        raise ValueError(f"Estadísticos espaciales no soportados: {sorted(unknown)}")
+    columns = list(columns)
+
+    cube, cidx = panel_to_cube(df, columns, municipality_col, time_col, dtype=dtype)
+    M, T, C = cube.shape
+    if lag:
+        shifted = np.full_like(cube, np.nan)
+        shifted[:, lag:] = cube[:, :T - lag]
+        cube = shifted
+
+    # Submatriz del índice en el orden de municipios del cubo
+    mun_codes = pd.Index(cidx['municipalities']).astype(str).str.zfill(5)
+    pos = pd.Index(index['codes']).get_indexer(mun_codes)
+    known = pos >= 0
+    sel = sp.csr_matrix((np.ones(known.sum()), (np.flatnonzero(known), pos[known])),
+                        shape=(M, len(index['codes'])))
+    W = (sel @ index['matrix'] @ sel.T).tocsr().astype(dtype)
+    W.sort_indices()
+
+    values = cube.reshape(M, T * C)
+    observed = ~np.isnan(values)
+    if {'mean', 'sum', 'count'} & set(stats):
+        total = W @ np.where(observed, values, 0)
+        count = W @ observed.astype(dtype)
+
+    # Cada estadístico se escribe directo en las filas del panel (sin cubo de salida)
+    S = len(stats)
+    rows = np.empty((len(df), C * S), dtype=dtype)
+    for s, stat in enumerate(stats):
+        if stat == 'max':
+            result = _neighbour_max(W, values)
+        elif stat == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = np.where(count > 0, total / count, np.nan)
+        else:
+            result = total if stat == 'sum' else count
+        rows[:, s::S] = result.reshape(M, T, C)[cidx['mun_idx'], cidx['period_idx']]
+    features = pd.DataFrame(rows, columns=spatial_feature_names(columns, stats),
+                            index=df.index, copy=False)
+
+    missing = int((~known).sum())
+    record_stats(n_features=features.shape[1], n_unindexed=missing)
+    print(f"✓ Rezagos espaciales: {features.shape[1]} columnas × {len(df):,} filas "
+          f"({len(columns)} variables × {len(stats)} estadísticos, rezago {lag})")
+    if missing:
+        print(f"  ⚠️  {missing} municipios del panel sin polígono en el índice (→ NaN)")
+    return features
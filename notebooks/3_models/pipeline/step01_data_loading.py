@@ -1,21 +1,201 @@
 """
 PASO 1 — Carga y preparación de datos
 """
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from .panel import period_codes
+from .caching import cached
+from .instrumentation import instrumented
+
+
+PARTITION_COLS = ['año', 'trimestre']
+
+
+def _add_time_cols(df, time_col, dtype=np.int64):
+    """Agrega año, trimestre y periodo_num a partir de la columna 'YYYYQN'."""
+    if 'año' not in df.columns or 'trimestre' not in df.columns:
+        # period_codes parsea solo los trimestres únicos, no cada fila
+        codes = period_codes(df[time_col])
+        df['año'] = (codes // 4).astype(dtype)
+        df['trimestre'] = (codes % 4 + 1).astype(dtype)
+    else:
+        # Vienen de las carpetas de partición
+        df['año'] = df['año'].astype(dtype)
+        df['trimestre'] = df['trimestre'].astype(dtype)
+    df['periodo_num'] = (df['año'].astype(np.int32) * 10 + df['trimestre']).astype(np.int32)
+    return df
+
+
+def _read_file_periods(data_path, time_col, columns, periods):
+    """
+    Lee de un archivo único solo lo que cae en un rango 'YYYYQN' (el rango exacto
+    se aplica después, en load_data).
+
+    - time_col como string 'YYYYQN': filtro de pyarrow (orden lexicográfico =
+      cronológico), que descarta row groups por sus estadísticas.
+    - time_col como pd.Period guardado por pandas (ordinales enteros): pyarrow no
+      compara el tipo extendido, así que los row groups se eligen con las
+      estadísticas min / max de los ordinales.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(data_path)
+    storage = pf.schema_arrow.field(time_col).type
+    start, end = periods
+    if pa.types.is_string(storage) or pa.types.is_large_string(storage):
+        filters = []
+        if start is not None:
+            filters.append((time_col, '>=', str(start)))
+        if end is not None:
+            filters.append((time_col, '<=', str(end)))
+        return pq.read_table(data_path, columns=columns, filters=filters or None).to_pandas()
+
+    if not pa.types.is_integer(storage):
+        return pf.read(columns=columns).to_pandas()
+    lo = -np.inf if start is None else pd.Period(str(start), freq='Q').ordinal
+    hi = np.inf if end is None else pd.Period(str(end), freq='Q').ordinal
+    j = pf.schema_arrow.get_field_index(time_col)
+    groups = []
+    for i in range(pf.num_row_groups):
+        stats = pf.metadata.row_group(i).column(j).statistics
+        if stats is None or not stats.has_min_max or (stats.max >= lo and stats.min <= hi):
+            groups.append(i)
+    return pf.read_row_groups(groups, columns=columns).to_pandas()
+
+
+@instrumented
+def compact_panel(df, time_col='quarter', municipality_col='mun_code', rtol=1e-6):
+    """
+    Reduce la memoria del panel sin cambiar su contenido.
+
+    - municipality_col y time_col → category ordenada.
+    - Columnas float64 → float32 solo si todos sus valores se recuperan con
+      tolerancia relativa `rtol`; las demás se mantienen en float64.
+    - Enteros → el tipo entero más pequeño que los contiene.
+
+    Retorna
+    -------
+    df : pd.DataFrame  (modificado en el lugar y retornado).
+    """
+    before = df.memory_usage(deep=True).sum()
+
+    # Categorías ordenadas: min / max / sort siguen funcionando como con strings
+    for col in (municipality_col, time_col):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = np.sort(df[col].dropna().unique())
+            df[col] = df[col].astype(pd.CategoricalDtype(categories, ordered=True))
+
+    kept = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == np.float64:
+            values = df[col].to_numpy()
+            down = values.astype(np.float32)
+            if np.allclose(down, values, rtol=rtol, atol=0, equal_nan=True):
+                df[col] = down
+            else:
+                kept.append(col)
+        elif pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+
+    after = df.memory_usage(deep=True).sum()
+    print(f"✓ Panel compacto: {before / 1e6:,.1f} MB → {after / 1e6:,.1f} MB "
+          f"({after / before:.0%})")
+    if kept:
+        print(f"  Se mantienen en float64 por precisión: {kept}")
+    return df
+
+
+def _is_sorted(df, municipality_col):
+    """True si df ya está ordenado por (periodo_num, municipio)."""
+    per = df['periodo_num'].to_numpy()
+    mun = df[municipality_col].astype(str).to_numpy()
+    if len(df) < 2:
+        return True
+    same = per[1:] == per[:-1]
+    return bool(np.all(per[1:] >= per[:-1]) and np.all(mun[1:][same] >= mun[:-1][same]))
+
+
+def _period_filter(periods):
+    """Expresión de pyarrow sobre las particiones año/trimestre para un rango 'YYYYQN'."""
+    import pyarrow.dataset as ds
+
+    start, end = periods
+    expr = None
+    if start is not None:
+        y, q = int(str(start)[:4]), int(str(start)[-1])
+        expr = (ds.field('año') > y) | ((ds.field('año') == y) & (ds.field('trimestre') >= q))
+    if end is not None:
+        y, q = int(str(end)[:4]), int(str(end)[-1])
+        cond = (ds.field('año') < y) | ((ds.field('año') == y) & (ds.field('trimestre') <= q))
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+@instrumented
+def write_dataset(df, dataset_dir, time_col='quarter', municipality_col='mun_code', periods=None):
+    """
+    Guarda el panel como dataset Parquet particionado por año / trimestre.
+
+    Cada partición queda ordenada por municipio, de modo que load_data puede
+    leerlas en orden sin volver a ordenar el panel completo.
+
+    Parámetros
+    ----------
+    df : pd.DataFrame
+    dataset_dir : str | Path
+        Carpeta destino (p. ej. data/processed/db/).
+    time_col, municipality_col : str
+    periods : iterable[str], optional
+        Solo reescribe estas particiones ('YYYYQN'); las demás no se tocan.
+        Por defecto reescribe todas las presentes en df.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out = _add_time_cols(df.copy(), time_col)
+    if periods is not None:
+        wanted = {int(str(p)[:4]) * 10 + int(str(p)[-1]) for p in periods}
+        out = out[out['periodo_num'].isin(wanted)]
+    out = out.sort_values(['periodo_num', municipality_col]).drop(columns='periodo_num')
+
+    pq.write_to_dataset(
+        pa.Table.from_pandas(out, preserve_index=False),
+        root_path=str(dataset_dir),
+        partition_cols=PARTITION_COLS,
+        existing_data_behavior='delete_matching',
+    )
+    print(f"✓ Dataset particionado: {out.groupby(PARTITION_COLS).ngroups} particiones en {dataset_dir}")
+
 
-def load_data(data_path, time_col='quarter', municipality_col='mun_code'):
+@instrumented
+@cached
+def load_data(data_path, time_col='quarter', municipality_col='mun_code',
+              columns=None, periods=None, compact=False):
     """
     Carga datos desde un parquet, extrae año/trimestre y ordena cronológicamente.
 
     Parámetros
     ----------
     data_path : str | Path
-        Ruta al archivo .parquet.
+        Ruta al archivo .parquet o a la carpeta del dataset particionado
+        (ver write_dataset).
     time_col : str
         Columna temporal en formato 'YYYYQN' (ej: '2006Q1').
     municipality_col : str
         Columna de identificador de municipio.
+    columns : list[str], optional
+        Columnas a leer (además de time_col y municipality_col). Default: todas.
+    periods : tuple(str | None, str | None), optional
+        Rango inclusivo ('YYYYQN', 'YYYYQN'). En un dataset particionado solo se
+        leen las particiones del rango.
+    compact : bool
+        Si True, aplica compact_panel: ids categóricos, periodos enteros pequeños
+        y features en float32 cuando la precisión lo permite.
 
     Retorna
     -------
@@ -23,15 +203,45 @@ def load_data(data_path, time_col='quarter', municipality_col='mun_code'):
         Dataset ordenado con columnas 'año', 'trimestre' y 'periodo_num' añadidas.
     """
     print(f"Cargando datos desde: {data_path}")
-    df = pd.read_parquet(data_path)
-    print(f"✓ Datos cargados: {df.shape[0]:,} filas × {df.shape[1]} columnas")
 
-    # Columnas temporales derivadas
-    df['año'] = df[time_col].astype(str).str[:4].astype(int)
-    df['trimestre'] = df[time_col].astype(str).str[-1].astype(int)
-    df['periodo_num'] = df['año'] * 10 + df['trimestre']
+    if columns is not None:
+        keys = [time_col, municipality_col]
+        columns = keys + [c for c in dict.fromkeys(columns) if c not in keys + PARTITION_COLS]
+
+    if Path(data_path).is_dir():
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(str(data_path), format='parquet', partitioning='hive')
+        cols = None if columns is None else columns + PARTITION_COLS
+        filt = _period_filter(periods) if periods is not None else None
+        df = dataset.to_table(columns=cols, filter=filt).to_pandas()
+    else:
+        if periods is not None:
+            df = _read_file_periods(data_path, time_col, columns, periods)
+        else:
+            df = pd.read_parquet(data_path, columns=columns)
+
+    n_cols = len([c for c in df.columns if c not in PARTITION_COLS])
+    print(f"✓ Datos cargados: {df.shape[0]:,} filas × {n_cols} columnas")
+
+    df = _add_time_cols(df, time_col, dtype=np.int16 if compact else np.int64)
+
+    if periods is not None:
+        start, end = periods
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= df['periodo_num'].to_numpy() >= int(str(start)[:4]) * 10 + int(str(start)[-1])
+        if end is not None:
+            mask &= df['periodo_num'].to_numpy() <= int(str(end)[:4]) * 10 + int(str(end)[-1])
+        if not mask.all():
+            df = df[mask]
+
+    if not _is_sorted(df, municipality_col):
+        df = df.sort_values(['periodo_num', municipality_col])
+    df = df.reset_index(drop=True)
 
-    df = df.sort_values(['periodo_num', municipality_col]).reset_index(drop=True)
+    if compact:
+        df = compact_panel(df, time_col, municipality_col)
 
     print(f"Rango temporal : {df[time_col].min()} → {df[time_col].max()}")
     print(f"Periodos únicos: {df[time_col].nunique()} | Municipios: {df[municipality_col].nunique()}")
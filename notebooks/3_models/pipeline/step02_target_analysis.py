@@ -4,7 +4,10 @@ PASO 2 — Análisis de la variable objetivo
 import numpy as np
 import matplotlib.pyplot as plt
 
+from .instrumentation import instrumented
 
+
+@instrumented
 def analyze_target(df, target_col, time_group_col='año', plot=True):
     """
     Analiza la distribución de la variable dependiente binaria.
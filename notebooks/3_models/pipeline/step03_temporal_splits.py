@@ -1,8 +1,16 @@
 """
 PASO 3 — Splits temporales sin overlap ni leakage
 """
+import numpy as np
+import pandas as pd
 
+from .panel import period_codes
+from .caching import cached
+from .instrumentation import instrumented
 
+
+@instrumented
+@cached
 def create_temporal_splits(
     df,
     time_col,
@@ -28,30 +36,33 @@ def create_temporal_splits(
     splits : dict
         Llaves: train_mask, val_mask, test_mask, train_periods, val_periods, test_periods.
     """
-    periodos = sorted(df[time_col].unique())
-    n = len(periodos)
+    # Comparaciones sobre códigos enteros de trimestre, no sobre strings
+    codes = period_codes(df[time_col])
+    uniq, first = np.unique(codes, return_index=True)
+    periodos = df[time_col].to_numpy()[first]
+    n = len(uniq)
 
     if use_year_splits:
         tc = f"{train_end_year}Q{train_end_quarter}"
         vc = f"{val_end_year}Q{val_end_quarter}"
-        train_periods = [p for p in periodos if p <= tc]
-        val_periods   = [p for p in periodos if tc < p <= vc]
-        test_periods  = [p for p in periodos if p > vc]
-        train_mask = df[time_col] <= tc
-        val_mask   = (df[time_col] > tc) & (df[time_col] <= vc)
-        test_mask  = df[time_col] > vc
+        ti = int(np.searchsorted(uniq, train_end_year * 4 + train_end_quarter - 1, side='right'))
+        vi = int(np.searchsorted(uniq, val_end_year * 4 + val_end_quarter - 1, side='right'))
         print(f"✓ Splits por años: Train ≤ {tc} | Val ≤ {vc} | Test > {vc}")
     else:
         ti = int(n * train_prop)
         vi = int(n * (train_prop + val_prop))
-        train_periods = periodos[:ti]
-        val_periods   = periodos[ti:vi]
-        test_periods  = periodos[vi:]
-        train_mask = df[time_col].isin(train_periods)
-        val_mask   = df[time_col].isin(val_periods)
-        test_mask  = df[time_col].isin(test_periods)
         print(f"✓ Splits por proporciones ({train_prop:.0%}/{val_prop:.0%}/{test_prop:.0%}):")
 
+    train_periods = list(periodos[:ti])
+    val_periods   = list(periodos[ti:vi])
+    test_periods  = list(periodos[vi:])
+
+    # uniq está ordenado: cada split es un rango contiguo de códigos
+    bounds = np.append(uniq, uniq[-1] + 1)
+    train_mask = pd.Series(codes < bounds[ti], index=df.index)
+    test_mask  = pd.Series(codes >= bounds[vi], index=df.index)
+    val_mask   = ~train_mask & ~test_mask
+
     for name, mask, periods in [
         ('Train', train_mask, train_periods),
         ('Val  ', val_mask,   val_periods),
@@ -5,8 +5,12 @@ Dos modos de selección de variables:
   - Por exclusión  : pasar cols_to_exclude  (se excluyen esas + las obligatorias).
   - Por selección  : pasar feature_cols     (lista explícita de X a usar).
 """
+from .caching import cached
+from .instrumentation import instrumented, record_stats
 
 
+@instrumented
+@cached
 def prepare_features(
     df,
     target_col,
@@ -55,6 +59,7 @@ def prepare_features(
 
     X = df[feature_cols].copy()
     y = df[target_col].copy()
+    record_stats(n_features=len(feature_cols), prevalence=float(y.mean()))
 
     print(f"{'='*60}")
     print(f"FEATURES DEL MODELO")
@@ -1,14 +1,28 @@
 """
 PASO 5 — Imputación de valores faltantes (sin leakage)
+
+numeric_strategy='panel' imputa con la historia de cada municipio (interpolación
+limitada, LOCF, mediana municipal) en lugar de una mediana global: ver
+panel_imputation.
 """
 import numpy as np
+import pandas as pd
 from sklearn.impute import SimpleImputer
 
+from .caching import cached
+from .instrumentation import instrumented, record_stats
+from .panel_imputation import fit_panel_imputer
+
 
+@instrumented
+@cached
 def impute_missing(
     X_train, X_val, X_test,
     numeric_strategy='median',
     categorical_strategy='most_frequent',
+    panel_ids=None,
+    panel_limit=4,
+    panel_interpolate=True,
 ):
     """
     Imputa NaN usando estadísticas aprendidas SOLO en train.
@@ -17,14 +31,23 @@ def impute_missing(
     ----------
     X_train, X_val, X_test : pd.DataFrame
     numeric_strategy : str
-        Estrategia para columnas numéricas: 'mean', 'median', 'most_frequent'.
+        Estrategia para columnas numéricas: 'mean', 'median', 'most_frequent'
+        o 'panel' (historia de cada municipio; requiere panel_ids).
     categorical_strategy : str
         Estrategia para columnas categóricas: 'most_frequent', 'constant'.
+    panel_ids : pd.DataFrame, optional
+        Municipio y trimestre de cada fila, con el mismo índice que X
+        (p. ej. df[[MUNICIPALITY_COL, TIME_COL]]). Solo para 'panel'.
+    panel_limit : int
+        'panel': máximo de trimestres interpolados o arrastrados (LOCF).
+    panel_interpolate : bool
+        'panel': interpola huecos internos de train.
 
     Retorna
     -------
     X_train, X_val, X_test : pd.DataFrame (imputados)
-    imputers : dict  {'numeric': ..., 'categorical': ...}
+    imputers : dict  {'numeric': ..., 'categorical': ...} ('panel' en lugar de
+        'numeric' con numeric_strategy='panel')
     """
     num_cols = X_train.select_dtypes(include=[np.number]).columns.tolist()
     cat_cols = X_train.select_dtypes(exclude=[np.number]).columns.tolist()
@@ -36,7 +59,26 @@ def impute_missing(
     X_train, X_val, X_test = X_train.copy(), X_val.copy(), X_test.copy()
     imputers = {}
 
-    if num_cols and X_train[num_cols].isnull().sum().sum() > 0:
+    if numeric_strategy == 'panel':
+        if panel_ids is None:
+            raise ValueError("numeric_strategy='panel' requiere panel_ids (municipio y trimestre)")
+        parts = [X_train[num_cols], X_val[num_cols], X_test[num_cols]]
+        X_all = pd.concat(parts)
+        ids = panel_ids.loc[X_all.index]
+        train_mask = np.arange(len(X_all)) < len(X_train)
+        X_all, state = fit_panel_imputer(X_all, ids, train_mask, limit=panel_limit,
+                                         interpolate=panel_interpolate)
+        bounds = np.cumsum([0] + [len(p) for p in parts])
+        for X_part, lo, hi in zip((X_train, X_val, X_test), bounds[:-1], bounds[1:]):
+            X_part[num_cols] = X_all.iloc[lo:hi].to_numpy()
+        imputers['panel'] = state
+        counts = state['counts']
+        record_stats(**{k: v for k, v in counts.items() if k != 'observado'})
+        print(f"✓ Imputación numérica por municipio (límite {panel_limit} trimestres): "
+              f"interpolados {counts['interpolado']:,} | LOCF {counts['locf']:,} | "
+              f"mediana municipal {counts['mediana_municipio']:,} | global {counts['global']:,}")
+
+    elif num_cols and X_train[num_cols].isnull().sum().sum() > 0:
         imp = SimpleImputer(strategy=numeric_strategy)
         X_train[num_cols] = imp.fit_transform(X_train[num_cols])
         X_val[num_cols]   = imp.transform(X_val[num_cols])
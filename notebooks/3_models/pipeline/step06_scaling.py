@@ -4,7 +4,12 @@ PASO 6 — Estandarización sin leakage temporal
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
+from .caching import cached
+from .instrumentation import instrumented
 
+
+@instrumented
+@cached
 def scale_features(X_train, X_val, X_test, feature_cols):
     """
     Estandariza con media y desviación aprendidas SOLO en train.
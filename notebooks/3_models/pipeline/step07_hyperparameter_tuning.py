@@ -1,10 +1,23 @@
 """
-PASO 7 — Búsqueda de hiperparámetros con GridSearchCV + TimeSeriesSplit
+PASO 7 — Búsqueda de hiperparámetros con camino de regularización + TimeSeriesSplit
 """
+import time
+
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from joblib import Parallel, delayed
 from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import get_scorer
 from sklearn.model_selection import GridSearchCV, TimeSeriesSplit
 
+from .fold_preprocessing import preprocess_folds
+from .gradient_boosting import tune_gradient_boosting
+from .caching import cached
+from .instrumentation import instrumented, is_quiet, record_stats
+
+
+BACKENDS = ('elasticnet', 'hist_gb')
 
 DEFAULT_PARAM_GRID = {
     'C':        [0.001, 0.01, 0.1, 1, 10, 100],
@@ -12,71 +25,240 @@ DEFAULT_PARAM_GRID = {
 }
 
 
+def _base_model(random_state, warm_start=False):
+    return LogisticRegression(
+        penalty='elasticnet',
+        solver='saga',
+        max_iter=10000,
+        class_weight='balanced',
+        random_state=random_state,
+        tol=1e-4,
+        warm_start=warm_start,
+    )
+
+
+def _run_path(fold_data, l1_ratio, Cs, scorer, random_state, patience, tol):
+    """
+    Recorre C de menor a mayor (más → menos regularización) para un l1_ratio.
+
+    Cada fold mantiene su propio modelo con warm_start: el ajuste para un C parte
+    de los coeficientes del C anterior. Un paso cuenta como mejora solo si el
+    score medio supera al mejor del camino en más de `tol`; cualquier otro
+    (meseta dentro de ±tol o caída) suma al contador, que se reinicia con cada
+    mejora. El camino se corta tras `patience` pasos seguidos sin mejora.
+    """
+    models = [_base_model(random_state, warm_start=True).set_params(l1_ratio=l1_ratio)
+              for _ in fold_data]
+    rows, last_fold_coefs = [], {}
+    best, worse = -np.inf, 0
+
+    for C in Cs:
+        t0 = time.perf_counter()
+        test_scores, train_scores = [], []
+        for model, (X_tr, y_tr, X_va, y_va) in zip(models, fold_data):
+            model.set_params(C=C)
+            model.fit(X_tr, y_tr)
+            test_scores.append(scorer(model, X_va, y_va))
+            train_scores.append(scorer(model, X_tr, y_tr))
+        last = models[-1]
+        last_fold_coefs[C] = (last.coef_.copy(), last.intercept_.copy())
+        rows.append(dict(C=C, l1_ratio=l1_ratio, test=test_scores, train=train_scores,
+                         fit_time=(time.perf_counter() - t0) / len(fold_data)))
+
+        mean = np.mean(test_scores)
+        if mean > best + tol:
+            best, worse = mean, 0
+        else:
+            worse += 1
+            if patience is not None and worse >= patience:
+                break
+
+    pruned = [C for C in Cs if C not in last_fold_coefs]
+    return rows, pruned, last_fold_coefs
+
+
+def _cv_results(rows, pruned, n_splits):
+    """Tabla con la misma estructura que GridSearchCV.cv_results_."""
+    records = []
+    for r in rows:
+        rec = {'param_C': r['C'], 'param_l1_ratio': r['l1_ratio'],
+               'params': {'C': r['C'], 'l1_ratio': r['l1_ratio']},
+               'mean_fit_time': r['fit_time']}
+        for i in range(n_splits):
+            rec[f'split{i}_test_score'] = r['test'][i]
+            rec[f'split{i}_train_score'] = r['train'][i]
+        rec['mean_test_score'] = np.mean(r['test'])
+        rec['std_test_score'] = np.std(r['test'])
+        rec['mean_train_score'] = np.mean(r['train'])
+        rec['std_train_score'] = np.std(r['train'])
+        records.append(rec)
+    for C, l1 in pruned:
+        records.append({'param_C': C, 'param_l1_ratio': l1,
+                        'params': {'C': C, 'l1_ratio': l1},
+                        'mean_test_score': np.nan, 'std_test_score': np.nan})
+
+    cv = pd.DataFrame(records)
+    cv['rank_test_score'] = (cv['mean_test_score']
+                             .rank(ascending=False, method='min', na_option='bottom')
+                             .astype(int))
+    return cv.sort_values('rank_test_score').reset_index(drop=True)
+
+
+@instrumented
+@cached
 def tune_hyperparameters(
     X_train_val,
     y_train_val,
     param_grid=None,
     n_cv_splits=5,
-    scoring='f1',
+    scoring=None,
     random_state=42,
+    method=None,
+    patience=2,
+    n_jobs=-1,
+    X_raw=None,
+    impute_strategy='median',
+    backend='elasticnet',
 ):
     """
-    Ajusta un Elastic Net con búsqueda de grilla y validación cruzada temporal.
+    Ajusta un Elastic Net buscando C y l1_ratio con validación cruzada temporal.
 
     Parámetros
     ----------
-    X_train_val : pd.DataFrame
-        Train + validación concatenados (ya estandarizados).
+    X_train_val : pd.DataFrame | scipy.sparse.csr_matrix
+        Train + validación concatenados (ya estandarizados, o la CSR de
+        build_sparse_design apilada con sp.vstack).
     y_train_val : pd.Series
     param_grid : dict, optional
         Grid de C y l1_ratio. Usa DEFAULT_PARAM_GRID si no se especifica.
+        Con method='path' una grilla de C mucho más fina cuesta poco más.
     n_cv_splits : int
         Folds de TimeSeriesSplit.
-    scoring : str
+    scoring : str, optional
         Métrica de optimización: 'f1', 'average_precision', 'roc_auc', etc.
+        Default: 'f1' con 'elasticnet' y 'average_precision' con 'hist_gb' (el
+        early stopping de cada fold no depende de un threshold).
     random_state : int
+    method : str, optional
+        'grid' — GridSearchCV clásico (ajustes independientes en frío).
+        'path' — por cada l1_ratio recorre C de mayor a menor regularización
+                 con warm start en cada fold, y corta el camino cuando el score
+                 deja de mejorar (los C descartados no se evalúan, así que el
+                 resultado puede diferir del de 'grid').
+        Default: 'path' si se indica X_raw, 'grid' en otro caso (mismos
+        resultados que antes en los notebooks existentes).
+    patience : int | None
+        Con method='path': pasos consecutivos sin mejorar el mejor score del
+        camino en más de 1e-3 (mesetas incluidas) antes de descartar los C
+        restantes (None = recorrer todo el camino).
+    n_jobs : int
+        Caminos (l1_ratio) en paralelo; con 'hist_gb', hilos OpenMP de cada ajuste.
+    X_raw : pd.DataFrame, optional
+        Las mismas filas de X_train_val pero SIN imputar ni estandarizar. Si se
+        indica (implica method='path'), cada fold se imputa y estandariza con
+        estadísticas de su propio entrenamiento (ver preprocess_folds), en vez
+        de usar datos escalados con información de folds posteriores. El modelo
+        final se reajusta sobre X_train_val tal como viene.
+    impute_strategy : str
+        'median' o 'mean' para la imputación por fold con X_raw.
+    backend : str
+        'elasticnet' (default) o 'hist_gb' — HistGradientBoosting con bins
+        compartidos y early stopping por fold (ver gradient_boosting; param_grid
+        es entonces un grid de sus parámetros, y method / X_raw no aplican).
 
     Retorna
     -------
-    best_model : LogisticRegression
-    cv_results : pd.DataFrame  (todos los resultados del grid)
+    best_model : LogisticRegression | HistGradientBoostingClassifier
+    cv_results : pd.DataFrame  (todos los resultados del grid; los C descartados
+                 por el corte temprano quedan con score NaN y rank al final)
     """
+    if backend == 'hist_gb':
+        return tune_gradient_boosting(X_train_val, y_train_val, param_grid=param_grid,
+                                      n_cv_splits=n_cv_splits,
+                                      scoring=scoring or 'average_precision',
+                                      random_state=random_state, n_jobs=n_jobs)
+    if backend != 'elasticnet':
+        raise ValueError(f"backend debe ser uno de {BACKENDS}, no {backend!r}")
+    scoring = scoring or 'f1'
+
     if param_grid is None:
         param_grid = DEFAULT_PARAM_GRID
 
-    n_combos = len(param_grid['C']) * len(param_grid['l1_ratio'])
-    print(f"GridSearchCV: {n_combos} combinaciones × {n_cv_splits} folds | métrica: {scoring}")
+    Cs = sorted(param_grid['C'])
+    l1_ratios = list(param_grid['l1_ratio'])
+    cv = TimeSeriesSplit(n_splits=n_cv_splits)
 
-    model = LogisticRegression(
-        penalty='elasticnet',
-        solver='saga',
-        max_iter=10000,
-        class_weight='balanced',
-        random_state=random_state,
-        n_jobs=-1,
-        tol=1e-4, 
-    )
+    if method is None:
+        method = 'path' if X_raw is not None else 'grid'
+    if X_raw is not None and method != 'path':
+        raise ValueError("X_raw (preprocesamiento por fold) solo está disponible con method='path'")
 
-    gs = GridSearchCV(
-        estimator=model,
-        param_grid=param_grid,
-        cv=TimeSeriesSplit(n_splits=n_cv_splits),
-        scoring=scoring,
-        n_jobs=-1,
-        verbose=1,
-        return_train_score=True,
-    )
+    if method == 'grid':
+        n_combos = len(Cs) * len(l1_ratios)
+        print(f"GridSearchCV: {n_combos} combinaciones × {n_cv_splits} folds | métrica: {scoring}")
+        gs = GridSearchCV(
+            estimator=_base_model(random_state),
+            param_grid=param_grid,
+            cv=cv,
+            scoring=scoring,
+            n_jobs=n_jobs,
+            verbose=0 if is_quiet() else 1,
+            return_train_score=True,
+        )
+        gs.fit(X_train_val, y_train_val)
+        best_model = gs.best_estimator_
+        cv_results = pd.DataFrame(gs.cv_results_).sort_values('rank_test_score')
+    elif method == 'path':
+        print(f"Camino de regularización: {len(l1_ratios)} l1_ratio × {len(Cs)} C × "
+              f"{n_cv_splits} folds (warm start) | métrica: {scoring}")
+        X = X_train_val.tocsr() if sp.issparse(X_train_val) else np.asarray(X_train_val)
+        y = np.asarray(y_train_val)
+        folds = list(cv.split(X))
+        scorer = get_scorer(scoring)
+
+        if X_raw is not None:
+            if len(X_raw) != X.shape[0]:
+                raise ValueError("X_raw debe tener las mismas filas que X_train_val")
+            fold_data = preprocess_folds(X_raw, y, folds, strategy=impute_strategy)
+            print(f"  Imputación ({impute_strategy}) + estandarización recalculadas por fold")
+        else:
+            fold_data = [(X[tr], y[tr], X[va], y[va]) for tr, va in folds]
+
+        paths = Parallel(n_jobs=n_jobs)(
+            delayed(_run_path)(fold_data, l1, Cs, scorer, random_state, patience, 1e-3)
+            for l1 in l1_ratios
+        )
+        rows = [r for path_rows, _, _ in paths for r in path_rows]
+        pruned = [(C, l1) for l1, (_, path_pruned, _) in zip(l1_ratios, paths) for C in path_pruned]
+        cv_results = _cv_results(rows, pruned, n_cv_splits)
+        n_fits = len(rows) * n_cv_splits
+        print(f"  Ajustes realizados: {n_fits} de {len(Cs) * len(l1_ratios) * n_cv_splits} "
+              f"({len(pruned)} combinaciones descartadas por corte temprano)")
+
+        best = cv_results.iloc[0]
+        best_C, best_l1 = best['param_C'], best['param_l1_ratio']
 
-    gs.fit(X_train_val, y_train_val)
+        # Reajuste en todo train+val, partiendo de la solución del último fold (el más grande)
+        coef, intercept = paths[l1_ratios.index(best_l1)][2][best_C]
+        best_model = _base_model(random_state, warm_start=True).set_params(C=best_C, l1_ratio=best_l1)
+        best_model.coef_, best_model.intercept_ = coef.copy(), intercept.copy()
+        best_model.fit(X_train_val, y_train_val)
+        best_model.set_params(warm_start=False)
+    else:
+        raise ValueError(f"method debe ser 'path' o 'grid', no {method!r}")
 
+    best_params = cv_results.iloc[0]
+    record_stats(best_C=float(best_params['param_C']),
+                 best_l1_ratio=float(best_params['param_l1_ratio']),
+                 best_cv_score=float(best_params['mean_test_score']),
+                 n_configs_scored=int(cv_results['mean_test_score'].notna().sum()))
     print(f"\n✓ Mejores hiperparámetros:")
-    for k, v in gs.best_params_.items():
-        print(f"  {k}: {v}")
-    print(f"  Mejor {scoring} (CV): {gs.best_score_:.4f}")
+    print(f"  C: {best_params['param_C']}")
+    print(f"  l1_ratio: {best_params['param_l1_ratio']}")
+    print(f"  Mejor {scoring} (CV): {best_params['mean_test_score']:.4f}")
 
-    cv_results = pd.DataFrame(gs.cv_results_).sort_values('rank_test_score')
     print(f"\nTop 5 configuraciones:")
     print(cv_results[['param_C', 'param_l1_ratio',
-                       'mean_test_score', 'std_test_score']].head(5).to_string(index=False))
+                      'mean_test_score', 'std_test_score']].head(5).to_string(index=False))
 
-    return gs.best_estimator_, cv_results
+    return best_model, cv_results
@@ -4,17 +4,116 @@ PASO 8 — Optimización de threshold en validación
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.metrics import f1_score, precision_score, recall_score
 
+from .instrumentation import instrumented, record_stats
 
+
+OBJECTIVES = ('f1', 'precision', 'recall', 'fbeta', 'precision_at_recall', 'top_k')
+
+
+def _threshold_curve(y_true, y_proba, thresholds=None, beta=1.0, groups=None):
+    """
+    TP / FP / FN y métricas para cada threshold a partir de conteos acumulados.
+
+    Ordena las probabilidades una sola vez: para un threshold t, las alertas son
+    el prefijo de las probabilidades ordenadas de mayor a menor con p >= t, y
+    sus TP son la suma acumulada de positivos en ese prefijo.
+
+    thresholds=None usa cada probabilidad distinta (barrido exacto).
+    groups (p. ej. trimestre de cada fila) agrega el máximo de alertas por grupo.
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    y_proba = np.asarray(y_proba, dtype=np.float64)
+
+    order = np.argsort(-y_proba, kind='stable')
+    p_desc = y_proba[order]
+    tp_cum = np.concatenate([[0], np.cumsum(y_true[order])])
+    n_pos = int(tp_cum[-1])
+
+    if thresholds is None:
+        last_of_run = np.r_[p_desc[1:] != p_desc[:-1], True]
+        thresholds = p_desc[last_of_run]
+        n_alerts = np.flatnonzero(last_of_run) + 1
+    else:
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        # Número de probabilidades >= t (p_desc es decreciente → buscar en -p_desc)
+        n_alerts = np.searchsorted(-p_desc, -thresholds, side='right')
+
+    tp = tp_cum[n_alerts]
+    fp = n_alerts - tp
+    fn = n_pos - tp
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        precision = np.where(n_alerts > 0, tp / n_alerts, 0.0)
+        recall = tp / n_pos if n_pos else np.zeros(len(tp))
+        f1 = np.where(tp > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+        b2 = beta ** 2
+        fbeta = np.where(tp > 0, (1 + b2) * tp / ((1 + b2) * tp + b2 * fn + fp), 0.0)
+
+    curve = pd.DataFrame({
+        'threshold': thresholds,
+        'f1':        f1,
+        'precision': precision,
+        'recall':    recall,
+        'fbeta':     fbeta,
+        'tp':        tp,
+        'fp':        fp,
+        'fn':        fn,
+        'n_alerts':  n_alerts,
+    })
+
+    if groups is not None:
+        codes, uniques = pd.factorize(np.asarray(groups))
+        max_alerts = np.zeros(len(thresholds), dtype=np.int64)
+        for g in range(len(uniques)):
+            p_g = -np.sort(-y_proba[codes == g])
+            max_alerts = np.maximum(max_alerts, np.searchsorted(-p_g, -thresholds, side='right'))
+        curve['max_alerts_group'] = max_alerts
+        curve['alerts_per_group'] = n_alerts / len(uniques)
+
+    return curve
+
+
+def _select(curve, optimize_metric, min_recall, top_k):
+    """Índice de la fila óptima de la curva según el objetivo."""
+    if optimize_metric in ('f1', 'precision', 'recall', 'fbeta'):
+        return curve[optimize_metric].idxmax()
+
+    if optimize_metric == 'precision_at_recall':
+        if min_recall is None:
+            raise ValueError("optimize_metric='precision_at_recall' requiere min_recall")
+        feasible = curve[curve['recall'] >= min_recall]
+        if feasible.empty:
+            raise ValueError(f"Ningún threshold alcanza recall >= {min_recall}")
+        # Máxima precisión; a igual precisión, mayor recall
+        return feasible.sort_values(['precision', 'recall'], ascending=False).index[0]
+
+    if optimize_metric == 'top_k':
+        if top_k is None or 'max_alerts_group' not in curve:
+            raise ValueError("optimize_metric='top_k' requiere top_k y groups")
+        feasible = curve[curve['max_alerts_group'] <= top_k]
+        if feasible.empty:
+            raise ValueError(f"Ningún threshold respeta {top_k} alertas por grupo")
+        # El threshold más bajo dentro del presupuesto: máximo recall posible
+        return feasible['threshold'].idxmin()
+
+    raise ValueError(f"optimize_metric debe ser uno de {OBJECTIVES}, no {optimize_metric!r}")
+
+
+@instrumented
 def optimize_threshold(
     model,
     X_val_scaled,
     y_val,
     threshold_range=(0.1, 0.9),
-    threshold_step=0.05,
+    threshold_step=None,
     optimize_metric='f1',
     plot=True,
+    method='grid',
+    beta=1.0,
+    min_recall=None,
+    top_k=None,
+    groups=None,
 ):
     """
     Encuentra el threshold que maximiza una métrica sobre el conjunto de validación.
@@ -25,46 +124,83 @@ def optimize_threshold(
     X_val_scaled : pd.DataFrame  (ya estandarizado).
     y_val : pd.Series
     threshold_range : tuple  (min, max)
-    threshold_step : float
-    optimize_metric : str  'f1' | 'precision' | 'recall'
+        Rango de thresholds considerados (None = sin límites en method='exact').
+        En method='exact', si ninguna probabilidad cae en el rango se evalúan
+        solo sus extremos (todo threshold del rango da las mismas alertas).
+    threshold_step : float, optional
+        Paso de la grilla (default 0.05); solo con method='grid'.
+    optimize_metric : str
+        'f1' | 'precision' | 'recall'
+        'fbeta'               — F-beta con el `beta` indicado.
+        'precision_at_recall' — máxima precisión con recall >= min_recall.
+        'top_k'               — threshold más bajo con a lo sumo top_k alertas
+                                en cada grupo de `groups` (p. ej. por trimestre).
     plot : bool
+    method : str
+        'grid' (default) — grilla np.arange(min, max, step).
+        'exact'          — evalúa cada probabilidad distinta como threshold.
+    beta : float
+    min_recall : float, optional
+    top_k : int, optional
+    groups : array-like, optional
+        Grupo de cada fila de validación (p. ej. la columna de trimestre).
 
     Retorna
     -------
     best_threshold : float
-    threshold_df : pd.DataFrame  con columnas threshold, f1, precision, recall.
+    threshold_df : pd.DataFrame  con columnas threshold, f1, precision, recall,
+                   fbeta, tp, fp, fn, n_alerts (y max_alerts_group /
+                   alerts_per_group si se indica groups) — la curva completa.
     """
     y_proba = model.predict_proba(X_val_scaled)[:, 1]
-    thresholds = np.arange(threshold_range[0], threshold_range[1], threshold_step)
-
-    rows = []
-    for t in thresholds:
-        y_pred = (y_proba >= t).astype(int)
-        rows.append({
-            'threshold': t,
-            'f1':        f1_score(y_val, y_pred, zero_division=0),
-            'precision': precision_score(y_val, y_pred, zero_division=0),
-            'recall':    recall_score(y_val, y_pred, zero_division=0),
-        })
-
-    threshold_df = pd.DataFrame(rows)
-    best_idx = threshold_df[optimize_metric].idxmax()
+
+    if method == 'grid':
+        step = 0.05 if threshold_step is None else threshold_step
+        thresholds = np.arange(threshold_range[0], threshold_range[1], step)
+        threshold_df = _threshold_curve(y_val, y_proba, thresholds, beta=beta, groups=groups)
+    elif method == 'exact':
+        if threshold_step is not None:
+            print(f"⚠️  threshold_step={threshold_step} se ignora con method='exact' "
+                  f"(se evalúa cada probabilidad distinta)")
+        threshold_df = _threshold_curve(y_val, y_proba, beta=beta, groups=groups)
+        if threshold_range is not None:
+            lo, hi = threshold_range
+            threshold_df = threshold_df[threshold_df['threshold'].between(lo, hi)]
+            if threshold_df.empty:
+                # Ninguna probabilidad en el rango: todos los thresholds del rango dan
+                # las mismas alertas que su extremo más cercano
+                print(f"⚠️  Ninguna probabilidad de validación cae en [{lo}, {hi}]: "
+                      f"se evalúan solo los extremos del rango")
+                threshold_df = _threshold_curve(y_val, y_proba, [lo, hi], beta=beta, groups=groups)
+        threshold_df = threshold_df.sort_values('threshold').reset_index(drop=True)
+    else:
+        raise ValueError(f"method debe ser 'exact' o 'grid', no {method!r}")
+
+    best_idx = _select(threshold_df, optimize_metric, min_recall, top_k)
     best_threshold = threshold_df.loc[best_idx, 'threshold']
     best_row = threshold_df.loc[best_idx]
+    record_stats(threshold=float(best_threshold), n_thresholds=len(threshold_df),
+                 f1=float(best_row['f1']), precision=float(best_row['precision']),
+                 recall=float(best_row['recall']))
 
-    print(f"Threshold óptimo ({optimize_metric}): {best_threshold:.2f}")
+    print(f"Threshold óptimo ({optimize_metric}): {best_threshold:.4f} "
+          f"| {len(threshold_df):,} thresholds evaluados")
     print(f"  F1: {best_row['f1']:.4f} | "
           f"Precision: {best_row['precision']:.4f} | "
           f"Recall: {best_row['recall']:.4f}")
 
     if plot:
+        markers = method == 'grid'
         fig, ax = plt.subplots(figsize=(12, 5))
         ax.plot(threshold_df['threshold'], threshold_df['f1'],
-                'o-', label='F1', linewidth=2)
+                'o-' if markers else '-', label='F1', linewidth=2)
         ax.plot(threshold_df['threshold'], threshold_df['precision'],
-                's--', label='Precision', alpha=0.7)
+                's--' if markers else '--', label='Precision', alpha=0.7)
         ax.plot(threshold_df['threshold'], threshold_df['recall'],
-                '^--', label='Recall', alpha=0.7)
+                '^--' if markers else '--', label='Recall', alpha=0.7)
+        if optimize_metric == 'fbeta':
+            ax.plot(threshold_df['threshold'], threshold_df['fbeta'],
+                    '-', label=f'F{beta:g}', alpha=0.7)
         ax.axvline(best_threshold, color='red', linestyle=':',
                    linewidth=2, label=f'Óptimo: {best_threshold:.2f}')
         ax.axvline(0.5, color='gray', linestyle='--', alpha=0.5, label='Default: 0.50')
@@ -2,7 +2,10 @@
 PASO 9 — Evaluación final en test set
 """
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
+from joblib import Parallel, delayed
 from sklearn.metrics import (
     average_precision_score, roc_auc_score, balanced_accuracy_score,
     f1_score, precision_score, recall_score, cohen_kappa_score,
@@ -10,8 +13,166 @@ from sklearn.metrics import (
     precision_recall_curve, roc_curve,
 )
 
+from .instrumentation import instrumented
 
-def evaluate_model(model, X_test_scaled, y_test, threshold, plot=True):
+
+BOOTSTRAP_METRICS = ['AUPRC', 'AUROC', 'Balanced_Accuracy', 'F1_Score',
+                     'Precision', 'Recall', 'Cohen_Kappa']
+
+
+def _bootstrap_weights(rng, n_rep, block_codes, n_rows):
+    """
+    Pesos enteros (réplicas × filas): cuántas veces entra cada fila en cada réplica.
+
+    Con varios bloques (municipio y trimestre) se remuestrean de forma independiente
+    y el peso de una fila es el producto de las veces que salió cada uno de sus bloques.
+    """
+    if not block_codes:
+        return rng.multinomial(n_rows, np.full(n_rows, 1 / n_rows), size=n_rep).astype(np.float64)
+    w = np.ones((n_rep, n_rows))
+    for codes in block_codes:
+        n_blocks = codes.max() + 1
+        counts = rng.multinomial(n_blocks, np.full(n_blocks, 1 / n_blocks), size=n_rep)
+        w *= counts[:, codes]
+    return w
+
+
+def _weighted_metrics(w, y_sorted, pred_sorted, run_ends):
+    """
+    Todas las métricas para un lote de réplicas a la vez.
+
+    w : (réplicas × filas) pesos, con las filas ordenadas por score descendente.
+    Las curvas PR y ROC salen de sumas acumuladas ponderadas en los finales de cada
+    grupo de scores empatados (mismo criterio que sklearn).
+    """
+    pos = w * y_sorted
+    neg = w - pos
+    tp_cum = np.cumsum(pos, axis=1)[:, run_ends]
+    fp_cum = np.cumsum(neg, axis=1)[:, run_ends]
+    P, N = tp_cum[:, -1:], fp_cum[:, -1:]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tpr = tp_cum / P
+        fpr = fp_cum / N
+        prec = tp_cum / (tp_cum + fp_cum)
+
+        # AUROC: trapecios sobre (fpr, tpr) empezando en (0, 0)
+        tpr0 = np.concatenate([np.zeros_like(P), tpr], axis=1)
+        fpr0 = np.concatenate([np.zeros_like(N), fpr], axis=1)
+        auroc = (np.diff(fpr0, axis=1) * (tpr0[:, 1:] + tpr0[:, :-1]) / 2).sum(axis=1)
+
+        # AUPRC (average precision): Σ (R_k − R_{k−1}) · P_k
+        d_rec = np.diff(tpr0, axis=1)
+        auprc = np.nansum(d_rec * prec, axis=1)
+
+        tp = pos @ pred_sorted
+        fp = neg @ pred_sorted
+        P, N = P[:, 0], N[:, 0]
+        fn, tn = P - tp, N - fp
+        total = P + N
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(P > 0, tp / P, 0.0)
+        f1 = np.where(tp > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+        bal_acc = (tp / P + tn / N) / 2
+        p_o = (tp + tn) / total
+        p_e = ((tp + fp) * P + (fn + tn) * N) / total ** 2
+        kappa = (p_o - p_e) / (1 - p_e)
+
+    # Réplicas sin positivos o sin negativos no definen las métricas de ranking
+    degenerate = (P == 0) | (N == 0)
+    auroc[degenerate] = np.nan
+    auprc[degenerate] = np.nan
+    bal_acc[degenerate] = np.nan
+    return np.column_stack([auprc, auroc, bal_acc, f1, precision, recall, kappa])
+
+
+def _bootstrap_chunk(seed, n_rep, block_codes, y_sorted, pred_sorted, run_ends, order):
+    rng = np.random.default_rng(seed)
+    w = _bootstrap_weights(rng, n_rep, [c[order] for c in block_codes], len(order))
+    return _weighted_metrics(w, y_sorted, pred_sorted, run_ends)
+
+
+@instrumented
+def bootstrap_metrics(
+    y_true,
+    y_proba,
+    threshold,
+    groups=None,
+    n_bootstrap=2000,
+    ci=0.95,
+    random_state=42,
+    n_jobs=-1,
+    chunk_size=250,
+):
+    """
+    Intervalos de confianza por bootstrap de bloques para las métricas de test.
+
+    Parámetros
+    ----------
+    y_true, y_proba : array-like
+    threshold : float
+    groups : pd.DataFrame | None
+        Una columna por tipo de bloque, alineada con y_true, p. ej.
+        df.loc[test_mask, ['mun_code', 'quarter']]. Cada columna se remuestrea
+        por separado (municipios y trimestres completos). None = filas i.i.d.
+    n_bootstrap : int
+    ci : float
+        Nivel del intervalo (percentiles).
+    random_state : int
+    n_jobs : int
+        Lotes de réplicas en paralelo.
+    chunk_size : int
+        Réplicas por lote (memoria ≈ chunk_size × filas × 8 bytes × 3).
+
+    Retorna
+    -------
+    intervals : dict  {'<métrica>_ci_low': ..., '<métrica>_ci_high': ...}
+    replicates : pd.DataFrame  (n_bootstrap × métricas)
+    """
+    y_true = np.asarray(y_true).astype(np.float64)
+    y_proba = np.asarray(y_proba, dtype=np.float64)
+    pred = (y_proba >= threshold).astype(np.float64)
+
+    block_codes = []
+    if groups is not None:
+        groups = pd.DataFrame(groups)
+        block_codes = [pd.factorize(groups[c].to_numpy())[0] for c in groups.columns]
+
+    order = np.argsort(-y_proba, kind='stable')
+    p_sorted = y_proba[order]
+    run_ends = np.flatnonzero(np.r_[p_sorted[1:] != p_sorted[:-1], True])
+
+    sizes = [min(chunk_size, n_bootstrap - i) for i in range(0, n_bootstrap, chunk_size)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(sizes))
+    chunks = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_chunk)(seed, size, block_codes, y_true[order], pred[order],
+                                  run_ends, order)
+        for seed, size in zip(seeds, sizes)
+    )
+    replicates = pd.DataFrame(np.vstack(chunks), columns=BOOTSTRAP_METRICS)
+
+    alpha = (1 - ci) / 2
+    intervals = {}
+    for name in BOOTSTRAP_METRICS:
+        values = replicates[name].to_numpy()
+        intervals[f'{name}_ci_low'] = float(np.nanquantile(values, alpha))
+        intervals[f'{name}_ci_high'] = float(np.nanquantile(values, 1 - alpha))
+    return intervals, replicates
+
+
+@instrumented
+def evaluate_model(
+    model,
+    X_test_scaled,
+    y_test,
+    threshold,
+    plot=True,
+    n_bootstrap=0,
+    bootstrap_groups=None,
+    ci=0.95,
+    random_state=42,
+    n_jobs=-1,
+):
     """
     Calcula métricas de desempeño en el conjunto de test retenido.
 
@@ -22,10 +183,18 @@ def evaluate_model(model, X_test_scaled, y_test, threshold, plot=True):
     y_test : pd.Series
     threshold : float  (obtenido en el paso de optimización).
     plot : bool  — genera matriz de confusión, curva PR y ROC.
+    n_bootstrap : int
+        Réplicas de bootstrap para intervalos de confianza (0 = desactivado).
+    bootstrap_groups : pd.DataFrame, optional
+        Bloques a remuestrear, alineados con y_test (p. ej.
+        df.loc[test_mask, ['mun_code', 'quarter']]). Ver bootstrap_metrics.
+    ci : float
+    random_state : int
+    n_jobs : int
 
     Retorna
     -------
-    metrics : dict
+    metrics : dict  (con '<métrica>_ci_low' / '<métrica>_ci_high' si n_bootstrap > 0)
     y_test_proba : np.array
     y_test_pred  : np.array
     """
@@ -43,11 +212,27 @@ def evaluate_model(model, X_test_scaled, y_test, threshold, plot=True):
         'Threshold':         threshold,
     }
 
+    intervals = {}
+    if n_bootstrap:
+        intervals, _ = bootstrap_metrics(
+            y_test, y_proba, threshold,
+            groups=bootstrap_groups, n_bootstrap=n_bootstrap, ci=ci,
+            random_state=random_state, n_jobs=n_jobs,
+        )
+
     print(f"{'='*60}")
     print("EVALUACIÓN FINAL EN TEST SET")
     print(f"{'='*60}")
     for k, v in metrics.items():
-        print(f"  {k:22s}: {v:.4f}")
+        if f'{k}_ci_low' in intervals:
+            print(f"  {k:22s}: {v:.4f}  "
+                  f"[{intervals[f'{k}_ci_low']:.4f}, {intervals[f'{k}_ci_high']:.4f}]")
+        else:
+            print(f"  {k:22s}: {v:.4f}")
+    if intervals:
+        blocks = 'filas' if bootstrap_groups is None else ' × '.join(pd.DataFrame(bootstrap_groups).columns)
+        print(f"  (IC {ci:.0%} por bootstrap: {n_bootstrap} réplicas, bloques: {blocks})")
+    metrics.update(intervals)
     print(f"\nClassification Report:")
     print(classification_report(y_test, y_pred,
                                 target_names=['Clase 0', 'Clase 1'], digits=4))
@@ -1,18 +1,40 @@
 """
 PASO 10 — Interpretabilidad: coeficientes del Elastic Net
+
+Para modelos sin coef_ se usa feature_importances_ (o, con backend='hist_gb',
+la ganancia de los splits de gain_importances) en la columna Coeficiente, con
+Odds_Ratio vacío.
+
+permutation_importance mide, para cualquier modelo, cuánto cae la métrica en
+test (o validación) al permutar un grupo de features a la vez.
 """
+import warnings
+
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+
+from .gradient_boosting import gain_importances
+from .instrumentation import instrumented, record_stats
+
+
+PERMUTATION_METRICS = ('average_precision', 'roc_auc')
 
+# Celdas float64 por bloque apilado (~8 MB): los árboles recorren X una vez por
+# árbol y por encima del caché el costo por fila de predict_proba crece.
+PERMUTATION_BATCH_CELLS = 1_000_000
 
+
+@instrumented
 def get_coefficients(model, feature_cols, top_n=20, plot=True):
     """
     Extrae los coeficientes del modelo y genera un ranking de importancia.
 
     Parámetros
     ----------
-    model : LogisticRegression ajustado.
+    model : LogisticRegression ajustado, HistGradientBoostingClassifier o un
+            modelo con feature_importances_.
     feature_cols : list[str]
     top_n : int  — cuántas features mostrar en el gráfico.
     plot : bool
@@ -23,13 +45,20 @@ def get_coefficients(model, feature_cols, top_n=20, plot=True):
         Columnas: Feature, Coeficiente, Abs_Coef, Odds_Ratio.
         Ordenado de mayor a menor magnitud.
     """
+    linear = hasattr(model, 'coef_')
+    if linear:
+        values = model.coef_[0]
+    elif hasattr(model, 'feature_importances_'):
+        values = model.feature_importances_
+    else:
+        values = gain_importances(model)
     coeficientes = pd.DataFrame({
         'Feature':     feature_cols,
-        'Coeficiente': model.coef_[0],
-        'Abs_Coef':    np.abs(model.coef_[0]),
+        'Coeficiente': values,
+        'Abs_Coef':    np.abs(values),
     }).sort_values('Abs_Coef', ascending=False).reset_index(drop=True)
 
-    coeficientes['Odds_Ratio'] = np.exp(coeficientes['Coeficiente'])
+    coeficientes['Odds_Ratio'] = np.exp(coeficientes['Coeficiente']) if linear else np.nan
 
     non_zero = coeficientes[coeficientes['Coeficiente'] != 0]
     zeroed   = coeficientes[coeficientes['Coeficiente'] == 0]
@@ -53,11 +82,190 @@ def get_coefficients(model, feature_cols, top_n=20, plot=True):
         fig, ax = plt.subplots(figsize=(10, max(6, len(top) * 0.38)))
         ax.barh(top['Feature'], top['Coeficiente'], color=colors)
         ax.axvline(0, color='black', linewidth=0.8)
-        ax.set_xlabel('Coeficiente', fontsize=12)
-        ax.set_title(f'Top {len(top)} Features — Elastic Net',
+        ax.set_xlabel('Coeficiente' if linear else 'Importancia (ganancia)', fontsize=12)
+        ax.set_title(f'Top {len(top)} Features — {"Elastic Net" if linear else type(model).__name__}',
                      fontsize=14, fontweight='bold')
         ax.grid(True, alpha=0.3, axis='x')
         plt.tight_layout()
         plt.show()
 
     return coeficientes
+
+
+def _feature_groups(feature_cols, groups):
+    """{grupo: índices de columna} a partir de None (una por feature), 'base' o un dict."""
+    if groups is None:
+        return {c: np.array([j]) for j, c in enumerate(feature_cols)}
+    from .explanations import feature_family
+
+    family = feature_family(feature_cols, groups)
+    codes, names = pd.factorize(family.to_numpy(), sort=False)
+    return {name: np.flatnonzero(codes == g) for g, name in enumerate(names)}
+
+
+def _ranking_scores(y, proba, scoring):
+    """
+    AUPRC o AUROC de cada fila de proba (repeticiones × filas) a la vez.
+
+    Mismo manejo de empates que sklearn: la precisión (o el área) se evalúa al
+    final de cada grupo de scores iguales. Sin positivos o sin negativos → NaN.
+    """
+    n = proba.shape[1]
+    order = np.argsort(-proba, axis=1, kind='stable')
+    p_sorted = np.take_along_axis(proba, order, axis=1)
+    pos = y[order].astype(np.float64)
+    P = float(y.sum())
+    N = n - P
+    if P == 0 or N == 0:
+        return np.full(len(proba), np.nan)
+
+    pos_idx = np.arange(n)
+    new_run = np.ones_like(p_sorted, dtype=bool)
+    new_run[:, 1:] = p_sorted[:, 1:] != p_sorted[:, :-1]
+    run_end = np.ones_like(new_run)
+    run_end[:, :-1] = new_run[:, 1:]
+    # Para cada fila ordenada: índice del final (e inicio) de su grupo de empates
+    end_of = np.minimum.accumulate(np.where(run_end, pos_idx, n)[:, ::-1], axis=1)[:, ::-1]
+    tp_end = np.take_along_axis(np.cumsum(pos, axis=1), end_of, axis=1)
+
+    if scoring == 'average_precision':
+        return (pos * tp_end / (end_of + 1)).sum(axis=1) / P
+
+    start_of = np.maximum.accumulate(np.where(new_run, pos_idx, 0), axis=1)
+    fp_end = end_of + 1 - tp_end
+    fp_before = np.take_along_axis(np.cumsum(1 - pos, axis=1) - (1 - pos), start_of, axis=1)
+    # Cada positivo gana a los negativos por debajo de su grupo y empata con los del grupo
+    return (pos * (N - fp_end + 0.5 * (fp_end - fp_before))).sum(axis=1) / (P * N)
+
+
+def _permuted_scores(model, X, y, cols, seed, n_repeats, batch_size, scoring):
+    """
+    Métrica con las columnas `cols` permutadas, n_repeats veces.
+
+    Las repeticiones se apilan en un bloque (batch_size × filas) y cada bloque
+    se puntúa con una sola llamada a predict_proba. La misma permutación de filas
+    se aplica a todas las columnas del grupo (conserva su estructura conjunta).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(y)
+    # Solo cambian las columnas del grupo: el bloque apilado se arma una vez
+    block = np.tile(X, (batch_size, 1))
+    scores = []
+    for start in range(0, n_repeats, batch_size):
+        size = min(batch_size, n_repeats - start)
+        for r in range(size):
+            perm = rng.permutation(n)
+            block[r * n:(r + 1) * n, cols] = X[perm[:, None], cols]
+        # Sin DataFrame por llamada: la validación de nombres cuesta más que el modelo lineal
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            proba = model.predict_proba(block[:size * n])[:, 1]
+        scores.append(_ranking_scores(y, proba.reshape(size, n), scoring))
+    return np.concatenate(scores)
+
+
+@instrumented
+def permutation_importance(
+    model,
+    X,
+    y,
+    groups=None,
+    n_repeats=5,
+    scoring='average_precision',
+    y_proba=None,
+    batch_size=None,
+    random_state=42,
+    n_jobs=-1,
+    top_n=20,
+    plot=True,
+):
+    """
+    Importancia por permutación de grupos de features en test o validación.
+
+    Parámetros
+    ----------
+    model : modelo ajustado con predict_proba (Elastic Net o hist_gb).
+    X : pd.DataFrame  (ya estandarizado, p. ej. X_test_sc).
+    y : pd.Series
+    groups : None | 'base' | dict
+        None = cada feature por separado; 'base' agrupa los rezagos y ventanas
+        de una misma variable; un dict {grupo: [variables o prefijos]} arma
+        familias (ver explanations.feature_family).
+    n_repeats : int
+        Permutaciones por grupo.
+    scoring : str
+        'average_precision' o 'roc_auc'.
+    y_proba : array-like, optional
+        Probabilidades del modelo sobre X (p. ej. y_test_proba de
+        evaluate_model): evita recalcular la línea base.
+    batch_size : int, optional
+        Repeticiones puntuadas por llamada a predict_proba (default: las que
+        quepan en PERMUTATION_BATCH_CELLS; memoria ≈ batch_size × filas ×
+        features × 8 bytes por proceso).
+    random_state : int
+    n_jobs : int
+        Procesos; X se comparte entre ellos como memmap de solo lectura.
+    top_n : int  — cuántos grupos mostrar en el gráfico.
+    plot : bool
+
+    Retorna
+    -------
+    importancias : pd.DataFrame
+        Columnas: Grupo, N_Features, Importancia (caída media de la métrica),
+        Std. Ordenado de mayor a menor importancia.
+    """
+    if scoring not in PERMUTATION_METRICS:
+        raise ValueError(f"scoring debe ser uno de {list(PERMUTATION_METRICS)}, no {scoring!r}")
+    feature_cols = list(X.columns)
+    values = np.ascontiguousarray(X.to_numpy(dtype=np.float64))
+    y = np.asarray(y).astype(int)
+
+    if y_proba is None:
+        y_proba = model.predict_proba(X)[:, 1]
+    baseline = _ranking_scores(y, np.asarray(y_proba, dtype=np.float64)[None], scoring)[0]
+
+    group_cols = _feature_groups(feature_cols, groups)
+    names = list(group_cols)
+    seeds = np.random.SeedSequence(random_state).spawn(len(names))
+    if batch_size is None:
+        batch_size = PERMUTATION_BATCH_CELLS // max(values.size, 1)
+    batch_size = max(1, min(batch_size, n_repeats))
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_permuted_scores)(model, values, y, group_cols[name], seed,
+                                  n_repeats, batch_size, scoring)
+        for name, seed in zip(names, seeds)
+    )
+    drops = baseline - np.asarray(scores)
+
+    importancias = pd.DataFrame({
+        'Grupo':       names,
+        'N_Features':  [len(group_cols[name]) for name in names],
+        'Importancia': drops.mean(axis=1),
+        'Std':         drops.std(axis=1),
+    }).sort_values('Importancia', ascending=False).reset_index(drop=True)
+
+    record_stats(baseline_score=float(baseline), n_groups=len(names),
+                 n_predict_calls=len(names) * -(-n_repeats // batch_size))
+    print(f"{'='*60}")
+    print("INTERPRETABILIDAD — IMPORTANCIA POR PERMUTACIÓN")
+    print(f"{'='*60}")
+    print(f"  {scoring} base : {baseline:.4f}")
+    print(f"  Grupos         : {len(names)} ({len(feature_cols)} features) × {n_repeats} permutaciones")
+    n_show = min(top_n, len(importancias))
+    print(f"\nTop {n_show} grupos (caída de {scoring}):")
+    print(importancias.head(n_show).to_string(index=False))
+
+    if plot and not importancias.empty:
+        top = importancias.head(top_n).iloc[::-1]
+        fig, ax = plt.subplots(figsize=(10, max(6, len(top) * 0.38)))
+        ax.barh(top['Grupo'].astype(str), top['Importancia'], xerr=top['Std'],
+                color='coral', ecolor='gray')
+        ax.axvline(0, color='black', linewidth=0.8)
+        ax.set_xlabel(f'Caída de {scoring} al permutar', fontsize=12)
+        ax.set_title(f'Top {len(top)} grupos — Importancia por permutación',
+                     fontsize=14, fontweight='bold')
+        ax.grid(True, alpha=0.3, axis='x')
+        plt.tight_layout()
+        plt.show()
+
+    return importancias
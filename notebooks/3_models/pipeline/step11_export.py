@@ -1,20 +1,37 @@
 """
 PASO 11 — Exportar resultados (métricas y coeficientes)
+
+Cada corrida se agrega al almacén SQLite de experimentos (default:
+<results_dir>/experiments.sqlite; ver experiment_store: leaderboard,
+coefficient_stability). Los CSVs con timestamp de versiones anteriores solo se
+escriben con write_csv=True.
 """
 import os
 import pandas as pd
 from datetime import datetime
 
+from .experiment_store import log_run
+from .instrumentation import instrumented
+
+
+STORE_NAME = 'experiments.sqlite'   # almacén por defecto dentro de results_dir
 
+
+@instrumented
 def export_results(
     results_dir,
     experiment_name,
     metrics,
     coeficientes,
     extra_info=None,
+    store_path=None,
+    cv_results=None,
+    threshold_df=None,
+    params=None,
+    write_csv=False,
 ):
     """
-    Guarda métricas y coeficientes como CSV con timestamp.
+    Agrega la corrida (métricas, coeficientes, CV y curva de threshold) al almacén de experimentos.
 
     Parámetros
     ----------
@@ -27,27 +44,53 @@ def export_results(
     coeficientes : pd.DataFrame
         Resultados de get_coefficients().
     extra_info : dict, optional
-        Campos adicionales a añadir al CSV de métricas.
+        Campos adicionales de la corrida (los numéricos se guardan como métricas).
+    store_path : str | Path, optional
+        Archivo SQLite del almacén de experimentos. Default:
+        <results_dir>/experiments.sqlite.
+    cv_results : pd.DataFrame, optional
+        Resultados de tune_hyperparameters().
+    threshold_df : pd.DataFrame, optional
+        Curva de optimize_threshold().
+    params : dict, optional
+        Configuración del experimento.
+    write_csv : bool
+        Escribir además los CSVs de métricas y coeficientes con timestamp.
 
     Retorna
     -------
-    paths : dict  {'metrics': ..., 'coeficientes': ...}
+    paths : dict  {'metrics': ..., 'coeficientes': ..., 'store': ..., 'run_id': ...}
+              (rutas de los CSVs None si write_csv=False)
     """
     os.makedirs(results_dir, exist_ok=True)
     ts = datetime.now().strftime('%Y%m%d_%H%M%S')
 
-    row = {'Experimento': experiment_name, 'Timestamp': ts, **metrics}
-    if extra_info:
-        row.update(extra_info)
+    if store_path is None:
+        store_path = os.path.join(results_dir, STORE_NAME)
 
-    metrics_path = os.path.join(results_dir, f"{experiment_name}_metrics_{ts}.csv")
-    coef_path    = os.path.join(results_dir, f"{experiment_name}_coeficientes_{ts}.csv")
+    metrics_path = coef_path = None
+    if write_csv:
+        row = {'Experimento': experiment_name, 'Timestamp': ts, **metrics}
+        if extra_info:
+            row.update(extra_info)
+        metrics_path = os.path.join(results_dir, f"{experiment_name}_metrics_{ts}.csv")
+        coef_path    = os.path.join(results_dir, f"{experiment_name}_coeficientes_{ts}.csv")
 
-    pd.DataFrame([row]).to_csv(metrics_path, index=False)
-    coeficientes.to_csv(coef_path, index=False)
+        pd.DataFrame([row]).to_csv(metrics_path, index=False)
+        coeficientes.to_csv(coef_path, index=False)
 
     print(f"✓ Resultados exportados en: {results_dir}")
-    print(f"  Métricas     : {os.path.basename(metrics_path)}")
-    print(f"  Coeficientes : {os.path.basename(coef_path)}")
+    if write_csv:
+        print(f"  Métricas     : {os.path.basename(metrics_path)}")
+        print(f"  Coeficientes : {os.path.basename(coef_path)}")
+
+    run_id = log_run(
+        store_path, experiment_name, metrics,
+        coeficientes=coeficientes, cv_results=cv_results, threshold_df=threshold_df,
+        params=params, extra_info=extra_info,
+        timestamp=datetime.strptime(ts, '%Y%m%d_%H%M%S').isoformat(),
+    )
+    print(f"  Almacén      : {os.path.basename(str(store_path))} (run_id {run_id})")
 
-    return {'metrics': metrics_path, 'coeficientes': coef_path}
+    return {'metrics': metrics_path, 'coeficientes': coef_path, 'store': str(store_path),
+            'run_id': run_id}
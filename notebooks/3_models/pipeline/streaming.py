@@ -0,0 +1,243 @@
+"""
+Entrenamiento fuera de memoria: SGD Elastic Net con partial_fit por trimestre
+=============================================================================
+
+Alternativa a tune_hyperparameters cuando train + val no caben en memoria
+(resolución mensual, cientos de rezagos). El dataset se recorre trimestre a
+trimestre; nunca se carga más de una partición a la vez:
+
+1. Una pasada para las estadísticas: conteo, media y M2 por columna
+   (combinados con la fórmula de Chan, como en fold_preprocessing) y conteo de
+   clases para los pesos balanceados.
+2. n_epochs pasadas de SGDClassifier(loss='log_loss', penalty='elasticnet')
+   con partial_fit, imputando por la media y estandarizando con esas
+   estadísticas; los trimestres se recorren en orden aleatorio en cada época.
+
+El modelo resultante tiene predict_proba y coef_ en las mismas unidades
+estandarizadas que la regresión logística, así que optimize_threshold,
+evaluate_model y get_coefficients se usan sin cambios sobre stream_scaled.
+
+Con un dataset particionado (write_dataset) cada trimestre es una lectura de
+su partición; con un solo .parquet se filtra por grupos de filas.
+
+>>> model, stats = train_streaming(DATASET_DIR, TARGET_COL, feature_cols,
+...                                periods=(None, '2019Q4'))
+>>> X_val, y_val = stream_scaled(DATASET_DIR, stats, periods=('2020Q1', '2021Q4'))
+>>> best_threshold, _ = optimize_threshold(model, X_val, y_val)
+"""
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+
+from .panel import period_codes
+from .fold_preprocessing import _block_moments, _merge
+from .instrumentation import instrumented, record_stats
+
+
+def _quarter_source(data_path, time_col):
+    """Trimestres disponibles ('YYYYQN', en orden) y una función que lee uno de ellos."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    # Cada lectura abre sus archivos de cero: un Dataset reutilizado guarda los
+    # metadatos de cada fragmento leído y la memoria crece con el panel.
+    if Path(data_path).is_dir():
+        files = {}
+        for frag in ds.dataset(str(data_path), format='parquet', partitioning='hive').get_fragments():
+            k = ds.get_partition_keys(frag.partition_expression)
+            files.setdefault((int(k['año']), int(k['trimestre'])), []).append(frag.path)
+        periods = [f'{y}Q{q}' for y, q in sorted(files)]
+
+        def read(period, columns):
+            paths = files[(int(period[:4]), int(period[-1]))]
+            return pa.concat_tables([pq.read_table(f, columns=columns) for f in paths]).to_pandas()
+    else:
+        labels = pq.read_table(data_path, columns=[time_col]).column(time_col).unique().to_pylist()
+        labels = [str(p) for p in labels]
+        periods = [labels[i] for i in np.argsort(period_codes(pd.Series(labels)))]
+
+        def read(period, columns):
+            return pq.read_table(data_path, columns=columns,
+                                 filters=[(time_col, '==', period)]).to_pandas()
+
+    return periods, read
+
+
+def _select_periods(periods, bounds):
+    """Trimestres dentro del rango inclusivo (inicio, fin) en formato 'YYYYQN'."""
+    if bounds is None:
+        return list(periods)
+    codes = period_codes(pd.Series(periods))
+    keep = np.ones(len(periods), dtype=bool)
+    start, end = bounds
+    if start is not None:
+        keep &= codes >= period_codes(pd.Series([start]))[0]
+    if end is not None:
+        keep &= codes <= period_codes(pd.Series([end]))[0]
+    return [p for p, k in zip(periods, keep) if k]
+
+
+def _chunk(read, period, feature_cols, target_col):
+    df = read(period, feature_cols + [target_col])
+    df = df[df[target_col].notna()]
+    X = df[feature_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    return X, df[target_col].to_numpy().astype(int)
+
+
+def _transform(X, stats):
+    return (np.where(np.isnan(X), stats['fill'], X) - stats['mean']) / stats['scale']
+
+
+@instrumented
+def train_streaming(
+    data_path,
+    target_col,
+    feature_cols,
+    periods=None,
+    time_col='quarter',
+    alpha=1e-4,
+    l1_ratio=0.15,
+    n_epochs=5,
+    eta0=0.01,
+    power_t=0.5,
+    class_weight='balanced',
+    average=False,
+    random_state=42,
+):
+    """
+    Ajusta un Elastic Net logístico por SGD leyendo un trimestre a la vez.
+
+    Parámetros
+    ----------
+    data_path : str | Path
+        Dataset particionado (write_dataset) o archivo .parquet.
+    target_col : str
+    feature_cols : list[str]
+    periods : tuple(str | None, str | None), optional
+        Rango inclusivo de trimestres de entrenamiento ('YYYYQN', 'YYYYQN').
+    time_col : str
+    alpha : float
+        Fuerza de la regularización (≈ 1 / (C · n_filas) de la regresión logística).
+    l1_ratio : float
+    n_epochs : int
+        Pasadas completas por los trimestres.
+    eta0, power_t : float
+        Tasa de aprendizaje eta0 / t^power_t (t = filas vistas). El esquema
+        'optimal' de SGDClassifier diverge con los pesos balanceados y alpha pequeño.
+    class_weight : 'balanced' | None
+        Pesos por fila n / (2 · n_clase), con los conteos de todo el rango.
+    average : bool
+        Promedia los coeficientes de SGD (ASGD): más estable con pocas épocas.
+    random_state : int
+
+    Retorna
+    -------
+    model : SGDClassifier ajustado (predict_proba, coef_ estandarizados).
+    stats : dict
+        feature_cols, target_col, fill, mean, scale (imputación por la media y
+        estandarización), class_counts, n_rows, periods, epoch_loss.
+    """
+    feature_cols = list(feature_cols)
+    available, read = _quarter_source(data_path, time_col)
+    periods = _select_periods(available, periods)
+    if not periods:
+        raise ValueError("No hay trimestres de entrenamiento en el rango indicado")
+    print(f"Entrenamiento en streaming: {len(periods)} trimestres ({periods[0]} → {periods[-1]}) "
+          f"| {len(feature_cols)} features | alpha={alpha}, l1_ratio={l1_ratio}")
+
+    # 1) Estadísticas de imputación / escala y conteo de clases, en una pasada
+    n_cols = len(feature_cols)
+    n, mean, m2 = np.zeros(n_cols), np.zeros(n_cols), np.zeros(n_cols)
+    class_counts = np.zeros(2, dtype=np.int64)
+    for period in periods:
+        X, y = _chunk(read, period, feature_cols, target_col)
+        n, mean, m2 = _merge(n, mean, m2, *_block_moments(X))
+        class_counts += np.bincount(y, minlength=2)[:2]
+    n_rows = int(class_counts.sum())
+    if class_counts.min() == 0:
+        raise ValueError(f"El rango de entrenamiento tiene una sola clase: {class_counts.tolist()}")
+
+    fill = np.where(n > 0, mean, 0.0)
+    n_all, mean_all, m2_all = _merge(n, mean, m2, n_rows - n, fill, np.zeros(n_cols))
+    scale = np.sqrt(m2_all / n_all)
+    stats = {
+        'feature_cols': feature_cols,
+        'target_col':   target_col,
+        'fill':         fill,
+        'mean':         mean_all,
+        'scale':        np.where(scale > 0, scale, 1.0),
+        'class_counts': class_counts,
+        'n_rows':       n_rows,
+        'periods':      (periods[0], periods[-1]),
+    }
+    weights = (n_rows / (2 * class_counts) if class_weight == 'balanced'
+               else np.ones(2))
+    print(f"✓ Estadísticas: {n_rows:,} filas | prevalencia {class_counts[1] / n_rows:.2%}")
+
+    # 2) Épocas de partial_fit; la pérdida de cada trimestre se mide antes de ajustarlo
+    model = SGDClassifier(loss='log_loss', penalty='elasticnet', alpha=alpha, l1_ratio=l1_ratio,
+                          learning_rate='invscaling', eta0=eta0, power_t=power_t,
+                          average=average, random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    epoch_loss = []
+    t0 = time.perf_counter()
+    for epoch in range(n_epochs):
+        loss, w_total = 0.0, 0.0
+        for i in rng.permutation(len(periods)):
+            X, y = _chunk(read, periods[i], feature_cols, target_col)
+            if len(y) == 0:
+                continue
+            order = rng.permutation(len(y))
+            X, y = _transform(X[order], stats), y[order]
+            w = weights[y]
+            if hasattr(model, 'coef_'):
+                p = np.clip(model.predict_proba(X)[:, 1], 1e-15, 1 - 1e-15)
+                loss -= np.sum(w * np.where(y == 1, np.log(p), np.log(1 - p)))
+                w_total += w.sum()
+            model.partial_fit(X, y, classes=np.array([0, 1]), sample_weight=w)
+        epoch_loss.append(loss / w_total if w_total else np.nan)
+        print(f"  Época {epoch + 1}/{n_epochs}: log-loss progresiva {epoch_loss[-1]:.4f}")
+
+    stats['epoch_loss'] = epoch_loss
+    record_stats(n_rows=n_rows, n_periods=len(periods), final_loss=float(epoch_loss[-1]))
+    print(f"✓ SGD Elastic Net ajustado en {time.perf_counter() - t0:,.1f} s | "
+          f"features activas: {int((model.coef_[0] != 0).sum())} de {n_cols}")
+    return model, stats
+
+
+@instrumented
+def stream_scaled(data_path, stats, periods, time_col='quarter'):
+    """
+    Lee un rango de trimestres y lo imputa / estandariza con las estadísticas de train_streaming.
+
+    Parámetros
+    ----------
+    data_path : str | Path
+    stats : dict  de train_streaming.
+    periods : tuple(str | None, str | None)
+        Rango inclusivo (p. ej. validación o test).
+    time_col : str
+
+    Retorna
+    -------
+    X_scaled : pd.DataFrame  (columnas = feature_cols, como scale_features)
+    y : pd.Series
+    """
+    available, read = _quarter_source(data_path, time_col)
+    selected = _select_periods(available, periods)
+    feature_cols, target_col = stats['feature_cols'], stats['target_col']
+    blocks, targets = [], []
+    for period in selected:
+        X, y = _chunk(read, period, feature_cols, target_col)
+        blocks.append(_transform(X, stats))
+        targets.append(y)
+    if not blocks:
+        raise ValueError("No hay trimestres en el rango indicado")
+    X_scaled = pd.DataFrame(np.concatenate(blocks), columns=feature_cols)
+    y = pd.Series(np.concatenate(targets), name=target_col)
+    print(f"✓ {len(selected)} trimestres estandarizados: {len(y):,} filas")
+    return X_scaled, y
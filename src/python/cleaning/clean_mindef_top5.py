@@ -1,32 +1,44 @@
 """
-Clean crime data from Colombian Ministry of Defense (Top 5 crimes).
+Clean crime data from Colombian Ministry of Defense (Top 5 crimes and the
+extended set from min_defensa_extendido.ipynb).
+
+Workbooks are converted in parallel on a process pool. Each converted
+workbook is cached under temp/mindef/cache, keyed on the SHA-256 of the
+Excel file, so unchanged workbooks are never parsed twice.
 
 Author: Juan Diego Heredia Niño
 Email: jd.heredian@uniandes.edu.co
 Date: Oct 2025
 """
-print("Started")
-
 import pandas as pd
 import yaml
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
 import os
+import shutil
+
+CACHE_VERSION = '1'  # Bump when clean_crime_data changes its output
 
 
 def clean_crime_data(file_path: Path, output_path: Path, crime_code: str, value_column: str):
     """Clean and standardize crime data from Excel file and save to Parquet."""
     # Read Excel file
     df = pd.read_excel(file_path)
-    
+
+    # Some workbooks use 'FECHA HECHO' (with space) instead of 'FECHA_HECHO'
+    df.rename(columns={'FECHA HECHO': 'FECHA_HECHO'}, inplace=True)
+
     # Convert date to monthly period (first day of month)
-    df['FECHA_HECHO'] = df['FECHA_HECHO'].dt.to_period('M').dt.to_timestamp().dt.date
-    
+    df['FECHA_HECHO'] = pd.to_datetime(df['FECHA_HECHO']).dt.to_period('M').dt.to_timestamp().dt.date
+
     # Standardize municipality code to 5-digit string
     df['COD_MUNI'] = df['COD_MUNI'].astype(str).str.zfill(5)
-    
+
     # Group by date and municipality, summing quantities
     df = df.groupby(['FECHA_HECHO', 'COD_MUNI'])[[value_column]].sum().reset_index()
-    
+
     # Rename columns to English standard
     df.rename(
         columns={
@@ -36,22 +48,81 @@ def clean_crime_data(file_path: Path, output_path: Path, crime_code: str, value_
         },
         inplace=True
     )
-    
+
     # Add crime code identifier
     df['crime_code'] = crime_code
-    
+
     # Save to Parquet
     output_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_parquet(output_path, index=False)
 
-current_dir = Path(__file__).resolve().parent # Make script use its own directory as base and find paths.yml
-os.chdir(current_dir) # Change working dir to script location
 
-with open('paths.yml', 'r') as file:
-    paths = yaml.safe_load(file)
+def file_hash(path: Path, known: dict) -> str:
+    """SHA-256 of a file, reusing the previous hash when size and mtime are unchanged."""
+    stat = path.stat()
+    if known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+        return known['sha256']
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def ingest(jobs, cache_dir: Path, max_workers=None):
+    """
+    Convert every (input_path, output_path, crime_code, value_column) job.
+
+    Unchanged workbooks whose output is already in place are skipped, cached
+    conversions are copied, and only the remaining workbooks are parsed on a
+    process pool.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / 'manifest.json'
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    inputs = manifest.setdefault('inputs', {})
+    outputs = manifest.setdefault('outputs', {})
+
+    pending = []
+    for input_path, output_path, crime_code, value_column in jobs:
+        if not input_path.exists():
+            print(f"  Missing, skipped: {input_path.name}")
+            continue
+        known = inputs.get(str(input_path), {})
+        digest = file_hash(input_path, known)
+        stat = input_path.stat()
+        inputs[str(input_path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+
+        key = f"{digest}_{crime_code}_{value_column}_v{CACHE_VERSION}"
+        cache_path = cache_dir / f"{key}.parquet"
+
+        if outputs.get(str(output_path)) == key and output_path.exists():
+            continue
+        if cache_path.exists():
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cache_path, output_path)
+            outputs[str(output_path)] = key
+            print(f"  From cache: {input_path.name}")
+            continue
+        pending.append((input_path, output_path, crime_code, value_column, cache_path, key))
+
+    if pending:
+        print(f"  Parsing {len(pending)} workbook(s) in parallel")
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                (job, pool.submit(clean_crime_data, job[0], job[4], job[2], job[3]))
+                for job in pending
+            ]
+            for (input_path, output_path, _, _, cache_path, key), future in futures:
+                future.result()
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(cache_path, output_path)
+                outputs[str(output_path)] = key
+                print(f"  Parsed: {input_path.name}")
+
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return len(pending)
 
-raw = Path(paths['data']['raw'])
-temp = Path(paths['data']['temp'])
 
 # Crime configurations: input_file, output_file, crime_code, value_column
 crimes = {
@@ -62,13 +133,45 @@ crimes = {
     'MASACRES.xlsx': ('massacres.parquet', '05', 'VICTIMAS')
 }
 
-# Process each crime type
-for input_file, (output_file, crime_code, value_column) in crimes.items():
-    clean_crime_data(
-        raw / 'mindef' / 'top5' / input_file,
-        temp / 'mindef' / 'top5' / output_file,
-        crime_code=crime_code,
-        value_column=value_column
-    )
+# Extended set (see notebooks/1_cleaning/min_defensa_extendido.ipynb)
+crimes_other = {
+    'ASPERSION.xlsx': ('aspersion.parquet', '06', 'CANTIDAD'),
+    'CAPTURAS POR MINERÍA ILEGAL.xlsx': ('illegal_mining_arrests.parquet', '07', 'CAPTURAS'),
+    'DELITOS CONTRA EL MEDIO AMBIENTE.xlsx': ('environmental_crimes.parquet', '08', 'CANTIDAD'),
+    'DESTRUCCIÓN INFRAESTRUCTURAS PARA LA PRODUCCIÓN DE DROGAS ILÍCITAS.xlsx': ('drug_infrastructure_destruction.parquet', '09', 'CANTIDAD'),
+    'ERRADICACIÓN.xlsx': ('eradication.parquet', '10', 'CANTIDAD'),
+    'HOJA DE COCA.xlsx': ('coca_leaf.parquet', '11', 'CANTIDAD'),
+    'HURTO A COMERCIO.xlsx': ('commerce_theft.parquet', '12', 'CANTIDAD'),
+    'HURTO PERSONAS.xlsx': ('person_theft.parquet', '13', 'CANTIDAD'),
+    'INCAUTACIÓN DE COCAINA.xlsx': ('cocaine_seizure.parquet', '14', 'CANTIDAD'),
+    'MINAS INTERVENIDAS.xlsx': ('intervened_mines.parquet', '15', 'CANTIDAD'),
+    'TRATA DE PERSONAS Y TRÁFICO DE MIGRANTES.xlsx': ('human_trafficking.parquet', '16', 'CANTIDAD'),
+    'VOLADURA DE OLEODUCTOS.xlsx': ('pipeline_bombing.parquet', '17', 'CANTIDAD'),
+}
+
+
+if __name__ == '__main__':  # Guard required: pool workers re-import this module
+    print("Started")
+
+    current_dir = Path(__file__).resolve().parent # Make script use its own directory as base and find paths.yml
+    os.chdir(current_dir) # Change working dir to script location
+
+    with open('paths.yml', 'r') as file:
+        paths = yaml.safe_load(file)
+
+    raw = Path(paths['data']['raw'])
+    temp = Path(paths['data']['temp'])
+
+    jobs = [
+        (raw / 'mindef' / 'top5' / input_file, temp / 'mindef' / 'top5' / output_file, crime_code, value_column)
+        for input_file, (output_file, crime_code, value_column) in crimes.items()
+    ] + [
+        (raw / 'mindef' / 'other' / input_file, temp / 'mindef' / 'other' / output_file, crime_code, value_column)
+        for input_file, (output_file, crime_code, value_column) in crimes_other.items()
+    ]
+
+    # Process each crime type
+    parsed = ingest(jobs, temp / 'mindef' / 'cache')
+    print(f"Workbooks parsed: {parsed} of {len(jobs)}")
 
-print("Finished")
\ No newline at end of file
+    print("Finished")
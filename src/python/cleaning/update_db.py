@@ -0,0 +1,38 @@
+"""
+Incremental update of db.parquet after a new MinDefensa data drop.
+
+Run after clean_mindef_top5.py: only the (mun_code, quarter) cells whose
+quarterly counts changed are recomputed, together with their lags,
+thresholds and atypical-violence labels, and rows for new quarters are
+appended. See pipeline/incremental_build.py.
+
+Date: Oct 2026
+"""
+print("Started")
+
+import sys
+import yaml
+from pathlib import Path
+import os
+
+current_dir = Path(__file__).resolve().parent # Make script use its own directory as base and find paths.yml
+os.chdir(current_dir) # Change working dir to script location
+
+# The pipeline package lives next to the model notebooks
+sys.path.insert(0, str(current_dir.parents[2] / 'notebooks' / '3_models'))
+from pipeline.incremental_build import update_db
+
+with open('paths.yml', 'r') as file:
+    paths = yaml.safe_load(file)
+
+temp = Path(paths['data']['temp'])
+processed = Path(paths['data']['processed'])
+
+update_db(
+    processed / 'db.parquet',
+    state_dir=temp / 'build_state',
+    temp_dir=temp,
+    population_path=temp / 'dane' / 'demografía' / 'dane_demografia.parquet',
+)
+
+print("Finished")